@@ -0,0 +1,21 @@
+'''
+Microbenchmarks for the simulators in this repo.
+
+The projects live in plain script directories rather than packages, so
+importing `benchmarks` puts those directories on `sys.path`, the same
+way running a script from inside its own directory would.
+
+    python -m benchmarks                      # run everything, compare to baseline
+    python -m benchmarks --filter plane       # only benchmarks matching "plane"
+    python -m benchmarks --update-baseline    # record a new baseline
+'''
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIRS = ['crazy-plane', 'prisoner-problem', 'game-of-life']
+
+for project in PROJECT_DIRS:
+    path = os.path.join(REPO_ROOT, project)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+
+from . import bench_crazy_plane, bench_game_of_life, bench_prisoner
+from .harness import (DEFAULT_THRESHOLD, compare_to_baseline, load_results,
+                      metadata_mismatches, run_suite, save_results,
+                      uncovered_cases)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = 'python -m benchmarks',
+                                     description = 'Time the hot simulation functions.')
+    parser.add_argument('--filter', help = 'only run benchmarks whose name contains this')
+    parser.add_argument('--output', help = 'write the results JSON here')
+    parser.add_argument('--baseline', default = DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action = 'store_true',
+                        help = 'overwrite the baseline with this run')
+    parser.add_argument('--threshold', type = float, default = DEFAULT_THRESHOLD,
+                        help = 'slowdown fraction that counts as a regression')
+    parser.add_argument('--min-time', type = float, default = 0.2)
+    parser.add_argument('--repeat', type = int, default = 5)
+    args = parser.parse_args(argv)
+
+    results = run_suite(name_filter = args.filter, min_time = args.min_time,
+                        repeat = args.repeat)
+    if args.output:
+        save_results(results, args.output)
+
+    if args.update_baseline:
+        if os.path.exists(args.baseline) and args.filter:
+            # Keep the cases this run skipped.
+            baseline = load_results(args.baseline)
+            baseline['results'].update(results['results'])
+            baseline['metadata'] = results['metadata']
+            results = baseline
+        save_results(results, args.baseline)
+        print('Baseline written to %s' % args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('No baseline at %s; rerun with --update-baseline to record one.'
+              % args.baseline)
+        return 0
+
+    baseline = load_results(args.baseline)
+    mismatches = metadata_mismatches(results, baseline)
+    if mismatches:
+        print('Warning: baseline was recorded with a different %s, '
+              'so the comparison may not mean much.' % ', '.join(mismatches))
+    regressions, improvements = compare_to_baseline(results, baseline,
+                                                    threshold = args.threshold)
+    for label, rows in [('Improved', improvements), ('REGRESSED', regressions)]:
+        for case, before, after, ratio in rows:
+            print('%-9s %-50s %.6f s -> %.6f s (x%.2f)'
+                  % (label, case, before, after, ratio))
+    # A benchmark without a baseline guards against nothing, so it
+    # fails the run until its baseline gets recorded.
+    uncovered = uncovered_cases(results, baseline)
+    for case in uncovered:
+        print('NO BASELINE %-48s (record it with --update-baseline --filter)'
+              % case)
+    return 1 if regressions or uncovered else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,26 @@
+import numpy as np
+
+import plane_process as pp
+import plane_variants as pv
+from .harness import benchmark
+
+@benchmark('plane_process', params = [10, 100, 1000])
+def bench_plane_process(N):
+    rng = np.random.default_rng(0)
+    return lambda: pp.plane_process(N, rng)
+
+@benchmark('plane_process_batch', params = ['N=200,K=10000', 'N=200,K=100000'])
+def bench_plane_process_batch(param):
+    N, K = [int(p.split('=')[1]) for p in param.split(',')]
+    rng = np.random.default_rng(0)
+    return lambda: pp.plane_process_batch(N, K, rng)
+
+@benchmark('plane_process_chain', params = [1000, 10 ** 7])
+def bench_plane_process_chain(N):
+    rng = np.random.default_rng(0)
+    return lambda: pp.plane_process_chain(N, rng)
+
+@benchmark('plane_process_variant', params = ['classic', 'two_crazy', 'window_lovers'])
+def bench_plane_process_variant(scenario):
+    rng = np.random.default_rng(0)
+    return lambda: pv.run_scenario(scenario, 200, 10000, rng)
@@ -0,0 +1,88 @@
+import numpy as np
+
+from bitpacked_life import BitPackedGameOfLife
+from game_of_life import GameOfLife
+from hashlife import HashlifeGameOfLife
+from numpy_life import NumpyGameOfLife
+from parallel_life import TiledGameOfLife
+from patterns import format_rle, parse_rle
+from .harness import benchmark
+
+def random_board(size, seed = 0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 2, size = (size, size)).tolist()
+
+@benchmark('GameOfLife.__init__', params = [16, 64, 128])
+def bench_game_of_life_init(size):
+    board = random_board(size)
+    return lambda: GameOfLife(board = [row[:] for row in board])
+
+@benchmark('GameOfLife.run_update', params = [16, 64, 128], fresh = True)
+def bench_game_of_life_run_update(size):
+    game = GameOfLife(board = random_board(size))
+    return game.run_update
+
+@benchmark('NumpyGameOfLife.run_update', params = [128, 1024], fresh = True)
+def bench_numpy_game_of_life_run_update(size):
+    game = NumpyGameOfLife(board = random_board(size))
+    return game.run_update
+
+@benchmark('BitPackedGameOfLife.run_update', params = [128, 1024, 4096], fresh = True)
+def bench_bitpacked_game_of_life_run_update(size):
+    game = BitPackedGameOfLife(board = np.array(random_board(size), dtype = np.uint8))
+    return game.run_update
+
+@benchmark('NumpyGameOfLife.run_update[rule]', params = ['B3/S23', 'B36/S23', 'B3678/S34678'], fresh = True)
+def bench_numpy_game_of_life_rules(rule):
+    game = NumpyGameOfLife(board = random_board(1024), rule = rule)
+    return game.run_update
+
+@benchmark('BitPackedGameOfLife.run_update[rule]', params = ['B3/S23', 'B36/S23', 'B3678/S34678'], fresh = True)
+def bench_bitpacked_game_of_life_rules(rule):
+    game = BitPackedGameOfLife(board = np.array(random_board(1024), dtype = np.uint8), rule = rule)
+    return game.run_update
+
+@benchmark('NumpyGameOfLife.run_update[boundary]', params = ['edge', 'torus'], fresh = True)
+def bench_numpy_game_of_life_boundaries(boundary):
+    game = NumpyGameOfLife(board = random_board(1024), boundary = boundary)
+    return game.run_update
+
+@benchmark('GameOfLife.run_update[glider]', params = [64, 256], fresh = True)
+def bench_game_of_life_sparse_run_update(size):
+    board = [[0] * size for _ in range(size)]
+    for row_idx, col_idx in [(0, 1), (1, 2), (2, 0), (2, 1), (2, 2)]:
+        board[row_idx][col_idx] = 1
+    game = GameOfLife(board = board)
+    # The first update visits every tile; time the sparse ones after it.
+    game.run_update()
+    return game.run_update
+
+@benchmark('HashlifeGameOfLife.advance[2**20]', params = [32, 64])
+def bench_hashlife_advance(size):
+    board = random_board(size)
+    return lambda: HashlifeGameOfLife(board = board).advance(2 ** 20)
+
+@benchmark('TiledGameOfLife.run_generations[8]', params = ['halo=1', 'halo=4'], fresh = True)
+def bench_tiled_game_of_life(param):
+    halo_width = int(param.split('=')[1])
+    game = TiledGameOfLife(board = np.array(random_board(1024), dtype = np.uint8),
+                           halo_width = halo_width)
+    return lambda: game.run_generations(8)
+
+# Strips and threads both equal `workers`, so this shows how the tiled
+# engine scales with cores; compare it on a machine with at least four.
+@benchmark('TiledGameOfLife.run_generations[workers]', params = [1, 2, 4], fresh = True)
+def bench_tiled_game_of_life_workers(workers):
+    game = TiledGameOfLife(board = np.array(random_board(1024), dtype = np.uint8),
+                           halo_width = 4, workers = workers)
+    return lambda: game.run_generations(8)
+
+@benchmark('parse_rle', params = [256, 1024])
+def bench_parse_rle(size):
+    data = format_rle(np.array(random_board(size), dtype = np.uint8))
+    return lambda: parse_rle(data)
+
+@benchmark('format_rle', params = [256, 1024])
+def bench_format_rle(size):
+    board = np.array(random_board(size), dtype = np.uint8)
+    return lambda: format_rle(board)
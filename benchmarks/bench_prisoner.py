@@ -0,0 +1,21 @@
+import numpy as np
+
+import prisoner_early_exit as pee
+import prisoner_utils as pu
+from .harness import benchmark
+
+@benchmark('create_drawer_array', params = [100, 10 ** 5])
+def bench_create_drawer_array(N):
+    rng = np.random.default_rng(0)
+    return lambda: pu.create_drawer_array(N, rng)
+
+@benchmark('n_random_choices', params = [100, 10 ** 4, 10 ** 5])
+def bench_n_random_choices(N):
+    rng = np.random.default_rng(0)
+    drawers = pu.create_drawer_array(N, rng)
+    return lambda: pu.n_random_choices(0, drawers, rng = rng)
+
+@benchmark('early_exit_trial', params = [100, 10 ** 4])
+def bench_early_exit_trial(N):
+    runner = pee.EarlyExitRunner(N, rng = np.random.default_rng(0))
+    return runner.run_trial
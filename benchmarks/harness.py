@@ -0,0 +1,150 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+BENCHMARKS = {}
+
+# Slowdown (as a fraction) that counts as a regression.  Timings on a
+# shared machine easily wander by 25%, so anything less is noise.
+DEFAULT_THRESHOLD = 0.5
+
+def benchmark(name, params, fresh = False):
+    '''
+    Registers a benchmark.  The decorated function is a setup step: it
+    gets called once per entry in `params` and returns the zero-argument
+    callable that actually gets timed, so building inputs never counts
+    towards the measurement.
+
+    With `fresh = True` the setup runs again before every timed repeat,
+    for callables that change their own state (a game advancing a
+    generation per call), so every repeat starts from the same inputs
+    instead of wherever the last one left off.
+    '''
+    def register(setup):
+        BENCHMARKS[name] = (setup, list(params), fresh)
+        return setup
+    return register
+
+def case_name(name, param):
+    return '%s[%s]' % (name, param)
+
+def time_callable(fn, min_time = 0.2, repeat = 5, rebuild = None):
+    '''
+    Times `fn` like `timeit` does: first finds a loop count that takes
+    at least `min_time` seconds, then repeats that loop `repeat` times.
+    If given, `rebuild()` is called (untimed) before every loop and
+    returns the callable to time in it.  Returns per-call seconds (min
+    and median) plus the loop settings.
+    '''
+    number = 1
+    while True:
+        if rebuild is not None:
+            fn = rebuild()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 10 ** 6:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    per_call = []
+    for _ in range(repeat):
+        if rebuild is not None:
+            fn = rebuild()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - start) / number)
+    return {'min': min(per_call), 'median': statistics.median(per_call),
+            'number': number, 'repeat': repeat}
+
+def machine_metadata():
+    '''Enough about the machine and checkout to tell whether two result
+    files are comparable.
+    '''
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'],
+                                capture_output = True, text = True,
+                                cwd = os.path.dirname(os.path.abspath(__file__))
+                                ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'git_commit': commit}
+
+def run_suite(name_filter = None, min_time = 0.2, repeat = 5, verbose = True):
+    '''Runs every registered benchmark (whose name contains
+    `name_filter`, if given) and returns a results dict ready for JSON.
+    '''
+    results = {}
+    for name, (setup, params, fresh) in sorted(BENCHMARKS.items()):
+        if name_filter and name_filter not in name:
+            continue
+        for param in params:
+            rebuild = (lambda: setup(param)) if fresh else None
+            timing = time_callable(setup(param), min_time = min_time,
+                                   repeat = repeat, rebuild = rebuild)
+            results[case_name(name, param)] = timing
+            if verbose:
+                print('%-50s %12.6f s' % (case_name(name, param), timing['min']))
+    return {'metadata': machine_metadata(), 'results': results}
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent = 2, sort_keys = True)
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+def compare_to_baseline(current, baseline, threshold = DEFAULT_THRESHOLD):
+    '''
+    Compares the best per-call times of two result dicts and returns
+    (regressions, improvements) as lists of
+    (case, baseline seconds, current seconds, ratio).  A case regresses
+    when it got more than `threshold` (as a fraction) slower.
+    '''
+    regressions = []
+    improvements = []
+    for case, timing in sorted(current['results'].items()):
+        if case not in baseline['results']:
+            # See `uncovered_cases`.
+            continue
+        before = baseline['results'][case]['min']
+        ratio = timing['min'] / before
+        row = (case, before, timing['min'], ratio)
+        if ratio > 1 + threshold:
+            regressions.append(row)
+        elif ratio < 1 / (1 + threshold):
+            improvements.append(row)
+    return regressions, improvements
+
+def uncovered_cases(current, baseline):
+    '''Cases in `current` the baseline has no timing for, which
+    `compare_to_baseline` can't check.
+    '''
+    return sorted(case for case in current['results']
+                  if case not in baseline['results'])
+
+def metadata_mismatches(current, baseline):
+    '''Metadata fields (other than time and commit) that differ between
+    two runs, since timings from different machines don't compare.
+    '''
+    skip = {'timestamp', 'git_commit'}
+    return [key for key in current['metadata']
+            if key not in skip
+            and current['metadata'][key] != baseline['metadata'].get(key)]
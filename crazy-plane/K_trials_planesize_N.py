@@ -2,10 +2,14 @@ import numpy as np
 import seaborn as sns
 from matplotlib import pyplot as plt 
 import plane_process as pp
+import plane_sweep as ps
+import plane_cache as pc
+import cumulative_stream as cs
 import os
 
 def plot_cumulative_plane_processes(K, N, pltgrid_x = 1, pltgrid_y = 1,\
-									subdir_name = None):
+									subdir_name = None, seed = None, cache = None,\
+									max_points = 2000, downsample = 'lttb'):
 	'''
 	Performs K trials of the "crazy plane" process defined in the
 	`plane_process.py` module for a plane with N seats.  Returns plots of
@@ -20,21 +24,63 @@ def plot_cumulative_plane_processes(K, N, pltgrid_x = 1, pltgrid_y = 1,\
 	of a subdirectory relative to the directory from which you are running
 	the script.  Leaving this as `None` will display the results
 	instead of saving.
+
+	Each batch of trials runs from its own seed stream under `seed`
+	(see `plane_sweep.iter_outcome_chunks`), and with a
+	`plane_cache.PlaneResultCache` as `cache` a rerun with the same seed
+	reads earlier trials back instead of simulating them again.
+
+	Trials are streamed through `cumulative_stream` in chunks instead of
+	being held in memory all at once, and each curve is cut down to at
+	most `max_points` points ('lttb' or 'log' spaced, see
+	`cumulative_stream.cumulative_curve`).  The success rates in the
+	titles still count every trial.
+	'''
+	curves = cumulative_curves(K, N, pltgrid_x * pltgrid_y, seed = seed, cache = cache,\
+							   max_points = max_points, downsample = downsample)
+	fig = draw_cumulative_curves(curves, K, N, pltgrid_x = pltgrid_x, pltgrid_y = pltgrid_y)
+	
+	# Save the plot in given subdirectory, or show it if no subdir given
+	if subdir_name:
+		target_dir = '/'.join([os.getcwd(), subdir_name])
+		fig.savefig(target_dir + '/%s.png' % cumulative_plot_label(K, N), dpi = fig.dpi)
+	else:
+		plt.show()
+
+def cumulative_curves(K, N, n_batches, seed = None, cache = None,\
+					  max_points = 2000, downsample = 'lttb'):
+	'''
+	Runs `n_batches` batches of K trials on a plane with N seats (batch b
+	uses seed stream b) and returns one downsampled
+	`cumulative_stream.CumulativeCurve` per batch.
 	'''
-	# Define shared parts of all visuals: the entire figure, 
-	# an outer subplot, and the X axis.
+	curves = []
+	for b in range(n_batches):
+		chunks = ps.iter_outcome_chunks(N, K, seed = seed, stream = b, cache = cache)
+		curves.append(cs.cumulative_curve(chunks, K, max_points = max_points,\
+										  method = downsample))
+	return curves
+
+def cumulative_plot_label(K, N):
+	return '%s_trials_%s_seats_plots' % (K,N)
+
+def draw_cumulative_curves(curves, K, N, pltgrid_x = 1, pltgrid_y = 1):
+	'''
+	Draws already computed cumulative success rate curves, one subplot
+	per curve on a pltgrid_x by pltgrid_y grid, and returns the figure.
+	'''
+	# Define shared parts of all visuals: the entire figure 
+	# and an outer subplot.
 	fig = plt.figure()
 	outer = fig.add_subplot(1,1,1)
-	X = np.arange(1, K + 1)
 
 	# Plot out the subplots for all batches of trials.
-	for b in range(pltgrid_x * pltgrid_y):
+	for b, curve in enumerate(curves):
 		ax = fig.add_subplot(pltgrid_x, pltgrid_y, b + 1)
-		Y = np.array([pp.plane_process(N) for i in X])
-		ax.plot(X, np.cumsum(Y) * 1.0/X, 'bo' if K <= 10 else 'b-')
-		ax.set_xlim(min(X), max(X))
+		ax.plot(curve.X, curve.Y, 'bo' if K <= 10 else 'b-')
+		ax.set_xlim(1, K)
 		ax.set_ylim(0,1)
-		cum_prob = sum(Y) * 1.0/len(Y)
+		cum_prob = curve.successes * 1.0/curve.trials
 		ax.set_title("Success Rate: %.2f" % cum_prob)
 
 	# Outer subplot was only there to set shared axis labels.
@@ -51,26 +97,21 @@ def plot_cumulative_plane_processes(K, N, pltgrid_x = 1, pltgrid_y = 1,\
 	outer.set_facecolor('white')
 
 	# Set overall title and provide more space for it.
-	plt.suptitle("Crazy Plane with %s Seats: %s Batches of %s Trials"\
+	fig.suptitle("Crazy Plane with %s Seats: %s Batches of %s Trials"\
                   % (N, pltgrid_x * pltgrid_y, K))
-	plt.tight_layout()
-	plt.subplots_adjust(top = 0.85)
-	
-	# Save the plot in given subdirectory, or show it if no subdir given
-	if subdir_name:
-		target_dir = '/'.join([os.getcwd(), subdir_name])
-		plotlabel = '%s_trials_%s_seats_plots' % (K,N)
-		fig.savefig(target_dir + '/%s.png' % plotlabel, dpi = fig.dpi)
-	else:
-		plt.show()
+	fig.tight_layout()
+	fig.subplots_adjust(top = 0.85)
+	return fig
 
 if __name__ == '__main__':
 	pp.create_or_clean_dir('singleplane_plots_moarTrials')
 	N = int(input("Choose seats on plane: "))
 	K = int(input("Choose number of trials: "))
 	print("Running four batches of trials with above specifications")
-	plot_cumulative_plane_processes(K, N, pltgrid_x = 2, pltgrid_y = 2,\
-									subdir_name = 'singleplane_plots_moarTrials')
+	with pc.PlaneResultCache() as cache:
+		plot_cumulative_plane_processes(K, N, pltgrid_x = 2, pltgrid_y = 2,\
+										subdir_name = 'singleplane_plots_moarTrials',\
+										seed = 2017, cache = cache)
 
 
 	
\ No newline at end of file
@@ -2,11 +2,17 @@ import numpy as np
 from matplotlib import pyplot as plt
 import seaborn as sns
 import plane_process as pp
+import plane_sweep as ps
+import plane_cache as pc
+import exact_plane as ep
 from statsmodels.stats.proportion import proportion_confint
 import os
 
 def plot_multiple_plane_sizes(K, N_vector, conf_level = 0.95,\
-							  null_prop = 0.5, subdir_name = None):
+							  null_prop = 0.5, subdir_name = None,\
+							  processes = 1, seed = None, adaptive = False,\
+							  target_halfwidth = 0.01, cache = None, exact_reference = False,\
+							  scenario = None):
 	'''
 	Calculates the success rate p_hat of running K trials
 	of the `plane_process.py` simulation, and plots
@@ -27,18 +33,56 @@ def plot_multiple_plane_sizes(K, N_vector, conf_level = 0.95,\
 	of a subdirectory relative to the directory from which you are running
 	the script.  Leaving this as `None` will display the results
 	instead of saving.
+
+	The trials themselves are run by `plane_sweep.run_sweep`, so
+	`processes` spreads them over that many cores (None for all of
+	them) and `seed` makes the whole plot reproducible.  Passing a
+	`plane_cache.PlaneResultCache` as `cache` along with a fixed seed
+	reuses every chunk of trials an earlier run already simulated, so
+	replotting with more trials, a different confidence level or a
+	different null proportion only simulates what's missing.
+
+	With `adaptive = True`, K becomes the most trials any plane size
+	can get: `plane_sweep.adaptive_sweep` runs batches of trials and
+	stops early once an interval's half-width is below
+	`target_halfwidth` or it excludes `null_prop`.  Either way, the
+	function returns the number of trials used for each plane size.
+
+	Setting `exact_reference = True` swaps the dashed `null_prop` line for
+	the exact success probability at each plane size from
+	`exact_plane.exact_plane`, so the intervals can be checked against
+	the true answer rather than a hypothesis.
+
+	`scenario` names one of the `plane_variants.SCENARIOS` (two crazy
+	passengers, window lovers, ...) to run instead of the classic
+	problem.  The exact reference only applies to the classic problem.
 	'''
 	lower_bounds = []
 	p_hats = []
 	upper_bounds = []
 
-	for plane_size in N_vector:
-		trials = [pp.plane_process(plane_size) for i in range(K)]
-		lower, upper = proportion_confint(count = sum(trials), nobs = K,\
-										  alpha = 1 - conf_level, method = 'wilson')
-		lower_bounds.append(lower)
-		p_hats.append(sum(trials)*1.0/K)
-		upper_bounds.append(upper)
+	trials_used = []
+
+	if adaptive:
+		results = ps.adaptive_sweep(K, N_vector, target_halfwidth = target_halfwidth,\
+									conf_level = conf_level, null_prop = null_prop,\
+									seed = seed, processes = processes, cache = cache,\
+									scenario = scenario)
+		for result in results:
+			lower_bounds.append(result.lower)
+			p_hats.append(result.successes*1.0/result.trials)
+			upper_bounds.append(result.upper)
+			trials_used.append(result.trials)
+	else:
+		counts = ps.run_sweep(K, N_vector, seed = seed, processes = processes,\
+							  cache = cache, scenario = scenario)
+		for successes, nobs in counts:
+			lower, upper = proportion_confint(count = successes, nobs = nobs,\
+											  alpha = 1 - conf_level, method = 'wilson')
+			lower_bounds.append(lower)
+			p_hats.append(successes*1.0/nobs)
+			upper_bounds.append(upper)
+			trials_used.append(nobs)
 
 	# Second line here was necessary to make the discrete tick marks show up on the plot
 	# when using seaborn.  See "Known Issues" in Seaborn documentation and/or following
@@ -54,16 +98,23 @@ def plot_multiple_plane_sizes(K, N_vector, conf_level = 0.95,\
 	plt.fill_between(N_vector, lower_bounds, upper_bounds,\
 					 facecolor = 'grey', alpha = 0.2)
 
-	# Plot a dotted line for the null hypothesized proportion
-	plt.plot(np.linspace(min(N_vector), max(N_vector), 1000),\
-			 np.repeat([null_prop], repeats = 1000),'k--')
+	# Plot a dotted line for the null hypothesized proportion, or for the
+	# exact answer if we asked for it
+	if exact_reference:
+		plt.plot(N_vector, ep.exact_success_rates(N_vector), 'k--',\
+				 label = 'Exact ' + r'$P(Success)$')
+	else:
+		plt.plot(np.linspace(min(N_vector), max(N_vector), 1000),\
+				 np.repeat([null_prop], repeats = 1000),'k--')
 
 	# Set up ticks, labels, and titles to look pretty
 	plt.xticks(N_vector, rotation = 45, fontsize = 8)
 	plt.xlabel('Seats on Plane')
 	plt.yticks(np.linspace(0.25,0.75,11), fontsize = 8)
 	plt.ylabel('%d%% Confidence Interval' % (conf_level * 100))
-	plt.title('%s Trials with Crazy Planes of Varying Size' % K)
+	plt.title('%s%s Trials with %sCrazy Planes of Varying Size'\
+			  % ('Up to ' if adaptive else '', K,\
+				 '"%s" ' % scenario if scenario else ''))
 	plt.legend(loc = 'best', framealpha = 0.75, frameon = True, edgecolor = 'b')
 	
 	# Save the plot in given subdirectory, or show it if no subdir given
@@ -71,13 +122,19 @@ def plot_multiple_plane_sizes(K, N_vector, conf_level = 0.95,\
 		target_dir = '/'.join([os.getcwd(), subdir_name])
 		plotlabel = '%s_trials_%s_to_%s_seat_planes' % \
 		(K, min(N_vector), max(N_vector))
+		if scenario:
+			plotlabel = '%s_%s' % (scenario, plotlabel)
 		plt.savefig(target_dir + '/%s.png' % plotlabel, \
 			dpi = plt.gcf().dpi)
 	else:
 		plt.show()
 
+	return trials_used
+
 if __name__ == '__main__':
 	pp.create_or_clean_dir('multiplane_plots_moarTrials')
 	K = int(input("Choose number of trials at each N: "))
-	plot_multiple_plane_sizes(K, N_vector = [int(b) for b in np.linspace(10,200, 20)],\
-							  conf_level = 0.95, null_prop = 0.5, subdir_name = 'multiplane_plots_moarTrials')
+	with pc.PlaneResultCache() as cache:
+		plot_multiple_plane_sizes(K, N_vector = [int(b) for b in np.linspace(10,200, 20)],\
+								  conf_level = 0.95, null_prop = 0.5, subdir_name = 'multiplane_plots_moarTrials',\
+								  seed = 2017, cache = cache)
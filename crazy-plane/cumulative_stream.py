@@ -0,0 +1,116 @@
+from collections import namedtuple
+
+import numpy as np
+
+CumulativeCurve = namedtuple('CumulativeCurve', ['X', 'Y', 'successes', 'trials'])
+
+def running_successes(outcome_chunks):
+    '''
+    Turns a stream of 1/0 outcome arrays into a stream of (X, S) pairs,
+    where X holds the trial numbers (starting at 1) covered by the chunk
+    and S the total successes up to and including each of those trials.
+    Only one chunk is held at a time.
+    '''
+    seen = 0
+    total = 0
+    for chunk in outcome_chunks:
+        if len(chunk) == 0:
+            continue
+        X = np.arange(seen + 1, seen + len(chunk) + 1)
+        S = total + np.cumsum(chunk)
+        seen = X[-1]
+        total = int(S[-1])
+        yield X, S
+
+def log_downsample(running, K, max_points = 2000):
+    '''
+    Keeps only the points of a `running_successes` stream at (roughly)
+    log-spaced trial numbers between 1 and K, so at most `max_points`
+    points survive.  Returns a `CumulativeCurve` with the exact final
+    success count.
+    '''
+    if K <= max_points:
+        targets = np.arange(1, K + 1)
+    else:
+        targets = np.unique(np.geomspace(1, K, max_points).astype(int))
+    xs, ys = [], []
+    successes = trials = 0
+    for X, S in running:
+        picked = targets[(targets >= X[0]) & (targets <= X[-1])] - X[0]
+        xs.append(X[picked])
+        ys.append(S[picked] / X[picked])
+        successes, trials = int(S[-1]), int(X[-1])
+    return CumulativeCurve(np.concatenate(xs), np.concatenate(ys),
+                           successes, trials)
+
+def lttb_downsample(running, K, max_points = 2000):
+    '''
+    Downsamples a `running_successes` stream of K points to at most
+    `max_points` using Largest-Triangle-Three-Buckets: the first and
+    last points are kept, the rest are split into equal buckets, and
+    from each bucket we keep the point making the biggest triangle with
+    the point kept from the previous bucket and the average of the next.
+    That needs the next bucket to be complete before picking from the
+    current one, so at most two buckets plus one chunk are in memory.
+    Returns a `CumulativeCurve` with the exact final success count.
+    '''
+    if K <= max_points:
+        return log_downsample(running, K, max_points = max_points)
+
+    # Bucket b covers the 0-based trial indices edges[b] to edges[b+1] - 1.
+    n_buckets = max_points - 2
+    edges = np.linspace(1, K - 1, n_buckets + 1).astype(int)
+
+    xs, ys = [], []
+    pending_x = np.empty(0)
+    pending_y = np.empty(0)
+    pending_start = 0
+    successes = trials = 0
+    bucket = 0
+    for X, S in running:
+        Y = S / X
+        if not xs:
+            xs.append(X[0])
+            ys.append(Y[0])
+        pending_x = np.concatenate([pending_x, X])
+        pending_y = np.concatenate([pending_y, Y])
+        successes, trials = int(S[-1]), int(X[-1])
+
+        while bucket < n_buckets:
+            last_bucket = bucket + 1 == n_buckets
+            needed = K if last_bucket else edges[bucket + 2]
+            if pending_start + len(pending_x) < needed:
+                break
+            lo = edges[bucket] - pending_start
+            hi = edges[bucket + 1] - pending_start
+            if last_bucket:
+                next_x, next_y = pending_x[-1], pending_y[-1]
+            else:
+                nxt = slice(hi, edges[bucket + 2] - pending_start)
+                next_x, next_y = pending_x[nxt].mean(), pending_y[nxt].mean()
+            prev_x, prev_y = xs[-1], ys[-1]
+            area = np.abs((prev_x - next_x) * (pending_y[lo:hi] - prev_y)
+                          - (prev_x - pending_x[lo:hi]) * (next_y - prev_y))
+            best = lo + np.argmax(area)
+            xs.append(pending_x[best])
+            ys.append(pending_y[best])
+
+            bucket += 1
+            drop = edges[bucket] - pending_start
+            pending_x = pending_x[drop:]
+            pending_y = pending_y[drop:]
+            pending_start = edges[bucket]
+
+    xs.append(pending_x[-1])
+    ys.append(pending_y[-1])
+    return CumulativeCurve(np.array(xs, dtype = int), np.array(ys),
+                           successes, trials)
+
+def cumulative_curve(outcome_chunks, K, max_points = 2000, method = 'lttb'):
+    '''
+    Runs a stream of outcome chunks through `running_successes` and the
+    chosen downsampler ('lttb' or 'log').
+    '''
+    downsamplers = {'lttb': lttb_downsample, 'log': log_downsample}
+    return downsamplers[method](running_successes(outcome_chunks), K,
+                                max_points = max_points)
@@ -0,0 +1,73 @@
+from collections import namedtuple
+from fractions import Fraction
+
+ExactPlane = namedtuple('ExactPlane', ['N', 'last_seat', 'success',
+                                       'expected_chain_length'])
+
+def exact_plane(N):
+    '''
+    Exact answer to the crazy plane problem for a plane with N seats,
+    worked out with a dynamic program over the displacement chain
+    instead of by simulation.  Returns an `ExactPlane` with
+
+    * `last_seat`: dict mapping seat -> probability that the last
+      passenger ends up there (as `fractions.Fraction`s),
+    * `success`: probability the last passenger gets seat N,
+    * `expected_chain_length`: expected number of passengers who pick a
+      seat at random, counted the same way as `plane_process_chain`.
+
+    The DP walks the displaced passengers in boarding order.  Passenger
+    j (1 < j < N) is displaced exactly when some earlier random chooser
+    took seat j.  The crazy passenger picks each seat with probability
+    1/N, and a displaced passenger i picks each of its N - i + 1 free
+    seats (seat 1 and seats i+1 through N) with equal probability.  So
+
+        P(j displaced) = 1/N + sum over 1 < i < j of P(i displaced) / (N - i + 1)
+
+    and the running sum is all we need to carry along, which keeps the
+    memory O(1) apart from the returned dict.  The chain ends when
+    seat 1 or seat N is taken, which leaves the last passenger with seat
+    N or seat 1 respectively.  (For N > 1 it all collapses to 1/2 and
+    H_N - 1/2, which makes a handy check on the DP itself.)  Everything
+    is kept as exact rationals, so this gets slow for very large N since
+    the denominators grow like lcm(1..N).
+    '''
+    if N == 1:
+        return ExactPlane(1, {1: Fraction(1)}, Fraction(1), Fraction(1))
+
+    first_pick = Fraction(1, N)
+    # Probability mass of random choices landing on seat 1 or seat N so far.
+    takes_seat_1 = first_pick
+    takes_seat_N = first_pick
+    # Sum over earlier displaced passengers i of P(i displaced) / (N - i + 1).
+    carried = Fraction(0)
+    expected_chain_length = Fraction(1)
+
+    for passenger in range(2, N):
+        displaced = first_pick + carried
+        expected_chain_length += displaced
+        per_seat = displaced / (N - passenger + 1)
+        takes_seat_1 += per_seat
+        takes_seat_N += per_seat
+        carried += per_seat
+
+    last_seat = {N: takes_seat_1, 1: takes_seat_N}
+    return ExactPlane(N, last_seat, last_seat[N], expected_chain_length)
+
+def exact_success_rates(N_vector):
+    '''Exact success probabilities (as floats) for every size in N_vector.
+    '''
+    return [float(exact_plane(N).success) for N in N_vector]
+
+if __name__ == '__main__':
+    import numpy as np
+    import plane_process as pp
+
+    rng = np.random.default_rng(2017)
+    for N in [2, 3, 10, 100, 1000]:
+        exact = exact_plane(N)
+        chains = [pp.plane_process_chain(N, rng)[1] for i in range(10000)]
+        print('N = %s: P(success) = %s (batch estimate %.4f), '
+              'E[chain length] = %.4f (estimate %.4f)'
+              % (N, exact.success, pp.plane_process_batch(N, 100000, rng).mean(),
+                 float(exact.expected_chain_length), np.mean(chains)))
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import sqlite3
+import time
+from urllib.request import pathname2url
+
+import numpy as np
+
+# Bump this whenever the simulators change in a way that changes which
+# outcomes a given seed produces, so stale cache entries stop matching.
+ENGINE_VERSION = 'plane_process_batch/1'
+VARIANTS_VERSION = 'plane_process_variant/1'
+
+DEFAULT_CACHE_NAME = 'plane_results_cache.sqlite'
+
+class PlaneResultCache(object):
+    '''
+    On-disk cache of crazy plane simulation results, stored in a single
+    sqlite file.  Every entry is one work unit: the success count of
+    `n_trials` trials on a plane with N seats, run from one
+    `numpy.random.SeedSequence` stream.  Since a seed stream always
+    produces the same trials, the key is just a hash of (engine version,
+    N, seed stream), and the sweeps address their streams by (N, stream,
+    chunk index) with a fixed chunk size.  How many trials a unit holds
+    is stored next to it rather than in the key, and a lookup only hits
+    when that count matches, so when K grows only the last (partial)
+    chunk and the new ones get simulated.  Callers can also store the
+    individual outcomes (bit-packed) when they need the trial-by-trial
+    sequence rather than just the count.
+
+    The file is kept under `max_bytes` by dropping the least recently
+    used entries whenever a write pushes it over the limit.
+
+    Only one process should write to the file.  Worker processes open it
+    with `read_only = True`: lookups read the file as usual, but the
+    hits they'd mark as used go to `touched` and the units they'd store
+    to `pending`, and the writing process applies both with `apply`.
+    '''
+
+    def __init__(self, path = None, max_bytes = 256 * 1024 ** 2, read_only = False):
+        self.path = path or os.path.join(os.getcwd(), DEFAULT_CACHE_NAME)
+        self.max_bytes = max_bytes
+        self.read_only = read_only
+        self.touched = []
+        self.pending = []
+        if read_only:
+            self.conn = sqlite3.connect('file:%s?mode=ro' % pathname2url(self.path),
+                                        uri = True)
+            return
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS units (
+                                key TEXT PRIMARY KEY,
+                                n_seats INTEGER,
+                                successes INTEGER,
+                                trials INTEGER,
+                                outcomes BLOB,
+                                last_used REAL)''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS units_last_used '
+                          'ON units (last_used)')
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if not self.read_only:
+            self.conn.commit()
+        self.conn.close()
+
+    @staticmethod
+    def unit_key(N, seed_seq, scenario = None):
+        '''Content address for the trials of an N seat plane run from the
+        stream `seed_seq`, optionally for a named `plane_variants`
+        scenario instead of the classic process.
+        '''
+        ident = (ENGINE_VERSION, int(N), seed_seq.entropy,
+                 tuple(seed_seq.spawn_key))
+        if scenario is not None:
+            ident += (VARIANTS_VERSION, scenario)
+        ident = repr(ident)
+        return hashlib.sha1(ident.encode()).hexdigest()
+
+    def _touch(self, key):
+        if self.read_only:
+            self.touched.append(key)
+            return
+        # Committed along with the next write or on close.
+        self.conn.execute('UPDATE units SET last_used = ? WHERE key = ?',
+                          (time.time(), key))
+
+    def get_counts(self, key, n_trials):
+        '''Returns (successes, trials) for a cached unit of `n_trials`
+        trials, or None.
+        '''
+        row = self.conn.execute('SELECT successes, trials FROM units '
+                                'WHERE key = ?', (key,)).fetchone()
+        if row is None or row[1] != n_trials:
+            return None
+        self._touch(key)
+        return row
+
+    def get_outcomes(self, key, n_trials):
+        '''Returns the array of 1/0 trial outcomes for a cached unit of
+        `n_trials` trials, or None if the unit (or its outcomes) was
+        never stored with that many trials.
+        '''
+        row = self.conn.execute('SELECT trials, outcomes FROM units '
+                                'WHERE key = ?', (key,)).fetchone()
+        if row is None or row[0] != n_trials or row[1] is None:
+            return None
+        self._touch(key)
+        trials, packed = row
+        bits = np.unpackbits(np.frombuffer(packed, dtype = np.uint8),
+                             count = trials)
+        return bits.astype(int)
+
+    def put(self, key, N, successes, trials, outcomes = None):
+        '''Stores one unit.  `outcomes`, if given, is the array of 1/0
+        results and is kept bit-packed.
+        '''
+        packed = None
+        if outcomes is not None:
+            packed = np.packbits(np.asarray(outcomes, dtype = np.uint8)).tobytes()
+        row = (key, int(N), int(successes), int(trials), packed)
+        if self.read_only:
+            self.pending.append(row)
+            return
+        self._insert([row])
+
+    def _insert(self, rows):
+        now = time.time()
+        self.conn.executemany('INSERT OR REPLACE INTO units VALUES (?, ?, ?, ?, ?, ?)',
+                              [row + (now,) for row in rows])
+        self.conn.commit()
+        self.evict()
+
+    def apply(self, touched, pending):
+        '''Applies the `touched` and `pending` lists of a read-only copy of
+        this cache, in one transaction.
+        '''
+        for key in touched:
+            self._touch(key)
+        self._insert(pending)
+
+    def size_bytes(self):
+        '''Bytes of the file actually holding data (free pages excluded).
+        '''
+        page_size = self.conn.execute('PRAGMA page_size').fetchone()[0]
+        page_count = self.conn.execute('PRAGMA page_count').fetchone()[0]
+        free_pages = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def evict(self):
+        '''Drops least recently used units until the cache fits in
+        `max_bytes`.  Freed pages get reused by later writes, so the file
+        itself stops growing once it hits the limit.
+        '''
+        while self.size_bytes() > self.max_bytes:
+            n_units = self.conn.execute('SELECT COUNT(*) FROM units').fetchone()[0]
+            if n_units == 0:
+                break
+            self.conn.execute('''DELETE FROM units WHERE key IN (
+                                     SELECT key FROM units
+                                     ORDER BY last_used LIMIT ?)''',
+                              (max(1, n_units // 10),))
+            self.conn.commit()
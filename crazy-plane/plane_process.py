@@ -1,14 +1,23 @@
-import random
 import os
 
-def plane_process(N):
+import numpy as np
+import repo_path
+import seeding
+
+def plane_process(N, rng = None):
     '''
     Performs one trial of the "crazy plane" process assuming a 
     plane with N seats.  For more information on the problem
     statement, see the following link:
 
     http://math.stackexchange.com/questions/5595/taking-seats-on-a-plane
+
+    `rng` is anything `seeding.get_rng` accepts (a Generator, a seed or None).
     '''
+    # One uniform draw per passenger, made up front in a single call,
+    # since a NumPy scalar draw per displaced passenger costs more than
+    # the rest of the trial.
+    draws = seeding.get_rng(rng).random(N).tolist()
 
     # Generate a plane with N seats and passengers indexed from 1 to N.
     passengers = [b for b in range(1, N + 1)]
@@ -19,14 +28,14 @@ def plane_process(N):
     for passenger in passengers[:-1]:
     	# First passenger always chooses randomly
     	if passenger == 1:
-    		seats.remove(random.choice(seats))
+    		seats.remove(seats[int(draws[passenger] * len(seats))])
     	else:
     		try:
     			# Any other passenger tries to find his/her seat,
     			seats.index(passenger)
     		except ValueError:
     			# but if occupied, he/she chooses randomly
-    			seats.remove(random.choice(seats))
+    			seats.remove(seats[int(draws[passenger] * len(seats))])
     		else:
     			seats.remove(passenger)
     	#After a passenger chooses a seat, remove him/her from the list.
@@ -37,6 +46,70 @@ def plane_process(N):
     # print "failure."
     return 1 if passengers == seats else 0
 
+def plane_process_batch(N, K, rng = None):
+    '''
+    Performs K independent trials of the "crazy plane" process at once
+    for a plane with N seats, and returns a length-K array of ones
+    (success) and zeros (failure).  Same distribution as running
+    `plane_process(N)` K times, just with NumPy doing the bookkeeping.
+
+    The trick is that when passenger p boards, seats 2 through p-1 are
+    always taken, and exactly one other seat is taken too: either seat 1
+    or some seat at or beyond p.  So each trial only needs to remember
+    that one extra seat.  Passenger p is displaced exactly when that
+    seat is p, and then picks uniformly among the free seats, which are
+    seat 1 and seats p+1 through N.  The last passenger succeeds when the
+    extra seat ends up being seat 1.
+
+    `rng` is anything `seeding.get_rng` accepts (a Generator, a seed or None).
+    '''
+    rng = seeding.get_rng(rng)
+
+    # First passenger takes any of the N seats at random.
+    taken = rng.integers(1, N + 1, size = K)
+
+    # Only the trials where passenger p's seat is taken need a new draw.
+    for passenger in range(2, N):
+        displaced = np.flatnonzero(taken == passenger)
+        if displaced.size == 0:
+            continue
+        # Draw 0 for seat 1, or d for seat passenger + d.
+        picks = rng.integers(0, N - passenger + 1, size = displaced.size)
+        taken[displaced] = np.where(picks == 0, 1, passenger + picks)
+
+    return (taken == 1).astype(int)
+
+def plane_process_chain(N, rng = None):
+    '''
+    Event-driven version of `plane_process` that only looks at the
+    passengers who actually have to choose a seat at random.  Returns a
+    tuple (result, chain_length), where result is 1/0 like
+    `plane_process` and chain_length counts the passengers who picked
+    randomly, the crazy first passenger included.
+
+    Passengers whose seat is free just sit down, so we jump straight
+    from one displaced passenger to the next: whoever sits in seat j
+    displaces passenger j.  When passenger j is displaced the free seats
+    are always seat 1 plus seats j+1 through N, so the free-seat
+    "structure" is just that lower bound.  Picking a seat is one random
+    draw and taking every seat up to j is moving the bound, both O(1).
+    The chain stops once seat 1 (success) or seat N (failure) is taken,
+    which makes a trial O(log N) on average and fine for 10^7 seats.
+    '''
+    rng = seeding.get_rng(rng)
+
+    # The crazy passenger can take any seat, including their own.
+    seat = int(rng.integers(1, N + 1))
+    chain_length = 1
+    while 1 < seat < N:
+        # Passenger `seat` is displaced and chooses among seat 1 and
+        # seats seat+1 through N.
+        pick = int(rng.integers(0, N - seat + 1))
+        seat = 1 if pick == 0 else seat + pick
+        chain_length += 1
+
+    return (1 if seat == 1 else 0), chain_length
+
 def create_or_clean_dir(subdir_name):
     '''
     This is a helper function for plot governance.  Every time
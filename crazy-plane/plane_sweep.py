@@ -0,0 +1,280 @@
+import multiprocessing as mp
+from collections import namedtuple
+
+import numpy as np
+from statsmodels.stats.proportion import proportion_confint
+
+import plane_process as pp
+import plane_variants as pv
+import repo_path
+import seeding
+
+SweepUpdate = namedtuple('SweepUpdate',
+                         ['N', 'successes', 'trials', 'lower', 'upper'])
+AdaptiveResult = namedtuple('AdaptiveResult',
+                            ['N', 'successes', 'trials', 'lower', 'upper',
+                             'stop_reason'])
+
+# Trials per work unit.  Chunk c always covers trials c * CHUNK_SIZE and
+# up, whatever K is, so a cached sweep rerun with a bigger K reuses every
+# full chunk it already has.
+CHUNK_SIZE = 10000
+
+# Seed stream for `adaptive_sweep`'s batches, out of the way of the small
+# stream numbers `run_sweep` (0) and the plotting batches (0, 1, ...) use,
+# so the two kinds of sweep never share trials or cache entries.
+ADAPTIVE_STREAM = 2 ** 31 - 1
+
+def make_work_units(N_vector, K, chunk_size = CHUNK_SIZE):
+    '''
+    Splits a sweep of K trials at every plane size in `N_vector` into
+    (N_index, N, chunk_index, n_trials) work units of at most
+    `chunk_size` trials each.  Only the last chunk at each plane size
+    can be partial, and the chunking never depends on the number of
+    workers.
+    '''
+    units = []
+    for n_idx, N in enumerate(N_vector):
+        for chunk_idx, start in enumerate(range(0, K, chunk_size)):
+            units.append((n_idx, N, chunk_idx, min(chunk_size, K - start)))
+    return units
+
+def unit_seed(root_seed, N, chunk_idx, stream = 0):
+    '''
+    Returns the `numpy.random.SeedSequence` for one work unit.  This is
+    the same child `SeedSequence.spawn` would build, but addressed by
+    (plane size, stream, chunk index) so that it doesn't matter which
+    worker picks the unit up or in which order, or which other plane
+    sizes are in the sweep.  `stream` separates independent runs at the
+    same plane size, like the batches in a grid of cumulative plots.
+    '''
+    return seeding.child_seed(root_seed, N, stream, chunk_idx)
+
+def _run_unit(args):
+    n_idx, N, n_trials, seed_seq, scenario, keep_outcomes, cache_key = args
+    rng = seeding.get_rng(seed_seq)
+    if scenario is None:
+        outcomes = pp.plane_process_batch(N, n_trials, rng)
+    else:
+        outcomes = pv.run_scenario(scenario, N, n_trials, rng)
+    return n_idx, N, int(outcomes.sum()), n_trials, \
+        (outcomes if keep_outcomes else None), cache_key
+
+def run_units(units, pool = None, cache = None, keep_outcomes = False,
+              scenario = None):
+    '''
+    Runs (n_idx, N, n_trials, seed_seq) work units and yields
+    (n_idx, successes, n_trials, outcomes) as each one finishes.  Units
+    found in `cache` (a `plane_cache.PlaneResultCache`) are yielded
+    straight away without simulating them, and everything simulated is
+    added to it.  `outcomes` is only filled in when `keep_outcomes` is
+    set; otherwise it is None.  Without a `pool` the units run in this
+    process, in order.
+
+    `scenario` names a `plane_variants` scenario to simulate instead of
+    the classic crazy plane.
+    '''
+    missing = []
+    for n_idx, N, n_trials, seed_seq in units:
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.unit_key(N, seed_seq, scenario = scenario)
+            if keep_outcomes:
+                outcomes = cache.get_outcomes(cache_key, n_trials)
+                if outcomes is not None:
+                    yield n_idx, int(outcomes.sum()), n_trials, outcomes
+                    continue
+            else:
+                cached = cache.get_counts(cache_key, n_trials)
+                if cached is not None:
+                    yield n_idx, cached[0], cached[1], None
+                    continue
+        missing.append((n_idx, N, n_trials, seed_seq, scenario, keep_outcomes,
+                        cache_key))
+
+    results = map(_run_unit, missing) if pool is None \
+        else pool.imap_unordered(_run_unit, missing)
+    # Only this process ever writes to the cache.
+    for n_idx, N, successes, n_trials, outcomes, cache_key in results:
+        if cache is not None:
+            cache.put(cache_key, N, successes, n_trials, outcomes = outcomes)
+        yield n_idx, successes, n_trials, outcomes
+
+def iter_outcome_chunks(N, K, seed = None, stream = 0, chunk_size = CHUNK_SIZE,
+                        cache = None, scenario = None):
+    '''
+    Yields the 1/0 outcomes of K trials on a plane with N seats, in
+    order, as arrays of at most `chunk_size` trials.  The trials come
+    from the same (N, stream, chunk) seed streams as the sweeps, and
+    with a `cache` the outcomes of earlier runs are read back instead of
+    simulated again.  `scenario` is passed on to `run_units`.
+    '''
+    root_seed = seeding.as_seed_sequence(seed)
+    units = [(0, N, n_trials, unit_seed(root_seed, N, chunk_idx, stream))
+             for _, _, chunk_idx, n_trials in make_work_units([N], K, chunk_size)]
+    for unit in units:
+        for _, _, _, outcomes in run_units([unit], cache = cache,
+                                           keep_outcomes = True,
+                                           scenario = scenario):
+            yield outcomes
+
+def sweep_plane_sizes(K, N_vector, seed = None, chunk_size = CHUNK_SIZE,
+                      processes = None, conf_level = 0.95, cache = None,
+                      scenario = None):
+    '''
+    Runs K trials of the crazy plane process for every plane size in
+    `N_vector`, spread over a process pool in chunks of `chunk_size`
+    trials.  This is a generator: every time a chunk finishes it yields
+    a `SweepUpdate` with the running success count, number of trials so
+    far and the Wilson score interval for that plane size, so callers
+    can watch the intervals tighten while the sweep is still going.
+
+    `seed` can be anything `numpy.random.SeedSequence` accepts (or a
+    SeedSequence itself).  Every work unit gets its own child stream,
+    so the final counts are the same for any number of `processes`.
+    Passing `processes = 1` runs everything in this process.
+
+    With a fixed `seed` and a `plane_cache.PlaneResultCache` as `cache`,
+    chunks that an earlier run already simulated are read back instead
+    of rerun, so raising K only costs the new chunks and the old last
+    chunk, if it was partial.
+
+    `scenario` runs a named `plane_variants` scenario instead of the
+    classic crazy plane.
+    '''
+    root_seed = seeding.as_seed_sequence(seed)
+    units = [(n_idx, N, n_trials, unit_seed(root_seed, N, chunk_idx))
+             for n_idx, N, chunk_idx, n_trials
+             in make_work_units(N_vector, K, chunk_size)]
+
+    successes = [0] * len(N_vector)
+    trials = [0] * len(N_vector)
+
+    def updates(results):
+        for n_idx, unit_successes, unit_trials, _ in results:
+            successes[n_idx] += unit_successes
+            trials[n_idx] += unit_trials
+            lower, upper = proportion_confint(count = successes[n_idx],
+                                              nobs = trials[n_idx],
+                                              alpha = 1 - conf_level,
+                                              method = 'wilson')
+            yield SweepUpdate(N_vector[n_idx], successes[n_idx],
+                              trials[n_idx], lower, upper)
+
+    if processes == 1:
+        yield from updates(run_units(units, cache = cache, scenario = scenario))
+        return
+
+    with mp.Pool(processes) as pool:
+        yield from updates(run_units(units, pool = pool, cache = cache,
+                                     scenario = scenario))
+
+def run_sweep(K, N_vector, **kwargs):
+    '''
+    Runs `sweep_plane_sizes` to completion and returns a list of
+    (successes, trials) pairs lined up with `N_vector`.
+    '''
+    totals = {}
+    for update in sweep_plane_sizes(K, N_vector, **kwargs):
+        totals[update.N] = (update.successes, update.trials)
+    return [totals[N] for N in N_vector]
+
+def batch_schedule(max_K, first_batch):
+    '''
+    Batch sizes for the adaptive sweep: start at `first_batch` and double
+    every round until the cumulative total reaches `max_K`.
+    '''
+    batches = []
+    total = 0
+    batch = first_batch
+    while total < max_K:
+        batches.append(min(batch, max_K - total))
+        total += batches[-1]
+        batch *= 2
+    return batches
+
+def adaptive_sweep(max_K, N_vector, target_halfwidth = 0.01,
+                   conf_level = 0.95, null_prop = 0.5, first_batch = 1000,
+                   seed = None, processes = None, cache = None,
+                   scenario = None, stream = ADAPTIVE_STREAM):
+    '''
+    Like `run_sweep`, but instead of spending `max_K` trials on every
+    plane size, runs doubling batches of trials and stops a plane size
+    as soon as its Wilson interval has a half-width of at most
+    `target_halfwidth`, or no longer contains `null_prop`.  Returns one
+    `AdaptiveResult` per entry in `N_vector`, including how many trials
+    it ended up using and why it stopped ('halfwidth', 'excludes_null'
+    or 'max_trials').
+
+    Peeking at the interval after every batch would normally inflate
+    the error rate, so the miss probability 1 - conf_level is split
+    evenly (Bonferroni) over the planned number of looks, and every
+    interval, including the reported one, is built at that stricter
+    level.  The reported intervals therefore still cover the true rate
+    with probability at least `conf_level`.
+
+    Batch b at plane size N is seeded from the (N, `stream`, b) stream;
+    by default that's `ADAPTIVE_STREAM`, so its trials are independent of
+    a `run_sweep` with the same seed.  `cache` and `scenario` work the
+    same way as in `sweep_plane_sizes`.
+    '''
+    if max_K < 1:
+        raise ValueError('max_K must be at least 1, got %r' % (max_K,))
+    if first_batch < 1:
+        raise ValueError('first_batch must be at least 1, got %r' % (first_batch,))
+    root_seed = seeding.as_seed_sequence(seed)
+    batches = batch_schedule(max_K, first_batch)
+    look_alpha = (1 - conf_level) / len(batches)
+
+    successes = [0] * len(N_vector)
+    trials = [0] * len(N_vector)
+    intervals = [(0.0, 1.0)] * len(N_vector)
+    stop_reasons = [None] * len(N_vector)
+    chunks_used = [0] * len(N_vector)
+
+    pool = mp.Pool(processes) if processes != 1 else None
+    try:
+        for batch in batches:
+            active = [n_idx for n_idx in range(len(N_vector))
+                      if stop_reasons[n_idx] is None]
+            if not active:
+                break
+            units = []
+            for n_idx in active:
+                units.append((n_idx, N_vector[n_idx], batch,
+                              unit_seed(root_seed, N_vector[n_idx],
+                                        chunks_used[n_idx], stream)))
+                chunks_used[n_idx] += 1
+            results = run_units(units, pool = pool, cache = cache,
+                                scenario = scenario)
+            for n_idx, unit_successes, unit_trials, _ in results:
+                successes[n_idx] += unit_successes
+                trials[n_idx] += unit_trials
+
+            for n_idx in active:
+                lower, upper = proportion_confint(count = successes[n_idx],
+                                                  nobs = trials[n_idx],
+                                                  alpha = look_alpha,
+                                                  method = 'wilson')
+                intervals[n_idx] = (lower, upper)
+                if (upper - lower) / 2 <= target_halfwidth:
+                    stop_reasons[n_idx] = 'halfwidth'
+                elif not lower <= null_prop <= upper:
+                    stop_reasons[n_idx] = 'excludes_null'
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    return [AdaptiveResult(N, successes[n_idx], trials[n_idx],
+                           intervals[n_idx][0], intervals[n_idx][1],
+                           stop_reasons[n_idx] or 'max_trials')
+            for n_idx, N in enumerate(N_vector)]
+
+if __name__ == '__main__':
+    K = int(input("Choose number of trials at each N: "))
+    scenario = input("Choose a scenario (%s, blank for classic): "
+                     % ', '.join(sorted(pv.SCENARIOS))) or None
+    N_vector = [int(b) for b in np.linspace(10, 200, 20)]
+    for update in sweep_plane_sizes(K, N_vector, seed = 2017, scenario = scenario):
+        print('N = %s: %s / %s successes, interval (%.4f, %.4f)' % update)
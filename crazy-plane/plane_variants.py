@@ -0,0 +1,152 @@
+from collections import namedtuple
+
+import numpy as np
+import repo_path
+import seeding
+
+def plane_process_variant(N, K, crazy_positions = (1,), seat_weights = None,
+                          rng = None, chunk_size = None):
+    '''
+    Generalized version of `plane_process_batch`: runs K trials of a
+    crazy plane with N seats and returns a length-K array of ones
+    (the last passenger got seat N) and zeros.
+
+    * `crazy_positions` are the boarding positions (1-based, like the
+      passenger numbers in `plane_process`) of the passengers who ignore
+      their boarding pass and pick a random free seat even when their
+      own seat is open.  The default is the classic single crazy first
+      passenger.
+    * `seat_weights` is an optional length-N array of positive weights;
+      whenever anyone (crazy or displaced) picks a random seat, each free
+      seat is chosen with probability proportional to its weight.  None
+      means uniform, which makes the classic scenario match
+      `plane_process` exactly.
+
+    Unlike `plane_process_batch` there's no single-extra-seat shortcut
+    once several passengers are crazy, so every trial carries its own
+    row of seat occupancy.  Passengers still board one at a time, but
+    each step handles all the trials at once, and the weighted draw
+    only happens for the trials where that passenger actually has to
+    choose, over the seats that can still be free.  Trials are processed
+    `chunk_size` at a time (by default, enough for about 16MB of
+    occupancy) to keep the memory bounded.
+    '''
+    rng = seeding.get_rng(rng)
+    if chunk_size is None:
+        chunk_size = max(1, 2 ** 24 // N)
+    if seat_weights is None:
+        seat_weights = np.ones(N)
+    seat_weights = np.asarray(seat_weights, dtype = float)
+    if seat_weights.shape != (N,) or (seat_weights <= 0).any():
+        raise ValueError('seat_weights must be %s positive weights' % N)
+    crazy = np.zeros(N + 1, dtype = bool)
+    crazy[[p for p in crazy_positions if 1 <= p < N]] = True
+    # 0-based seats of crazy passengers, who can leave their own seat free.
+    crazy_seats = np.flatnonzero(crazy) - 1
+
+    results = np.empty(K, dtype = int)
+    for start in range(0, K, chunk_size):
+        n_trials = min(chunk_size, K - start)
+        # occupied[s, t] is True once seat s + 1 is taken in trial t.  Seats
+        # go down the rows so each passenger's check is one contiguous row.
+        occupied = np.zeros((N, n_trials), dtype = bool)
+        for passenger in range(1, N):
+            if crazy[passenger]:
+                choosers = np.arange(n_trials)
+            else:
+                choosers = np.flatnonzero(occupied[passenger - 1])
+                occupied[passenger - 1] = True
+            if choosers.size == 0:
+                continue
+            # Every earlier non-crazy passenger's seat is taken by now, so
+            # the only seats worth looking at are the crazy passengers'
+            # and this passenger's onwards.
+            candidates = np.concatenate([crazy_seats[crazy_seats < passenger - 1],
+                                         np.arange(passenger - 1, N)])
+            # Only a handful of candidates are ever taken (by earlier random
+            # choosers), so first try a plain weighted draw over all of them
+            # and keep it if the seat is free; that's the same as drawing
+            # among the free seats.
+            cand_weights = seat_weights[candidates]
+            cand_cum = np.cumsum(cand_weights)
+            picks = np.searchsorted(cand_cum, rng.random(choosers.size) * cand_cum[-1],
+                                    side = 'right')
+            free = ~occupied[candidates[picks], choosers]
+            occupied[candidates[picks[free]], choosers[free]] = True
+            choosers = choosers[~free]
+            if choosers.size == 0:
+                continue
+            # The rest pick among their free seats exactly by inverting
+            # the cumulative weights of that trial.
+            free_weights = np.where(occupied[candidates[:, None], choosers], 0,
+                                    cand_weights[:, None])
+            cum_weights = np.cumsum(free_weights, axis = 0)
+            targets = rng.random(choosers.size) * cum_weights[-1]
+            picks = (cum_weights <= targets).sum(axis = 0)
+            occupied[candidates[picks], choosers] = True
+        results[start:start + n_trials] = ~occupied[N - 1]
+    return results
+
+def row_seat_weights(N, seats_per_row = 6, window = 1.0, middle = 1.0,
+                     aisle = 1.0):
+    '''
+    Seat weights for a plane laid out in rows of `seats_per_row` seats
+    with one aisle down the middle (seat 1 is the first window seat).
+    Window seats get weight `window`, the seats next to the aisle get
+    `aisle` and everything in between gets `middle`.
+    '''
+    weights = np.full(N, float(middle))
+    position = np.arange(N) % seats_per_row
+    half = seats_per_row // 2
+    weights[(position == half - 1) | (position == half)] = aisle
+    weights[(position == 0) | (position == seats_per_row - 1)] = window
+    return weights
+
+Scenario = namedtuple('Scenario', ['name', 'description', 'crazy_positions',
+                                   'seat_weights'])
+
+SCENARIOS = {}
+
+def register_scenario(name, description, crazy_positions = lambda N: (1,),
+                      seat_weights = lambda N: None):
+    '''
+    Adds a named scenario to `SCENARIOS`.  Both `crazy_positions` and
+    `seat_weights` are functions of the plane size N, so one scenario
+    can be swept over many plane sizes.
+    '''
+    SCENARIOS[name] = Scenario(name, description, crazy_positions, seat_weights)
+    return SCENARIOS[name]
+
+def get_scenario(name):
+    try:
+        return SCENARIOS[name]
+    except KeyError:
+        raise KeyError('Unknown scenario %r, pick one of: %s'
+                       % (name, ', '.join(sorted(SCENARIOS))))
+
+def run_scenario(name, N, K, rng = None):
+    '''Runs K trials of the named scenario on a plane with N seats.
+    '''
+    scenario = get_scenario(name)
+    return plane_process_variant(N, K,
+                                 crazy_positions = scenario.crazy_positions(N),
+                                 seat_weights = scenario.seat_weights(N),
+                                 rng = rng)
+
+register_scenario('classic', 'One crazy first passenger, uniform seat choice')
+register_scenario('two_crazy', 'The first two passengers both sit at random',
+                  crazy_positions = lambda N: (1, 2))
+register_scenario('crazy_midway', 'The passenger halfway down the line is the crazy one',
+                  crazy_positions = lambda N: (max(1, N // 2),))
+register_scenario('crazy_first_and_last', 'The first and second to last passengers are crazy',
+                  crazy_positions = lambda N: (1, N - 1))
+register_scenario('window_lovers', 'Random choosers are three times as likely to take a window seat',
+                  seat_weights = lambda N: row_seat_weights(N, window = 3.0))
+register_scenario('aisle_lovers', 'Random choosers are three times as likely to take an aisle seat',
+                  seat_weights = lambda N: row_seat_weights(N, aisle = 3.0))
+
+if __name__ == '__main__':
+    rng = seeding.get_rng(2017)
+    for name, scenario in sorted(SCENARIOS.items()):
+        rate = run_scenario(name, 100, 20000, rng).mean()
+        print('%-22s %.4f  %s' % (name, rate, scenario.description))
@@ -0,0 +1,213 @@
+'''
+Headless renderer for batches of cumulative success rate figures.
+
+    python render_figures.py --job 100:1000:2x2 --job 200:100000:1x1 \
+        --out-dir singleplane_plots --seed 2017 --processes 8
+
+Each job is N:K:XxY, i.e. K trials on an N seat plane repeated on an
+X by Y grid of subplots, the same figure `K_trials_planesize_N.py` makes.
+Jobs can also be listed one per line in a file passed to --jobs-file.
+
+One pool of worker processes does all the work.  First it simulates
+every distinct (N, K, batch) the jobs need, one curve per task, and
+sends back only the downsampled curve.  The parent packs those into one
+`multiprocessing.shared_memory` block, and the same workers, running
+matplotlib's Agg backend, attach to it and draw the figures in
+parallel, so no job re-simulates (or re-pickles) another job's trials.
+'''
+import argparse
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import cumulative_stream as cs
+import plane_cache as pc
+import plane_sweep as ps
+import repo_path
+import seeding
+
+def parse_job(text):
+    '''Parses 'N:K:XxY' (or just 'N:K' for a single plot) into a job.
+    '''
+    parts = text.strip().split(':')
+    if len(parts) not in (2, 3):
+        raise argparse.ArgumentTypeError('Jobs look like N:K:XxY, got %r' % text)
+    grid_x, grid_y = (1, 1) if len(parts) == 2 else \
+        [int(g) for g in parts[2].lower().split('x')]
+    return int(parts[0]), int(parts[1]), grid_x, grid_y
+
+def pack_curves(curves):
+    '''
+    Copies a {key: CumulativeCurve} dict into one shared memory block.
+    Returns the block and an index of
+    key -> (offset, n_points, successes, trials), where the curve's X
+    values start at `offset` and its Y values right after them.
+    '''
+    total = sum(2 * len(curve.X) for curve in curves.values())
+    shm = shared_memory.SharedMemory(create = True, size = max(total, 1) * 8)
+    try:
+        buf = np.ndarray((total,), dtype = np.float64, buffer = shm.buf)
+        index = {}
+        offset = 0
+        for key, curve in curves.items():
+            n_points = len(curve.X)
+            buf[offset:offset + n_points] = curve.X
+            buf[offset + n_points:offset + 2 * n_points] = curve.Y
+            index[key] = (offset, n_points, curve.successes, curve.trials)
+            offset += 2 * n_points
+        del buf
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    return shm, index
+
+def unpack_curve(buf, entry):
+    '''Builds a CumulativeCurve whose arrays are views into `buf`.
+    '''
+    offset, n_points, successes, trials = entry
+    return cs.CumulativeCurve(buf[offset:offset + n_points],
+                              buf[offset + n_points:offset + 2 * n_points],
+                              successes, trials)
+
+def read_curves(shm_name, entries):
+    '''Copies the curves at `entries` (values of a `pack_curves` index)
+    out of the shared block called `shm_name`.  The block is only open
+    for the copy, and closed again even if that fails.
+    '''
+    # Workers talk to the parent's resource tracker, so attaching here
+    # doesn't hand ownership over; the parent still unlinks the block.
+    shm = shared_memory.SharedMemory(name = shm_name)
+    try:
+        buf = np.ndarray((shm.size // 8,), dtype = np.float64, buffer = shm.buf)
+        curves = [unpack_curve(buf, entry) for entry in entries]
+        curves = [curve._replace(X = curve.X.copy(), Y = curve.Y.copy())
+                  for curve in curves]
+        # No views into the block can be left when it's closed.
+        del buf
+    finally:
+        shm.close()
+    return curves
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _simulate_curve(task):
+    N, K, b, root_seed, cache_path, max_points, downsample = task
+    # sqlite connections don't travel between processes, so every task
+    # opens the cache file for itself, read-only: what it would write
+    # goes back to the parent, the only process that writes the file.
+    cache = pc.PlaneResultCache(cache_path, read_only = True) if cache_path else None
+    try:
+        chunks = ps.iter_outcome_chunks(N, K, seed = root_seed, stream = b,
+                                        cache = cache)
+        curve = cs.cumulative_curve(chunks, K, max_points = max_points,
+                                    method = downsample)
+    finally:
+        if cache:
+            cache.close()
+    writes = (cache.touched, cache.pending) if cache else None
+    return (N, K, b), curve, writes
+
+def _render_job(task):
+    # Imported here, after the Agg switch, so the parent never pulls
+    # in pyplot.
+    from matplotlib import pyplot as plt
+    import K_trials_planesize_N as kp
+
+    (N, K, grid_x, grid_y), shm_name, entries, out_dir = task
+    curves = read_curves(shm_name, entries)
+    fig = kp.draw_cumulative_curves(curves, K, N, pltgrid_x = grid_x,
+                                    pltgrid_y = grid_y)
+    path = os.path.join(out_dir, '%s_%sx%s.png'
+                        % (kp.cumulative_plot_label(K, N), grid_x, grid_y))
+    fig.savefig(path, dpi = fig.dpi)
+    plt.close(fig)
+    return path
+
+def simulate_jobs(jobs, seed = None, cache = None, max_points = 2000,
+                  downsample = 'lttb', pool = None):
+    '''
+    Computes the curve for every distinct (N, K, batch) the jobs need,
+    one `pool` task per curve (or in this process, without a pool).
+    Jobs sharing N and K share batches, so a 1x1 and a 2x2 figure of
+    the same plane reuse the first batch.  `cache` is a
+    `plane_cache.PlaneResultCache`; the tasks read its file, and what
+    they simulate is written to it here as they finish.
+    '''
+    root_seed = seeding.as_seed_sequence(seed)
+    cache_path = cache.path if cache is not None else None
+    keys = []
+    for N, K, grid_x, grid_y in jobs:
+        keys.extend((N, K, b) for b in range(grid_x * grid_y))
+    tasks = [key + (root_seed, cache_path, max_points, downsample)
+             for key in dict.fromkeys(keys)]
+    results = map(_simulate_curve, tasks) if pool is None \
+        else pool.imap_unordered(_simulate_curve, tasks)
+    curves = {}
+    for key, curve, writes in results:
+        if writes:
+            cache.apply(*writes)
+        curves[key] = curve
+    return curves
+
+def render_jobs(jobs, out_dir, seed = None, processes = None, cache = None,
+                max_points = 2000, downsample = 'lttb'):
+    '''
+    Simulates everything `jobs` needs and renders the figures, both in
+    one pool of `processes` Agg workers.  Returns the paths written.
+    '''
+    os.makedirs(out_dir, exist_ok = True)
+    with mp.Pool(processes, initializer = _init_worker) as pool:
+        curves = simulate_jobs(jobs, seed = seed, cache = cache,
+                               max_points = max_points,
+                               downsample = downsample, pool = pool)
+        shm, index = pack_curves(curves)
+        try:
+            tasks = [(job, shm.name,
+                      [index[(job[0], job[1], b)] for b in range(job[2] * job[3])],
+                      out_dir)
+                     for job in jobs]
+            return pool.map(_render_job, tasks)
+        finally:
+            shm.close()
+            shm.unlink()
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__.strip().split('\n')[0])
+    parser.add_argument('--job', type = parse_job, action = 'append', default = [],
+                        help = 'N:K:XxY, may be repeated')
+    parser.add_argument('--jobs-file', help = 'file with one N:K:XxY job per line')
+    parser.add_argument('--out-dir', default = 'rendered_plots')
+    parser.add_argument('--seed', type = int, default = None)
+    parser.add_argument('--processes', type = int, default = None)
+    parser.add_argument('--max-points', type = int, default = 2000)
+    parser.add_argument('--downsample', choices = ['lttb', 'log'], default = 'lttb')
+    parser.add_argument('--cache', action = 'store_true',
+                        help = 'reuse/store trials in %s' % pc.DEFAULT_CACHE_NAME)
+    args = parser.parse_args(argv)
+
+    jobs = list(args.job)
+    if args.jobs_file:
+        with open(args.jobs_file) as f:
+            jobs += [parse_job(line) for line in f if line.strip()]
+    if not jobs:
+        parser.error('no jobs given')
+
+    cache = pc.PlaneResultCache() if args.cache else None
+    try:
+        paths = render_jobs(jobs, args.out_dir, seed = args.seed,
+                            processes = args.processes, cache = cache,
+                            max_points = args.max_points,
+                            downsample = args.downsample)
+    finally:
+        if cache:
+            cache.close()
+    for path in paths:
+        print(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+'''
+Puts the repository root on `sys.path`, so the modules in this
+directory can `import seeding` whether they're run as scripts or
+imported from `benchmarks` or the tests.  Import this right before
+`seeding`; it's the only place in the project that touches the path.
+'''
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
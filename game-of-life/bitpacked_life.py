@@ -0,0 +1,289 @@
+from collections import Counter, defaultdict
+from pprint import pprint
+from typing import List
+
+import numpy as np
+
+from game_of_life import CellStates, GameOfLife, check_boundary, zobrist_grid
+from rules import CONWAY
+
+WORD_BITS = 64
+ONE = np.uint64(1)
+HIGH_SHIFT = np.uint64(WORD_BITS - 1)
+_BYTE_POPCOUNTS = np.array([bin(b).count('1') for b in range(256)], dtype = np.uint8)
+
+
+def popcount(words:np.ndarray) -> int:
+    '''Number of set bits in an array of uint64 words.
+    '''
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum(dtype = np.int64))
+    # Older NumPy: look up each byte instead.
+    return int(_BYTE_POPCOUNTS[words.view(np.uint8)].sum(dtype = np.int64))
+
+
+def pack_board(board) -> np.ndarray:
+    '''Packs a board of zeros and ones (nested lists or a 2D array) into a
+    (n_rows, ceil(n_cols / 64)) uint64 array.  Cell (r, c) is bit c % 64 of
+    word [r, c // 64], counting from the least significant bit; bits past
+    the last column are always zero.
+    '''
+    cells = np.asarray(board, dtype = np.uint8)
+    n_rows, n_cols = cells.shape
+    n_words = -(-n_cols // WORD_BITS)
+    packed = np.zeros((n_rows, n_words * 8), dtype = np.uint8)
+    packed[:, :-(-n_cols // 8)] = np.packbits(cells, axis = 1, bitorder = 'little')
+    return packed.view('<u8').astype(np.uint64)
+
+
+def unpack_board(words:np.ndarray, n_cols:int) -> np.ndarray:
+    '''Inverse of `pack_board`, as a (n_rows, n_cols) uint8 array.
+    '''
+    as_bytes = np.ascontiguousarray(words).astype('<u8').view(np.uint8)
+    return np.unpackbits(as_bytes, axis = 1, count = n_cols, bitorder = 'little')
+
+
+class BitPackedGameOfLife(GameOfLife):
+    '''
+    Game of Life on a bit-packed board: 64 cells to a uint64 word, so a
+    board takes n_rows * n_cols / 8 bytes and every bitwise operation
+    updates 64 cells at once.
+
+    A generation adds up the eight neighbor bits of every cell with
+    bitwise full adders.  Each row's west and east neighbors are the row
+    shifted by one bit, with the bit that crosses a word boundary carried
+    in from the next word over.  The three-cell sum of the rows above and
+    below and the two-cell sum of the cell's own row are each a 2-bit
+    number, (sum bit, carry bit).  A cell lives next generation when the
+    total is 3, or 2 and it's alive now.  Both cases mean the weight-2
+    part of the total is exactly 1, so the rule comes down to
+    `exactly_one(twos) & (ones | alive)`.
+
+    Any other life-like rule adds the weight-2 bits up the rest of the way,
+    into a 4-bit count, and ORs together a match for every neighbor count
+    in `rule_table` that gives birth or survival.
+
+    On a torus, the band's rows above and below wrap round, and so do the
+    bits shifted in at either end of a row.  An infinite board grows by
+    whole words on the left, so every cell keeps its bit position.
+
+    The board is stepped `band_rows` rows at a time into a second buffer,
+    so the temporaries stay small even when the board itself is huge.
+    `generation_stats` gets the same Counters as `GameOfLife`, from
+    popcounts of the births, deaths and survivors.
+    '''
+
+    state_names = [state.name for state in CellStates]
+
+    def __init__(self, board: List[list], band_words:int = 2 ** 20, rule:str = CONWAY,
+                 boundary:str = 'edge'):
+        '''Takes the same nested-list board as `GameOfLife` (or a 2D array of
+        zeros and ones) and packs it.  To build a board too big to ever
+        exist unpacked, use `from_words`.
+        '''
+        cells = np.asarray(board, dtype = np.uint8)
+        if cells.ndim != 2:
+            raise ValueError(f"Board must be 2D, got shape {cells.shape}")
+        self._setup(pack_board(cells), cells.shape[1], band_words, rule, boundary)
+
+
+    @classmethod
+    def from_words(cls, words:np.ndarray, n_cols:int, band_words:int = 2 ** 20,
+                   rule:str = CONWAY, boundary:str = 'edge'):
+        '''Builds a game straight from a packed (n_rows, n_words) uint64
+        array laid out like `pack_board`'s.  Takes ownership of `words`.
+        '''
+        game = cls.__new__(cls)
+        game._setup(np.asarray(words, dtype = np.uint64), n_cols, band_words, rule, boundary)
+        return game
+
+
+    def _setup(self, words:np.ndarray, n_cols:int, band_words:int, rule:str,
+               boundary:str) -> None:
+        self._set_rule(rule)
+        self.band_words = band_words
+        self._set_words(words, n_cols)
+        self.boundary = check_boundary(boundary, self.n_rows, self.n_cols, self.rule_table)
+        self.origin_row = 0
+        self.origin_col = 0
+        self.generation_index = 0
+        self.neighbor_lookup = self._make_neighbor_mapping()
+        self.generation_stats = defaultdict(dict)
+        self.board_hash = None
+
+
+    def _set_words(self, words:np.ndarray, n_cols:int) -> None:
+        self.words = words
+        self.n_rows = words.shape[0]
+        self.n_cols = n_cols
+        self.n_words = words.shape[1]
+        if self.n_words != -(-n_cols // WORD_BITS):
+            raise ValueError(f"{n_cols} columns need {-(-n_cols // WORD_BITS)} "
+                             f"words per row, got {self.n_words}")
+        self.band_rows = max(1, self.band_words // max(1, self.n_words))
+        self._next_words = np.empty_like(words)
+        # Clears the unused bits past the last column.
+        self._last_word_mask = np.uint64((1 << (n_cols - (self.n_words - 1) * WORD_BITS)) - 1)
+        self._last_bit = np.uint64((n_cols - 1) % WORD_BITS)
+        self.words[:, -1] &= self._last_word_mask
+
+
+    @property
+    def board(self) -> List[list]:
+        '''The board as nested lists, the way `GameOfLife` stores it.  This
+        unpacks the whole thing, so it's for small boards and debugging.
+        '''
+        return self.board_as_list()
+
+
+    def board_as_list(self) -> List[list]:
+        return unpack_board(self.words, self.n_cols).tolist()
+
+
+    def zobrist_keys(self) -> np.ndarray:
+        '''One random odd 64-bit multiplier per word instead of a key per
+        cell, which would take 64 times the memory of the board.  The hash is
+        the XOR of every word times its multiplier (mod 2 ** 64).  It's
+        cheap enough to just recompute after every generation.
+        '''
+        if getattr(self, '_zobrist_keys', None) is None:
+            # By word coordinates, which growth keeps since the board only
+            # ever grows by whole words on the left.
+            keys = zobrist_grid(np.arange(self.n_rows) + self.origin_row,
+                                np.arange(self.n_words) + self.origin_col // WORD_BITS)
+            self._zobrist_keys = keys | ONE
+        return self._zobrist_keys
+
+
+    def compute_board_hash(self) -> int:
+        return int(np.bitwise_xor.reduce((self.words * self.zobrist_keys()).ravel()))
+
+
+    def start_hashing(self) -> None:
+        self.board_hash = self.compute_board_hash()
+
+
+    def is_cell_alive(self, row_idx:int, col_idx:int) -> bool:
+        word = self.words[row_idx, col_idx // WORD_BITS]
+        return bool((int(word) >> (col_idx % WORD_BITS)) & 1)
+
+
+    def _step_band(self, start:int, stop:int, out:np.ndarray) -> tuple:
+        '''Computes the next generation of rows start..stop-1 into `out`, and
+        returns a (births, deaths, survivors) popcount triple.
+        '''
+        words = self.words
+        torus = self.boundary == 'torus'
+        # Rows start-1 through stop, with zero rows past the board edges.
+        if torus:
+            ext = words[np.arange(start - 1, stop + 1) % self.n_rows]
+        else:
+            ext = np.zeros((stop - start + 2, self.n_words), dtype = np.uint64)
+            lo, hi = max(start - 1, 0), min(stop + 1, self.n_rows)
+            ext[lo - (start - 1):hi - (start - 1)] = words[lo:hi]
+
+        west = ext << ONE
+        west[:, 1:] |= ext[:, :-1] >> HIGH_SHIFT
+        east = ext >> ONE
+        east[:, :-1] |= ext[:, 1:] << HIGH_SHIFT
+        if torus:
+            west[:, 0] |= (ext[:, -1] >> self._last_bit) & ONE
+            east[:, -1] |= (ext[:, 0] & ONE) << self._last_bit
+
+        # Three-cell sums of every row, and the two-cell sums of the middle.
+        west_xor_east = west ^ east
+        sum3 = west_xor_east ^ ext
+        carry3 = (west & east) | (ext & west_xor_east)
+        sum2 = west_xor_east[1:-1]
+        carry2 = (west & east)[1:-1]
+
+        up, down = slice(0, -2), slice(2, None)
+        ones_pair = sum3[up] ^ sum2
+        ones = ones_pair ^ sum3[down]
+        ones_carry = (sum3[up] & sum2) | (sum3[down] & ones_pair)
+
+        alive = ext[1:-1]
+        if self.rule == CONWAY:
+            # Exactly one of the four weight-2 bits must be set.
+            pair_a = carry3[up] ^ carry2
+            pair_b = carry3[down] ^ ones_carry
+            both = (carry3[up] & carry2) | (carry3[down] & ones_carry)
+            exactly_one_two = (pair_a ^ pair_b) & ~both
+            np.bitwise_and(exactly_one_two, ones | alive, out = out)
+        else:
+            self._apply_rule(alive, ones, (carry3[up], carry2, carry3[down], ones_carry), out)
+        out[:, -1] &= self._last_word_mask
+        return (popcount(out & ~alive), popcount(alive & ~out), popcount(alive & out))
+
+
+    def _apply_rule(self, alive:np.ndarray, ones:np.ndarray, twos:tuple,
+                    out:np.ndarray) -> None:
+        '''Writes the next generation under any rule into `out`, given the
+        weight-1 bit of every cell's neighbor count and its four weight-2
+        bits.
+        '''
+        # Sum of the four weight-2 bits, as bits of weight 2, 4 and 8.  When
+        # the two pair sums carry, neither pair carried itself, so the
+        # weight-4 part is at most 2.
+        pair_a, pair_b = twos[0] ^ twos[1], twos[2] ^ twos[3]
+        carry_a, carry_b = twos[0] & twos[1], twos[2] & twos[3]
+        count_bits = (ones, pair_a ^ pair_b, carry_a ^ carry_b ^ (pair_a & pair_b),
+                      carry_a & carry_b)
+
+        born = np.zeros_like(alive)
+        survives = np.zeros_like(alive)
+        for n_alive in np.flatnonzero(self.rule_table.any(axis = 0)):
+            match = None
+            for place, bit in enumerate(count_bits):
+                term = bit if (n_alive >> place) & 1 else ~bit
+                match = term if match is None else match & term
+            if self.rule_table[0, n_alive]:
+                born |= match
+            if self.rule_table[1, n_alive]:
+                survives |= match
+        np.bitwise_or(born & ~alive, survives & alive, out = out)
+
+
+    def live_near_edges(self, margin:int) -> tuple:
+        n_edge_words = -(-margin // WORD_BITS)
+        left = unpack_board(self.words[:, :n_edge_words], min(self.n_cols, n_edge_words * WORD_BITS))
+        # The last columns, with their word boundaries where pack_board puts them.
+        first_word = max(0, (self.n_cols - margin) // WORD_BITS)
+        right = unpack_board(self.words[:, first_word:], self.n_cols - first_word * WORD_BITS)
+        return (bool(self.words[:margin].any()), bool(self.words[-margin:].any()),
+                bool(left[:, :margin].any()), bool(right[:, -margin:].any()))
+
+
+    def _grow(self, top:int, bottom:int, left:int, right:int) -> None:
+        '''Pads the board, with the left side rounded up to whole words.
+        '''
+        left_words = -(-left // WORD_BITS)
+        n_cols = self.n_cols + left_words * WORD_BITS + right
+        words = np.zeros((self.n_rows + top + bottom, -(-n_cols // WORD_BITS)), dtype = np.uint64)
+        words[top:top + self.n_rows, left_words:left_words + self.n_words] = self.words
+        self._set_words(words, n_cols)
+        self._after_growth(top, left_words * WORD_BITS)
+
+
+    def run_update(self, verbose = False) -> None:
+        self.grow_to_fit()
+        births = deaths = survivors = 0
+        out = self._next_words
+        for start in range(0, self.n_rows, self.band_rows):
+            stop = min(start + self.band_rows, self.n_rows)
+            band_births, band_deaths, band_survivors = self._step_band(start, stop, out[start:stop])
+            births += band_births
+            deaths += band_deaths
+            survivors += band_survivors
+        self.words, self._next_words = out, self.words
+        if self.board_hash is not None:
+            self.board_hash = self.compute_board_hash()
+
+        n_dead = self.n_rows * self.n_cols - births - deaths - survivors
+        tallies = dict(zip(self.state_names, [n_dead, survivors, births, deaths]))
+        transition_counter = Counter({name: count for name, count in tallies.items() if count})
+        self.generation_stats[self.generation_index] = transition_counter
+        if verbose:
+            print(f"Effects in generation {self.generation_index + 1}")
+            pprint(transition_counter)
+        self.generation_index += 1
@@ -1,10 +1,56 @@
-import pdb
-
-from collections import Counter, defaultdict
+import copy
+from collections import Counter, defaultdict, namedtuple
 from enum import Enum
 from pprint import pprint
 from typing import List
 
+import numpy as np
+
+from rules import CONWAY, compile_rule, rule_string
+
+# Fixed so that two games hash boards the same way.
+ZOBRIST_SEED = 2017
+
+StabilityReport = namedtuple('StabilityReport', ['stable', 'cycle_start', 'period',
+                                                 'generation_index'])
+
+# What lies past the edges of the board: nothing but dead cells ('edge'),
+# the other side of the board ('torus'), or more board, which grows
+# whenever a live cell gets close to an edge ('infinite').
+BOUNDARIES = ('edge', 'torus', 'infinite')
+
+
+def _mix64(values:np.ndarray) -> np.ndarray:
+    '''The splitmix64 finalizer, elementwise on a uint64 array (wrapping
+    round like the C original).
+    '''
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def zobrist_grid(rows:np.ndarray, cols:np.ndarray) -> np.ndarray:
+    '''Pseudo-random 64-bit keys for the grid of cells (rows[i], cols[j]),
+    as a (len(rows), len(cols)) array.  A key only depends on its cell's
+    coordinates (and ZOBRIST_SEED), so a cell keeps its key when an
+    infinite board grows around it.
+    '''
+    rows = np.asarray(rows, dtype = np.int64).view(np.uint64)
+    cols = np.asarray(cols, dtype = np.int64).view(np.uint64)
+    row_keys = _mix64(rows ^ np.uint64(ZOBRIST_SEED))
+    return _mix64(row_keys[:, None] ^ cols[None, :])
+
+
+def check_boundary(boundary:str, n_rows:int, n_cols:int, rule_table:np.ndarray) -> str:
+    if boundary not in BOUNDARIES:
+        raise ValueError(f"Unknown boundary {boundary!r}, expected one of {BOUNDARIES}")
+    if boundary == 'torus' and min(n_rows, n_cols) < 3:
+        raise ValueError(f"A torus needs at least 3 rows and columns, got {n_rows}x{n_cols}")
+    if boundary == 'infinite' and rule_table[0, 0]:
+        raise ValueError("Rules with B0 bring the whole infinite plane to life at once")
+    return boundary
+
 
 class CellStates(Enum):
     '''Not certain I see a tremendous amount of bonus value in having this be 
@@ -23,27 +69,62 @@ class GameOfLife(object):
     found here: https://www.hackerrank.com/challenges/conway
 
     For the time being, I'm assuming the non-adversarial version of this game
+
+    Any other life-like rule can be played too, by passing `rule` in B/S
+    notation (e.g. 'B36/S23' for Highlife, see `rules.py`).
+
+    `boundary` is one of BOUNDARIES.  On an 'infinite' board, every
+    generation starts by padding the board with dead cells on any side a
+    live cell has reached, so nothing ever runs into an edge.
+    `origin_row` and `origin_col` keep track of where the original top
+    left cell went.
     '''
 
     game_states = CellStates
+    # Fewest cells an infinite board grows by on a side.
+    min_growth = 8
+
+    def __init__(self, board: List[list], tile_size:int = 8, rule:str = CONWAY,
+                 boundary:str = 'edge'):
+        '''Sets up a game on `board`, a list of rows of zeros and ones.
 
-    def __init__(self, board: List[list]):
-        '''TODO: write docstring
+        The board is split into `tile_size` x `tile_size` tiles, and each
+        generation only looks at the "dirty" ones: tiles holding a cell that
+        changed last generation, or a neighbor of one.  Everything else is
+        guaranteed to stay as it is.  To start with every tile is dirty; call
+        `mark_all_dirty` after editing `board` by hand.
+
+        `rule` is compiled once into `rule_table`, a 2x9 lookup of the next
+        state by current state and live neighbor count.
         '''
         self.board = board
+        self._set_rule(rule)
         self.n_rows = len(self.board)
         self.n_cols = len(self.board[0]) 
+        self.boundary = check_boundary(boundary, self.n_rows, self.n_cols, self.rule_table)
+        self.origin_row = 0
+        self.origin_col = 0
         self.generation_index = 0
         self.neighbor_lookup = self._make_neighbor_mapping()
         self.generation_stats = defaultdict(dict)
+        self.tile_size = tile_size
+        self.mark_all_dirty()
+        self.board_hash = None
 
 
     def is_valid_board(self) -> bool:
-        '''TODO: Make sure that:
-            - each row in the board only has zeros or ones on it
-            - each row has the same number of columns
+        '''Checks that the board is a non-empty grid whose rows all have the
+        same number of columns, with only zeros and ones on them.  The cells
+        are checked as one NumPy array, so this is quick on big boards too.
         '''
-        pass
+        board = self.board
+        if not isinstance(board, np.ndarray):
+            if len(board) == 0 or len({len(row) for row in board}) != 1:
+                return False
+            board = np.asarray(board)
+        if board.ndim != 2 or board.size == 0 or not np.issubdtype(board.dtype, np.number):
+            return False
+        return bool(((board == 0) | (board == 1)).all())
 
 
     def is_valid_coordinate(self, row_idx:int, col_idx:int) -> bool:
@@ -65,39 +146,57 @@ class GameOfLife(object):
                     continue
                 new_row = row_idx + row_shift
                 new_col = col_idx + col_shift
+                if self.boundary == 'torus':
+                    new_row %= self.n_rows
+                    new_col %= self.n_cols
                 if self.is_valid_coordinate(new_row, new_col):
                     valid_coords.append((new_row, new_col))
         return valid_coords
 
 
-    def _make_neighbor_mapping(self) -> dict:
-        '''calculates neighbors for every coordinate on the board and stores 
-        them in a dictionary so we don't have to repeatedly do this on the fly.
+    def _axis_neighbors(self, n:int) -> List[tuple]:
+        '''For each of n rows (or columns), the indices of itself and the
+        rows next to it: wrapped round on a torus, and only the ones on the
+        board otherwise.
+        '''
+        if self.boundary == 'torus':
+            return [((idx - 1) % n, idx, (idx + 1) % n) for idx in range(n)]
+        return [tuple(range(max(idx - 1, 0), min(idx + 2, n))) for idx in range(n)]
+
+
+    def _make_neighbor_mapping(self) -> tuple:
+        '''The neighboring rows of every row and the neighboring columns of
+        every column.  A cell's neighbors are all the pairs of the two but
+        the cell itself, so this takes n_rows + n_cols entries instead of
+        a list of tuples per cell, and it's also what makes the torus wrap.
         '''
-        coord_to_neighbors = {}
-        for row_idx in range(self.n_rows):
-            for col_idx in range(self.n_cols):
-                coord_key = (row_idx, col_idx)
-                neighbor_coords = self._calculate_neighbors(row_idx, col_idx)
-                coord_to_neighbors[coord_key] = neighbor_coords
-        return coord_to_neighbors
+        return self._axis_neighbors(self.n_rows), self._axis_neighbors(self.n_cols)
 
 
     def get_neighbors(self, row_idx:int, col_idx:int) -> List[tuple]:
         '''Given an input row and column index, use the lookup attribute 
         we created to quickly fetch its neighbor 
         '''
-        coord_key = (row_idx, col_idx)
-        return self.neighbor_lookup[coord_key]
+        row_neighbors, col_neighbors = self.neighbor_lookup
+        return [(row, col) for row in row_neighbors[row_idx] for col in col_neighbors[col_idx]
+                if row != row_idx or col != col_idx]
 
 
     def tally_neighbor_values(self, row_idx:int, col_idx:int) -> dict:
+        '''Counts the neighbors' values.  Walks the row and column tuples
+        from `neighbor_lookup` directly, counting the cell itself along
+        with its neighbors and taking it back out at the end, so no list
+        of coordinates gets built per cell.
+        '''
+        row_neighbors, col_neighbors = self.neighbor_lookup
+        cols = col_neighbors[col_idx]
+        board = self.board
         value_tally = Counter()
-        for neighbor_coord in self.get_neighbors(row_idx, col_idx):
-            neighbor_row = neighbor_coord[0]
-            neighbor_col = neighbor_coord[1]
-            neighbor_val = self.board[neighbor_row][neighbor_col]
-            value_tally.update([neighbor_val])
+        for row in row_neighbors[row_idx]:
+            board_row = board[row]
+            for col in cols:
+                value_tally[board_row[col]] += 1
+        value_tally[board[row_idx][col_idx]] -= 1
         return value_tally
 
 
@@ -113,20 +212,27 @@ class GameOfLife(object):
         return False
 
 
+    def _set_rule(self, rule:str) -> None:
+        '''Compiles `rule` into `rule_table`, and into `_cell_transitions`,
+        the same table as nested lists of transitional states, so that the
+        per-cell update is a plain list lookup.
+        '''
+        self.rule = rule_string(rule)
+        self.rule_table = compile_rule(rule)
+        states = self.game_states
+        self._cell_transitions = [
+            [(states.DEAD_TO_ALIVE if born else states.DEAD).value
+             for born in self.rule_table[0]],
+            [(states.ALIVE if survives else states.ALIVE_TO_DEAD).value
+             for survives in self.rule_table[1]]]
+
+
     def get_new_value(self, is_live_cell:bool, value_tally:dict) -> int:
-        '''Applies the conditions of the game as specified in the problem 
-        description
+        '''Applies the game's rule, as looked up in its compiled table
         '''
         n_alive = value_tally[self.game_states.ALIVE.value]
         n_alive += value_tally[self.game_states.ALIVE_TO_DEAD.value]
-        if is_live_cell: 
-            if (n_alive == 2) or (n_alive == 3):
-                return self.game_states.ALIVE.value
-            return self.game_states.ALIVE_TO_DEAD.value 
-        else:
-            if n_alive == 3:
-                return self.game_states.DEAD_TO_ALIVE.value
-            return self.game_states.DEAD.value
+        return self._cell_transitions[is_live_cell][n_alive]
 
 
     def update_this_cell(self, row_idx: int, col_idx:int, verbose = False) -> None:
@@ -146,10 +252,80 @@ class GameOfLife(object):
         self.board[row_idx][col_idx] = next_value
 
 
+    def mark_all_dirty(self) -> None:
+        '''Makes the next generation look at every cell again, recounts the
+        live cells, and forgets their bounding box until it's next needed.
+        '''
+        n_tile_rows = -(-self.n_rows // self.tile_size)
+        n_tile_cols = -(-self.n_cols // self.tile_size)
+        self.dirty_tiles = {(tile_row, tile_col) for tile_row in range(n_tile_rows)
+                            for tile_col in range(n_tile_cols)}
+        alive = self.game_states.ALIVE.value
+        self.n_alive = sum(row.count(alive) for row in self.board)
+        self._live_box = None
+        self._live_box_stale = True
+
+
+    @property
+    def live_box(self) -> list:
+        '''[top, bottom, left, right] of the live cells (inclusive), or None
+        if there aren't any.  Only worked out from the board when it's
+        first asked for after `mark_all_dirty` (so only infinite boards
+        ever pay for it); after that, births stretch it as they happen.
+        Deaths don't shrink it until the next recount, so it can be
+        bigger than the live cells, never smaller.
+        '''
+        if self._live_box_stale:
+            self._live_box = self._find_live_box()
+            self._live_box_stale = False
+        return self._live_box
+
+
+    def _find_live_box(self) -> list:
+        '''The exact `live_box`.  The searches all run in C, through `in`
+        and list.index.
+        '''
+        alive = self.game_states.ALIVE.value
+        live_rows = [row_idx for row_idx, row in enumerate(self.board) if alive in row]
+        if not live_rows:
+            return None
+        n_cols = self.n_cols
+        rows = [self.board[row_idx] for row_idx in live_rows]
+        return [live_rows[0], live_rows[-1],
+                min(row.index(alive) for row in rows),
+                max(n_cols - 1 - row[::-1].index(alive) for row in rows)]
+
+
+    def dirty_cells(self) -> List[tuple]:
+        '''Coordinates of every cell in a dirty tile, tile by tile.
+        '''
+        cells = []
+        size = self.tile_size
+        for tile_row, tile_col in sorted(self.dirty_tiles):
+            for row_idx in range(tile_row * size, min((tile_row + 1) * size, self.n_rows)):
+                for col_idx in range(tile_col * size, min((tile_col + 1) * size, self.n_cols)):
+                    cells.append((row_idx, col_idx))
+        return cells
+
+
+    def mark_dirty_around(self, row_idx:int, col_idx:int) -> None:
+        '''Marks the tiles of a cell and its neighbors dirty for next
+        generation.
+        '''
+        size = self.tile_size
+        row_neighbors, col_neighbors = self.neighbor_lookup
+        for row in row_neighbors[row_idx]:
+            for col in col_neighbors[col_idx]:
+                self.dirty_tiles.add((row // size, col // size))
+
+
     def calculate_cell_updates(self, verbose = False):
-        for row_idx in range(self.n_rows):
-            for col_idx in range(self.n_cols):
-                self.update_this_cell(row_idx, col_idx, verbose = verbose)
+        '''Marks each cell in a dirty tile with its update value.  Cells in
+        clean tiles can't change, so they're left alone.
+        '''
+        self.pending_cells = self.dirty_cells()
+        for row_idx, col_idx in self.pending_cells:
+            self.update_this_cell(row_idx, col_idx, verbose = verbose)
 
 
     def execute_cell_updates(self, verbose = False) -> None:
@@ -159,30 +335,215 @@ class GameOfLife(object):
 
         As a sort of debug step, we also retain a record of how many state
         transitions there were in this "generation" and store that history at 
-        the instance level.
-        '''
-        transition_counter = Counter()
-        for row_idx in range(self.n_rows):
-            for col_idx in range(self.n_cols):
-                cell_value = self.board[row_idx][col_idx]
-                cell_state = self.game_states(cell_value).name
-                if cell_state == "ALIVE_TO_DEAD":
-                    self.board[row_idx][col_idx] = self.game_states.DEAD.value
-                if cell_state == "DEAD_TO_ALIVE":
-                    self.board[row_idx][col_idx] = self.game_states.ALIVE.value
-                transition_counter.update([cell_state])
+        the instance level.  Only the cells marked by `calculate_cell_updates`
+        can be in a transitional state; every other cell is counted as DEAD or
+        ALIVE from the running count of live cells.  The cells that changed
+        decide which tiles are dirty next generation.
+        '''
+        n_births = n_deaths = 0
+        self.dirty_tiles = set()
+        for row_idx, col_idx in self.pending_cells:
+            cell_value = self.board[row_idx][col_idx]
+            if cell_value == self.game_states.ALIVE_TO_DEAD.value:
+                self.board[row_idx][col_idx] = self.game_states.DEAD.value
+                n_deaths += 1
+            elif cell_value == self.game_states.DEAD_TO_ALIVE.value:
+                self.board[row_idx][col_idx] = self.game_states.ALIVE.value
+                n_births += 1
+                self._grow_live_box(row_idx, col_idx)
+            else:
+                continue
+            self.mark_dirty_around(row_idx, col_idx)
+            if self.board_hash is not None:
+                self.board_hash ^= self._zobrist_rows[row_idx][col_idx]
+
+        n_cells = self.n_rows * self.n_cols
+        tallies = {
+            self.game_states.DEAD.name: n_cells - self.n_alive - n_births,
+            self.game_states.ALIVE.name: self.n_alive - n_deaths,
+            self.game_states.DEAD_TO_ALIVE.name: n_births,
+            self.game_states.ALIVE_TO_DEAD.name: n_deaths,
+        }
+        transition_counter = Counter({name: n for name, n in tallies.items() if n})
+        self.n_alive += n_births - n_deaths
         self.generation_stats[self.generation_index] = transition_counter
         if verbose:
             print(f"Effects in generation {self.generation_index + 1}")
             pprint(transition_counter)
 
 
+    def _grow_live_box(self, row_idx:int, col_idx:int) -> None:
+        if self._live_box_stale:
+            return
+        box = self._live_box
+        if box is None:
+            self._live_box = [row_idx, row_idx, col_idx, col_idx]
+            return
+        if row_idx < box[0]:
+            box[0] = row_idx
+        elif row_idx > box[1]:
+            box[1] = row_idx
+        if col_idx < box[2]:
+            box[2] = col_idx
+        elif col_idx > box[3]:
+            box[3] = col_idx
+
+
+    def live_near_edges(self, margin:int) -> tuple:
+        '''Whether there's a live cell within `margin` cells of the top,
+        bottom, left and right edges of the board.
+
+        Goes by `live_box`, so apart from right after `mark_all_dirty`
+        this is O(1) rather than a scan of the board.  The box can be a
+        little too big, which can only make a board grow early, never
+        miss a growth.
+        '''
+        box = self.live_box
+        if box is None:
+            return (False, False, False, False)
+        top, bottom, left, right = box
+        return (top < margin, bottom >= self.n_rows - margin,
+                left < margin, right >= self.n_cols - margin)
+
+
+    def grow_to_fit(self, margin:int = 1) -> None:
+        '''On an infinite board, pads every side with a live cell within
+        `margin` cells of it, so the next `margin` generations can't reach
+        past the board.  Sides grow by an eighth of the board at a time (at
+        least `min_growth` and `margin`), so a pattern that keeps on growing
+        only makes the board resize now and then.
+        '''
+        if self.boundary != 'infinite':
+            return
+        near = self.live_near_edges(margin)
+        if not any(near):
+            return
+        rows = max(margin, self.min_growth, self.n_rows // 8)
+        cols = max(margin, self.min_growth, self.n_cols // 8)
+        self._grow(*(amount if is_near else 0
+                     for is_near, amount in zip(near, (rows, rows, cols, cols))))
+
+
+    def _grow(self, top:int, bottom:int, left:int, right:int) -> None:
+        '''Pads the board with dead cells, in whole tiles.  Cells on the old
+        edges were never checked against the new cells past them, so every
+        tile is dirty again afterwards.
+        '''
+        size = self.tile_size
+        top, bottom, left, right = (-(-amount // size) * size
+                                    for amount in (top, bottom, left, right))
+        n_cols = self.n_cols + left + right
+        self.board = ([[0] * n_cols for _ in range(top)]
+                      + [[0] * left + list(row) + [0] * right for row in self.board]
+                      + [[0] * n_cols for _ in range(bottom)])
+        self.n_rows += top + bottom
+        self.n_cols = n_cols
+        self._after_growth(top, left)
+        self.mark_all_dirty()
+
+
+    def _after_growth(self, top:int, left:int) -> None:
+        '''Catches up with a board that grew by `top` rows above it and
+        `left` columns to its left.
+        '''
+        self.origin_row -= top
+        self.origin_col -= left
+        self.neighbor_lookup = self._make_neighbor_mapping()
+        self._zobrist_keys = None
+        if self.board_hash is not None:
+            self.start_hashing()
+
+
     def run_update(self, verbose = False) -> None:
+        self.grow_to_fit()
         self.calculate_cell_updates(verbose = verbose)
         self.execute_cell_updates(verbose = verbose)
         self.generation_index += 1
 
 
+    def zobrist_keys(self) -> np.ndarray:
+        '''A random 64-bit key for every cell.  A board's Zobrist hash is the
+        XOR of the keys of its live cells, so flipping a cell just XORs its
+        key into the hash.  Keys go by board coordinates (counted from
+        the original top left cell, see `origin_row`), so growing an
+        infinite board doesn't change its hash.
+        '''
+        if getattr(self, '_zobrist_keys', None) is None:
+            self._zobrist_keys = zobrist_grid(np.arange(self.n_rows) + self.origin_row,
+                                              np.arange(self.n_cols) + self.origin_col)
+        return self._zobrist_keys
+
+
+    def compute_board_hash(self) -> int:
+        '''The Zobrist hash of the current board, from scratch.
+        '''
+        alive = np.asarray(self.board) == self.game_states.ALIVE.value
+        return int(np.bitwise_xor.reduce(self.zobrist_keys()[alive]))
+
+
+    def start_hashing(self) -> None:
+        '''Computes `board_hash` once; from then on every generation keeps it
+        up to date by XORing in the keys of the cells that flipped.
+        '''
+        self._zobrist_rows = self.zobrist_keys().tolist()
+        self.board_hash = self.compute_board_hash()
+
+
+    def board_as_list(self) -> List[list]:
+        return [list(row) for row in self.board]
+
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+
+    def live_cells(self) -> set:
+        '''Board coordinates (counted from the original top left cell) of
+        every live cell, which unlike the board itself don't depend on how
+        far an infinite board has grown.
+        '''
+        rows, cols = np.nonzero(np.asarray(self.board_as_list()) == self.game_states.ALIVE.value)
+        return set(zip((rows + self.origin_row).tolist(), (cols + self.origin_col).tolist()))
+
+
+    def repeats_after(self, period:int) -> bool:
+        '''Whether the board comes back exactly as it is now after `period`
+        more generations, checked on a copy of the game so this one stays put.
+        '''
+        twin = self.copy()
+        for _ in range(period):
+            twin.run_update()
+        return twin.live_cells() == self.live_cells()
+
+
+    def run_until_stable(self, max_generations:int, verbose = False) -> StabilityReport:
+        '''Runs `run_update` until the board repeats a state it has been in
+        before, or for `max_generations` generations, whichever comes first.
+
+        Every state seen is remembered by its Zobrist hash, which is updated
+        incrementally as cells flip, and which an infinite board keeps when
+        it grows, so cycles that started before a growth are still found
+        from where they started.  When the hash of the board matches an
+        earlier generation's, the match is confirmed exactly by checking that
+        the board really does come back after that many generations, so a
+        hash collision can't end the run early.  Returns a `StabilityReport`
+        with the first generation of the cycle and its period (1 for a still
+        life, or a board that has died out), or `stable = False` if
+        `max_generations` ran out first.
+        '''
+        self.start_hashing()
+        seen = {self.board_hash: self.generation_index}
+        for _ in range(max_generations):
+            self.run_update(verbose = verbose)
+            first_seen = seen.get(self.board_hash)
+            if first_seen is not None:
+                period = self.generation_index - first_seen
+                if self.repeats_after(period):
+                    return StabilityReport(True, first_seen, period, self.generation_index)
+            seen[self.board_hash] = self.generation_index
+        return StabilityReport(False, None, None, self.generation_index)
+
+
 if __name__ == "__main__":
 
 
@@ -207,32 +568,10 @@ if __name__ == "__main__":
         print(f"\t{state.name}: {state.value}")
     print("--------" * 5, "\n")
 
-    
-    pdb.set_trace()
-    #conway.run_update(verbose = True)
-
-
-    '''
-    TODO: because we are keeping track of generations, we can stop
-    updating the board when we see don't see transitions happening 
-    for ... say five iterations.
-
-    Manually inspecting this example board, there stops being progress 
-    made after 6 "generations" or so.
-    '''
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    report = conway.run_until_stable(max_generations = 100)
+    if report.stable:
+        print(f"From generation {report.cycle_start} the board repeats every "
+              f"{report.period} generation(s)")
+    else:
+        print(f"Still changing after {report.generation_index} generations")
+    pprint(conway.board)
@@ -0,0 +1,463 @@
+import copy
+import weakref
+from collections import Counter, defaultdict
+from pprint import pprint
+from typing import List
+
+import numpy as np
+
+from game_of_life import CellStates, GameOfLife, check_boundary
+from rules import CONWAY, compile_rule, rule_string
+
+DEAD = CellStates.DEAD.value
+ALIVE = CellStates.ALIVE.value
+# Off the edge of the board: never alive, never counts as a neighbor.
+WALL = -1
+
+
+class Node(object):
+    '''A square of 2 ** level cells in a quadtree.  Level 0 nodes are single
+    cells with a `state`; everything else has four children.  Nodes are
+    only ever made by `HashlifeUniverse`, which keeps exactly one copy of
+    each distinct square, so two nodes are equal exactly when they're the
+    same object.
+    '''
+
+    __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'population', 'state')
+
+    def __init__(self, nw, ne, sw, se, level:int, population:int, state:int = None):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+        self.state = state
+
+
+class HashlifeUniverse(object):
+    '''
+    The node store and the Hashlife recursion.
+
+    `join` hands out canonical (hash-consed) nodes from `nodes`, a dict
+    keyed by the four children, and `successor(node, j)` returns the
+    center half of a level-k node advanced by 2 ** j generations
+    (j <= k - 2), memoized in `results`.  The center of a square only
+    depends on the square, so a repeated square anywhere in space or
+    time is only ever worked out once, which is what lets a board be
+    advanced by 2 ** 30 generations at once.
+
+    Both tables are bounded.  `results` is simply cleared when it reaches
+    `max_results`, which is always safe.  `collect_garbage` rebuilds
+    `nodes` with only what the games in `games` (every game playing in
+    this universe registers itself there) still use; a game calls it
+    between power-of-two steps once there are more than `max_nodes` nodes.
+
+    Every result depends on the rule, so a universe plays one rule, and
+    games can only share a universe if they share its rule.
+    '''
+
+    def __init__(self, max_nodes:int = 2 ** 21, max_results:int = 2 ** 21,
+                 rule:str = CONWAY):
+        self.rule = rule_string(rule)
+        # rule_table as nested lists, since next_cell looks up one cell at a time.
+        self._next_states = compile_rule(rule).tolist()
+        self.max_nodes = max_nodes
+        self.max_results = max_results
+        self.leaves = {state: Node(None, None, None, None, 0, int(state == ALIVE), state)
+                       for state in (DEAD, ALIVE, WALL)}
+        self.nodes = {}
+        self.results = {}
+        # Live games only, so a game that's gone stops keeping nodes alive.
+        self.games = weakref.WeakSet()
+        self._uniform = {}
+        self._bounds = {}
+
+
+    def join(self, nw:Node, ne:Node, sw:Node, se:Node) -> Node:
+        key = (nw, ne, sw, se)
+        node = self.nodes.get(key)
+        if node is None:
+            node = Node(nw, ne, sw, se, nw.level + 1,
+                        nw.population + ne.population + sw.population + se.population)
+            self.nodes[key] = node
+        return node
+
+
+    def uniform(self, state:int, level:int) -> Node:
+        '''The level `level` node with every cell in `state`.
+        '''
+        node = self._uniform.get((state, level))
+        if node is None:
+            if level == 0:
+                node = self.leaves[state]
+            else:
+                child = self.uniform(state, level - 1)
+                node = self.join(child, child, child, child)
+            self._uniform[state, level] = node
+        return node
+
+
+    def build(self, cells:np.ndarray, level:int, row:int = 0, col:int = 0,
+              background:int = WALL) -> Node:
+        '''Node for the 2 ** level square of `cells` (which holds DEAD, ALIVE
+        or WALL) with its top left corner at (row, col).  Parts of the square
+        past the end of `cells` are `background`.
+        '''
+        size = 2 ** level
+        block = cells[row:row + size, col:col + size]
+        if block.size == 0:
+            return self.uniform(background, level)
+        if block.shape == (size, size):
+            first = block.flat[0]
+            if (block == first).all():
+                return self.uniform(int(first), level)
+        if level == 0:
+            return self.leaves[int(block[0, 0])]
+        half = size // 2
+        return self.join(self.build(cells, level - 1, row, col, background),
+                         self.build(cells, level - 1, row, col + half, background),
+                         self.build(cells, level - 1, row + half, col, background),
+                         self.build(cells, level - 1, row + half, col + half, background))
+
+
+    def fill(self, node:Node, out:np.ndarray, row:int, col:int) -> None:
+        '''Writes the live cells of `node`, whose top left corner is at
+        (row, col) in `out`'s coordinates, into `out`.  Cells outside `out`
+        are skipped, and so are empty parts of the tree.
+        '''
+        size = 2 ** node.level
+        if (node.population == 0 or row >= out.shape[0] or col >= out.shape[1]
+                or row + size <= 0 or col + size <= 0):
+            return
+        if node.level == 0:
+            out[row, col] = ALIVE
+            return
+        half = size // 2
+        self.fill(node.nw, out, row, col)
+        self.fill(node.ne, out, row, col + half)
+        self.fill(node.sw, out, row + half, col)
+        self.fill(node.se, out, row + half, col + half)
+
+
+    def bounds(self, node:Node) -> tuple:
+        '''(top, left, bottom, right) of the live cells in `node`, relative to
+        its top left corner and with bottom and right exclusive, or None if
+        it's empty.  Memoized, like everything else about a node.
+        '''
+        if node.population == 0:
+            return None
+        if node.level == 0:
+            return (0, 0, 1, 1)
+        result = self._bounds.get(node)
+        if result is None:
+            half = 2 ** (node.level - 1)
+            parts = []
+            for child, row, col in ((node.nw, 0, 0), (node.ne, 0, half),
+                                    (node.sw, half, 0), (node.se, half, half)):
+                child_bounds = self.bounds(child)
+                if child_bounds is not None:
+                    top, left, bottom, right = child_bounds
+                    parts.append((top + row, left + col, bottom + row, right + col))
+            tops, lefts, bottoms, rights = zip(*parts)
+            result = (min(tops), min(lefts), max(bottoms), max(rights))
+            if len(self._bounds) >= self.max_results:
+                self._bounds.clear()
+            self._bounds[node] = result
+        return result
+
+
+    def next_cell(self, state:int, n_alive:int) -> int:
+        '''The rule for one cell, given its live neighbor count.
+        '''
+        if state == WALL:
+            return WALL
+        return ALIVE if self._next_states[state][n_alive] else DEAD
+
+
+    def _base_step(self, node:Node) -> Node:
+        '''Center 2x2 of a 4x4 node, one generation on.
+        '''
+        quads = (node.nw, node.ne, node.sw, node.se)
+        grid = [[0] * 4 for _ in range(4)]
+        for quad_idx, quad in enumerate(quads):
+            row, col = 2 * (quad_idx // 2), 2 * (quad_idx % 2)
+            grid[row][col] = quad.nw.state
+            grid[row][col + 1] = quad.ne.state
+            grid[row + 1][col] = quad.sw.state
+            grid[row + 1][col + 1] = quad.se.state
+        new_cells = []
+        for row in (1, 2):
+            for col in (1, 2):
+                n_alive = sum(grid[row + dr][col + dc] == ALIVE
+                              for dr in (-1, 0, 1) for dc in (-1, 0, 1)
+                              if dr or dc)
+                new_cells.append(self.leaves[self.next_cell(grid[row][col], n_alive)])
+        return self.join(*new_cells)
+
+
+    def center(self, node:Node) -> Node:
+        return self.join(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+
+    def _horizontal_center(self, west:Node, east:Node) -> Node:
+        return self.join(west.ne, east.nw, west.se, east.sw)
+
+
+    def _vertical_center(self, north:Node, south:Node) -> Node:
+        return self.join(north.sw, north.se, south.nw, south.ne)
+
+
+    def successor(self, node:Node, j:int) -> Node:
+        '''The center half of `node` (level k), 2 ** j generations later, for
+        j <= k - 2.
+        '''
+        key = (node, j)
+        result = self.results.get(key)
+        if result is not None:
+            return result
+        level = node.level
+        if level == 2:
+            result = self._base_step(node)
+        else:
+            # The nine overlapping level k-1 squares covering the node.
+            squares = [node.nw, self._horizontal_center(node.nw, node.ne), node.ne,
+                       self._vertical_center(node.nw, node.sw), self.center(node),
+                       self._vertical_center(node.ne, node.se),
+                       node.sw, self._horizontal_center(node.sw, node.se), node.se]
+            if j == level - 2:
+                # Full speed: both halves of the jump go through successor.
+                parts = [self.successor(square, j - 1) for square in squares]
+                inner_j = j - 1
+            else:
+                # Slower than the node allows: no time passes in the first half.
+                parts = [self.center(square) for square in squares]
+                inner_j = j
+            result = self.join(
+                self.successor(self.join(parts[0], parts[1], parts[3], parts[4]), inner_j),
+                self.successor(self.join(parts[1], parts[2], parts[4], parts[5]), inner_j),
+                self.successor(self.join(parts[3], parts[4], parts[6], parts[7]), inner_j),
+                self.successor(self.join(parts[4], parts[5], parts[7], parts[8]), inner_j))
+        if len(self.results) >= self.max_results:
+            self.results.clear()
+        self.results[key] = result
+        return result
+
+
+    def collect_garbage(self, roots:List[Node] = ()) -> None:
+        '''Drops every node and memoized result that neither the `roots`
+        nor the root of any game in `games` uses.
+        '''
+        self.results.clear()
+        self._uniform.clear()
+        self._bounds.clear()
+        live = {}
+        stack = list(roots) + [game.root for game in self.games]
+        while stack:
+            node = stack.pop()
+            if node.level == 0:
+                continue
+            key = (node.nw, node.ne, node.sw, node.se)
+            if key in live:
+                continue
+            live[key] = node
+            stack.extend(key)
+        self.nodes = live
+
+
+class HashlifeGameOfLife(GameOfLife):
+    '''
+    `GameOfLife` run by Hashlife: `advance(n)` jumps the board n
+    generations ahead in time roughly logarithmic in n for boards that
+    settle down or repeat, and `run_update` is `advance(1)`.
+
+    The board sits in a quadtree surrounded by WALL cells, which are
+    never alive and never change, so the edges behave exactly like
+    `is_valid_coordinate` makes them behave in `GameOfLife`.  On an
+    'infinite' board the quadtree is surrounded by dead cells instead, and
+    the board is widened after every step to take in all the live cells,
+    however far they went.  A torus doesn't fit the quadtree, so that
+    boundary isn't supported.  `run_update`
+    fills in `generation_stats` like the other engines do by comparing the
+    board before and after.  `advance` skips the stats, since it never
+    visits the generations it jumps over.
+    '''
+
+    state_names = [state.name for state in CellStates]
+
+    def __init__(self, board: List[list], universe:HashlifeUniverse = None,
+                 rule:str = CONWAY, boundary:str = 'edge'):
+        cells = np.asarray(board, dtype = np.int8)
+        if cells.ndim != 2:
+            raise ValueError(f"Board must be 2D, got shape {cells.shape}")
+        if boundary == 'torus':
+            raise ValueError("HashlifeGameOfLife supports 'edge' and 'infinite' boundaries")
+        self.n_rows, self.n_cols = cells.shape
+        self.generation_index = 0
+        self.generation_stats = defaultdict(dict)
+        self.universe = universe or HashlifeUniverse(rule = rule)
+        if self.universe.rule != rule_string(rule):
+            raise ValueError(f"The universe plays {self.universe.rule}, not {rule_string(rule)}")
+        self._set_rule(rule)
+        self.boundary = check_boundary(boundary, self.n_rows, self.n_cols, self.rule_table)
+        self._background = DEAD if boundary == 'infinite' else WALL
+        # Board coordinates of the top left cell of the board, which only
+        # move on an infinite board.
+        self.origin_row = 0
+        self.origin_col = 0
+        self.neighbor_lookup = None
+        level = max(2, int(np.ceil(np.log2(max(self.n_rows, self.n_cols, 1)))))
+        self.root = self.universe.build(cells, level, background = self._background)
+        self.universe.games.add(self)
+        # Board coordinates of the root's top left cell.
+        self.root_row = 0
+        self.root_col = 0
+        self.board_hash = None
+
+
+    @property
+    def board(self) -> List[list]:
+        return self.get_region(self.origin_row, self.origin_col, self.n_rows, self.n_cols).tolist()
+
+
+    def board_as_list(self) -> List[list]:
+        return self.board
+
+
+    def get_region(self, row:int, col:int, n_rows:int, n_cols:int) -> np.ndarray:
+        '''The (n_rows, n_cols) block of the board with its top left corner
+        at (row, col), as a uint8 array.  Anything off the board reads dead.
+        '''
+        out = np.zeros((n_rows, n_cols), dtype = np.uint8)
+        self.universe.fill(self.root, out, self.root_row - row, self.root_col - col)
+        return out
+
+
+    def _make_neighbor_mapping(self) -> None:
+        '''An infinite board can get too big for even one entry per row and
+        column, so neighbors are always worked out on the fly.
+        '''
+        return None
+
+
+    def get_neighbors(self, row_idx:int, col_idx:int) -> List[tuple]:
+        return self._calculate_neighbors(row_idx, col_idx)
+
+
+    def is_cell_alive(self, row_idx:int, col_idx:int) -> bool:
+        return bool(self.get_region(self.origin_row + row_idx, self.origin_col + col_idx,
+                                    1, 1)[0, 0])
+
+
+    def population(self) -> int:
+        return self.root.population
+
+
+    def copy(self):
+        '''A copy sharing this game's universe.  Nodes never change, so
+        sharing them is safe, and the copy gets to reuse every memoized
+        result.
+        '''
+        twin = copy.copy(self)
+        twin.generation_stats = copy.deepcopy(self.generation_stats)
+        self.universe.games.add(twin)
+        return twin
+
+
+    def _board_in_center(self, j:int) -> bool:
+        '''Whether the board lies inside the center half of the root, which
+        is the part `successor` returns.  On an infinite board, the live
+        cells have to stay inside it for all 2 ** j generations of the step,
+        wherever they go.
+        '''
+        quarter = 2 ** (self.root.level - 2)
+        if self.boundary == 'infinite':
+            bounds = self.universe.bounds(self.root)
+            if bounds is None:
+                return True
+            reach = quarter + 2 ** j
+            return min(bounds[:2]) >= reach and max(bounds[2:]) <= 4 * quarter - reach
+        return (self.root_row + quarter <= 0 and self.root_col + quarter <= 0
+                and self.n_rows <= self.root_row + 3 * quarter
+                and self.n_cols <= self.root_col + 3 * quarter)
+
+
+    def _expand(self) -> None:
+        '''Doubles the root, keeping the old root in the middle.
+        '''
+        universe = self.universe
+        root = self.root
+        wall = universe.uniform(self._background, root.level - 1)
+        self.root = universe.join(universe.join(wall, wall, wall, root.nw),
+                                  universe.join(wall, wall, root.ne, wall),
+                                  universe.join(wall, root.sw, wall, wall),
+                                  universe.join(root.se, wall, wall, wall))
+        self.root_row -= 2 ** (root.level - 1)
+        self.root_col -= 2 ** (root.level - 1)
+
+
+    def _step_power_of_two(self, j:int) -> None:
+        while self.root.level < j + 2 or not self._board_in_center(j):
+            self._expand()
+        quarter = 2 ** (self.root.level - 2)
+        self.root = self.universe.successor(self.root, j)
+        self.root_row += quarter
+        self.root_col += quarter
+
+
+    def advance(self, n_generations:int) -> None:
+        '''Moves the board `n_generations` generations ahead, one power of two
+        at a time.
+        '''
+        j = 0
+        while n_generations >> j:
+            if (n_generations >> j) & 1:
+                self._step_power_of_two(j)
+                # Each step can leave a whole tree of nodes behind.
+                if len(self.universe.nodes) > self.universe.max_nodes:
+                    self.universe.collect_garbage()
+            j += 1
+        self.generation_index += n_generations
+        if self.boundary == 'infinite':
+            self._fit_board()
+        if self.board_hash is not None:
+            self.board_hash = self.compute_board_hash()
+
+
+    def _fit_board(self) -> None:
+        '''Widens the board to take in every live cell.
+        '''
+        bounds = self.universe.bounds(self.root)
+        if bounds is None:
+            return
+        top = min(self.origin_row, self.root_row + bounds[0])
+        left = min(self.origin_col, self.root_col + bounds[1])
+        bottom = max(self.origin_row + self.n_rows, self.root_row + bounds[2])
+        right = max(self.origin_col + self.n_cols, self.root_col + bounds[3])
+        if (bottom - top, right - left) != (self.n_rows, self.n_cols):
+            self.n_rows, self.n_cols = bottom - top, right - left
+            self._after_growth(self.origin_row - top, self.origin_col - left)
+
+
+    def run_update(self, verbose = False) -> None:
+        old_root, old_row, old_col = self.root, self.root_row, self.root_col
+        old_shape = (self.n_rows, self.n_cols)
+        board_hash, self.board_hash = self.board_hash, None
+        self.advance(1)
+        after = self.get_region(self.origin_row, self.origin_col, self.n_rows, self.n_cols)
+        # The board before, over the board as it is now, in case it grew.
+        before = np.zeros_like(after)
+        self.universe.fill(old_root, before, old_row - self.origin_row, old_col - self.origin_col)
+        if board_hash is not None and old_shape != after.shape:
+            self.board_hash = self.compute_board_hash()
+        elif board_hash is not None:
+            self.board_hash = board_hash ^ int(np.bitwise_xor.reduce(self.zobrist_keys()[before != after]))
+        # Same encoding as the transitional board in `NumpyGameOfLife`.
+        tallies = np.bincount((((before ^ after) << 1) | before).ravel(),
+                              minlength = len(self.state_names))
+        transition_counter = Counter({name: int(count) for name, count
+                                      in zip(self.state_names, tallies) if count})
+        self.generation_stats[self.generation_index - 1] = transition_counter
+        if verbose:
+            print(f"Effects in generation {self.generation_index}")
+            pprint(transition_counter)
@@ -0,0 +1,229 @@
+import mmap
+import os
+import struct
+from typing import List
+
+import numpy as np
+
+MAGIC = b'LIFEHIST'
+VERSION = 1
+# magic, version, n_rows, n_cols, keyframe_every
+HEADER = struct.Struct('<8sIQQI')
+
+
+def encode_varints(values:np.ndarray) -> np.ndarray:
+    '''LEB128 encoding of non-negative integers, vectorized: seven bits per
+    byte, low bits first, with the top bit set on every byte but a
+    value's last.
+    '''
+    values = np.asarray(values, dtype = np.uint64)
+    n_bytes = np.ones(len(values), dtype = np.int64)
+    for shift in range(7, 64, 7):
+        n_bytes += values >= np.uint64(1 << shift)
+    starts = np.cumsum(n_bytes) - n_bytes
+    out = np.empty(int(n_bytes.sum()), dtype = np.uint8)
+    for k in range(int(n_bytes.max(initial = 0))):
+        has_byte = n_bytes > k
+        chunk = (values[has_byte] >> np.uint64(7 * k)) & np.uint64(0x7f)
+        more = (n_bytes[has_byte] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[has_byte] + k] = (chunk | more).astype(np.uint8)
+    return out
+
+
+def decode_varints(data:np.ndarray) -> np.ndarray:
+    '''Inverse of `encode_varints`.
+    '''
+    data = np.asarray(data, dtype = np.uint8)
+    if data.size == 0:
+        return np.zeros(0, dtype = np.uint64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    value_idx = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shifts = (np.arange(len(data)) - starts[value_idx]) * 7
+    payload = (data & 0x7f).astype(np.uint64) << shifts.astype(np.uint64)
+    return np.add.reduceat(payload, starts)
+
+
+class HistoryRecorder(object):
+    '''
+    Records every generation of a game to disk so it can be replayed, or
+    any single generation looked up, later with `HistoryReader`.
+
+    Every `keyframe_every`-th generation (starting with the first) is
+    written whole, as packed bits.  Every other generation is written as
+    a delta: the sorted flat indices of the cells that flipped since the
+    generation before, gap-encoded (each index minus the one before it)
+    and stored as varints.  Most gaps between changes in a busy area are
+    tiny, so a typical flip costs a byte or so, against a byte per cell
+    for a uint8 copy of the board.
+
+    The data goes to `path`, and a fixed-size (offset, length) entry for
+    every generation goes to `path + '.idx'`.  Both files are only ever
+    appended to.  Index entries are held back until the data they point
+    to has been flushed, and only then written out (every
+    `index_batch` generations, and on `flush`), so the index on disk
+    never runs ahead of the data.  Generation numbers count from 0, the
+    first board recorded.
+    '''
+
+    index_batch = 256
+
+    def __init__(self, path:str, n_rows:int, n_cols:int, keyframe_every:int = 64):
+        self.path = path
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.keyframe_every = keyframe_every
+        self.data_file = open(path, 'wb')
+        self.index_file = open(path + '.idx', 'wb')
+        self.data_file.write(HEADER.pack(MAGIC, VERSION, n_rows, n_cols, keyframe_every))
+        # So a reader can open the history before the first flush.
+        self.data_file.flush()
+        self.n_generations = 0
+        self._previous = None
+        self._pending_index = []
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def record(self, board) -> None:
+        '''Appends one generation: a board of zeros and ones (nested lists or
+        an array) the same shape as the others.
+        '''
+        cells = np.asarray(board, dtype = np.uint8).ravel()
+        if cells.size != self.n_rows * self.n_cols:
+            raise ValueError(f"Expected a {self.n_rows}x{self.n_cols} board, "
+                             f"got {cells.size} cells")
+        if self.n_generations % self.keyframe_every == 0:
+            payload = np.packbits(cells)
+        else:
+            flipped = np.flatnonzero(cells != self._previous)
+            payload = encode_varints(np.diff(flipped, prepend = 0))
+        offset = self.data_file.tell()
+        self.data_file.write(payload.tobytes())
+        self._pending_index.append((offset, payload.size))
+        self._previous = cells.copy()
+        self.n_generations += 1
+        if len(self._pending_index) >= self.index_batch:
+            self.flush()
+
+
+    def record_run(self, game, n_generations:int) -> None:
+        '''Records the game's current board and then `n_generations` more,
+        calling `run_update` in between.
+        '''
+        self.record(game.board)
+        for _ in range(n_generations):
+            game.run_update()
+            self.record(game.board)
+
+
+    def flush(self) -> None:
+        '''Flushes the data, then writes and flushes the index entries for
+        it, in that order.
+        '''
+        self.data_file.flush()
+        if self._pending_index:
+            entries = np.array(self._pending_index, dtype = '<i8')
+            self.index_file.write(entries.tobytes())
+            self._pending_index = []
+        self.index_file.flush()
+
+
+    def close(self) -> None:
+        if self.data_file.closed:
+            return
+        self.flush()
+        self.data_file.close()
+        self.index_file.close()
+
+
+class HistoryReader(object):
+    '''
+    Random access to a history written by `HistoryRecorder`.  The data
+    file is memory-mapped, so only the records that get looked at are
+    read from disk.  `reader[g]` rebuilds generation g from the last
+    keyframe at or before it, which takes at most `keyframe_every - 1`
+    deltas.  A history that's still being recorded can be read too; call
+    `refresh` to pick up what was flushed since.
+    '''
+
+    def __init__(self, path:str):
+        self.path = path
+        self._data = None
+        self.refresh()
+        if len(self._data) < HEADER.size:
+            raise ValueError(f"{path} has no history header (yet)")
+        magic, version, self.n_rows, self.n_cols, self.keyframe_every = \
+            HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} Game of Life history")
+
+
+    def refresh(self) -> None:
+        '''Re-maps both files to see everything flushed so far.  Index
+        entries pointing past the end of the data (a writer that's still
+        going, or one that died between the two files) are left out.
+        '''
+        self.close()
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                self._data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+            else:
+                # mmap can't map an empty file.
+                self._data = b''
+        index_path = self.path + '.idx'
+        n_entries = os.path.getsize(index_path) // 16
+        index = np.fromfile(index_path, dtype = '<i8',
+                            count = 2 * n_entries).reshape(-1, 2)
+        past_end = np.flatnonzero(index.sum(axis = 1) > len(self._data))
+        self.index = index[:past_end[0]] if past_end.size else index
+
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data = None
+
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+    def _payload(self, generation:int) -> np.ndarray:
+        offset, length = self.index[generation]
+        return np.frombuffer(self._data, dtype = np.uint8, count = int(length),
+                             offset = int(offset))
+
+
+    def flipped(self, generation:int) -> np.ndarray:
+        '''Flat indices of the cells that flipped between generation - 1 and
+        `generation` (which mustn't be a keyframe).
+        '''
+        if generation % self.keyframe_every == 0:
+            raise ValueError(f"Generation {generation} is a keyframe, not a delta")
+        return np.cumsum(decode_varints(self._payload(generation))).astype(np.int64)
+
+
+    def __getitem__(self, generation:int) -> np.ndarray:
+        '''Generation `generation` as a (n_rows, n_cols) uint8 array.
+        '''
+        if generation < 0:
+            generation += len(self)
+        if not 0 <= generation < len(self):
+            raise IndexError(f"No generation {generation}, only {len(self)} recorded")
+        keyframe = generation - generation % self.keyframe_every
+        n_cells = self.n_rows * self.n_cols
+        cells = np.unpackbits(self._payload(keyframe), count = n_cells)
+        for delta in range(keyframe + 1, generation + 1):
+            cells[self.flipped(delta)] ^= 1
+        return cells.reshape(self.n_rows, self.n_cols)
+
+
+    def board_as_list(self, generation:int) -> List[list]:
+        return self[generation].tolist()
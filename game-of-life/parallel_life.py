@@ -0,0 +1,189 @@
+import copy
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pprint import pprint
+from typing import List
+
+import numpy as np
+
+from numpy_life import NumpyGameOfLife, count_neighbors
+from rules import CONWAY
+
+
+class TiledGameOfLife(NumpyGameOfLife):
+    '''
+    `NumpyGameOfLife` stepped in parallel: the board is cut into
+    `n_strips` horizontal strips and a pool of `workers` threads steps
+    them side by side.  Every NumPy operation in the kernel releases the
+    GIL, so the threads really do run at once, and they all read and
+    write the same two board buffers, with nothing pickled or copied
+    between processes.
+
+    Each exchange, a strip copies its own rows plus `halo_width` rows on
+    either side from the current board, steps that block `halo_width`
+    generations by itself, and writes its own rows into the next board.
+    Each generation, the block's outermost rows go wrong, because they
+    can't see past the block edge.  After `halo_width` generations the
+    damage has just reached the halo's inner edge, so the strip's own
+    rows are still exact.  Wider halos mean more duplicated work at the
+    strip edges but fewer exchanges, i.e. fewer times every thread has to
+    wait for the slowest one.  The top and bottom of the board need no
+    halo, since nothing lives past them.
+
+    On a torus the strips at the top and bottom take their halos from the
+    other end of the board, and every block wraps round left to right.  On
+    an infinite board, the board grows before an exchange whenever a live
+    cell is within `halo_width` cells of an edge.
+
+    `run_generations(n)` does n generations in ceil(n / halo_width)
+    exchanges, and `run_update` is `run_generations(1)`.  Each strip
+    tallies its own rows' transitions every generation, so
+    `generation_stats` comes out the same as for the other engines.
+    Call `close` (or use the game as a context manager) to stop the
+    worker threads; a game that's garbage collected without it closes
+    itself.  Copies share the threads, which stop once the last game
+    using them is closed.
+    '''
+
+    def __init__(self, board: List[list], n_strips:int = None, halo_width:int = 1,
+                 workers:int = None, rule:str = CONWAY, boundary:str = 'edge'):
+        super().__init__(board, rule = rule, boundary = boundary)
+        if halo_width < 1:
+            raise ValueError(f"halo_width must be at least 1, got {halo_width}")
+        self.workers = workers or os.cpu_count() or 1
+        self.n_strips = max(1, min(n_strips or self.workers, self.n_rows))
+        self.halo_width = halo_width
+        self._next_board = np.empty_like(self.board)
+        self._start_executor()
+
+
+    def _start_executor(self) -> None:
+        self.executor = ThreadPoolExecutor(max_workers = self.workers)
+        # How many games (this one and its copies) share the executor.
+        self._executor_users = [1]
+        self.closed = False
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def __del__(self):
+        # __init__ may have failed before the executor was made.
+        if not getattr(self, 'closed', True):
+            # Don't block a garbage collection on the worker threads.
+            self.close(wait = False)
+
+
+    def close(self, wait:bool = True) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._executor_users[0] -= 1
+        if self._executor_users[0] == 0:
+            self.executor.shutdown(wait = wait)
+
+
+    def strips(self) -> List[tuple]:
+        '''(start, stop) rows of every strip.
+        '''
+        edges = np.linspace(0, self.n_rows, self.n_strips + 1).astype(int)
+        return [(int(start), int(stop)) for start, stop in zip(edges[:-1], edges[1:])
+                if stop > start]
+
+
+    def _step_strip(self, start:int, stop:int, n_generations:int) -> tuple:
+        '''Steps rows start..stop-1 `n_generations` generations into the next
+        board.  Returns the strip's per-generation transition tallies and the
+        XOR of the Zobrist keys of its cells that ended up flipped (0 when
+        hashing is off).
+        '''
+        torus = self.boundary == 'torus'
+        if torus:
+            lo, hi = start - n_generations, stop + n_generations
+            cells = self.board[np.arange(lo, hi) % self.n_rows]
+        else:
+            lo = max(0, start - n_generations)
+            hi = min(self.n_rows, stop + n_generations)
+            cells = self.board[lo:hi].copy()
+        own = slice(start - lo, stop - lo)
+        padded = np.zeros((hi - lo + 2, self.n_cols + 2), dtype = np.uint8)
+        counts = np.empty((hi - lo, self.n_cols), dtype = np.uint8)
+        tallies = []
+        for _ in range(n_generations):
+            counts = count_neighbors(cells, padded, counts, wrap_cols = torus)
+            next_cells = self.next_alive(cells, counts)
+            next_cells = next_cells.astype(np.uint8)
+            transitions = ((cells[own] ^ next_cells[own]) << 1) | cells[own]
+            tallies.append(np.bincount(transitions.ravel(), minlength = len(self.state_names)))
+            cells = next_cells
+        self._next_board[start:stop] = cells[own]
+
+        flipped_hash = 0
+        if self.board_hash is not None:
+            flipped = self.board[start:stop] != cells[own]
+            keys = self.zobrist_keys()[start:stop]
+            flipped_hash = int(np.bitwise_xor.reduce(keys[flipped]))
+        return tallies, flipped_hash
+
+
+    def _exchange(self, n_generations:int) -> List[np.ndarray]:
+        if self.board_hash is not None:
+            # Built here so the worker threads never race to create it.
+            self.zobrist_keys()
+        futures = [self.executor.submit(self._step_strip, start, stop, n_generations)
+                   for start, stop in self.strips()]
+        totals = [np.zeros(len(self.state_names), dtype = np.int64)
+                  for _ in range(n_generations)]
+        for future in futures:
+            tallies, flipped_hash = future.result()
+            for total, tally in zip(totals, tallies):
+                total += tally
+            if self.board_hash is not None:
+                self.board_hash ^= flipped_hash
+        self.board, self._next_board = self._next_board, self.board
+        return totals
+
+
+    def run_generations(self, n_generations:int, verbose = False) -> None:
+        while n_generations > 0:
+            batch = min(self.halo_width, n_generations)
+            self.grow_to_fit(batch)
+            for tallies in self._exchange(batch):
+                transition_counter = Counter({name: int(count) for name, count
+                                              in zip(self.state_names, tallies) if count})
+                self.generation_stats[self.generation_index] = transition_counter
+                if verbose:
+                    print(f"Effects in generation {self.generation_index + 1}")
+                    pprint(transition_counter)
+                self.generation_index += 1
+            n_generations -= batch
+
+
+    def run_update(self, verbose = False) -> None:
+        self.run_generations(1, verbose = verbose)
+
+
+    def _grow(self, top:int, bottom:int, left:int, right:int) -> None:
+        super()._grow(top, bottom, left, right)
+        self._next_board = np.empty_like(self.board)
+
+
+    def copy(self):
+        '''A copy with its own boards that shares this game's worker threads
+        (or gets threads of its own if this game is closed).
+        '''
+        twin = copy.copy(self)
+        if self.closed:
+            twin._start_executor()
+        else:
+            self._executor_users[0] += 1
+        twin.board = self.board.copy()
+        twin._next_board = np.empty_like(self.board)
+        twin.generation_stats = copy.deepcopy(self.generation_stats)
+        return twin
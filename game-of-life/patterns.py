@@ -0,0 +1,245 @@
+import os
+import re
+
+import numpy as np
+
+from game_of_life import GameOfLife
+from numpy_life import NumpyGameOfLife
+from rules import CONWAY
+
+RLE_HEADER = re.compile(rb'x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*(\S+))?')
+RLE_LINE_LENGTH = 70
+# Golly's suffix for a torus-shaped board, e.g. B3/S23:T64,48 (width, height).
+TORUS_SUFFIX = re.compile(r':T(\d+),(\d+)$', re.IGNORECASE)
+
+
+def _open_bytes(source) -> bytes:
+    if hasattr(source, 'read'):
+        data = source.read()
+        return data.encode() if isinstance(data, str) else data
+    with open(source, 'rb') as f:
+        return f.read()
+
+
+def parse_cells(data:bytes) -> np.ndarray:
+    '''Parses a plaintext (.cells) pattern: lines starting with ! are
+    comments, 'O' (or '*') is a live cell and '.' a dead one.  Short lines
+    are padded with dead cells.  Returns a uint8 array.
+    '''
+    lines = [line.rstrip(b'\r') for line in data.split(b'\n') if not line.startswith(b'!')]
+    while lines and not lines[-1]:
+        lines.pop()
+    width = max((len(line) for line in lines), default = 0)
+    if not lines or width == 0:
+        return np.zeros((len(lines), width), dtype = np.uint8)
+    chars = np.frombuffer(b''.join(line.ljust(width, b'.') for line in lines),
+                          dtype = np.uint8).reshape(len(lines), width)
+    alive = (chars == ord('O')) | (chars == ord('*'))
+    if not (alive | (chars == ord('.'))).all():
+        bad = chr(chars[~(alive | (chars == ord('.')))][0])
+        raise ValueError(f"Unexpected character {bad!r} in plaintext pattern")
+    return alive.astype(np.uint8)
+
+
+def parse_rle(data:bytes) -> tuple:
+    '''Parses a run length encoded (.rle) pattern into (cells, rule), where
+    cells is a uint8 array and rule the header's rule string (None if it
+    doesn't give one).
+
+    The whole body is tokenized at once with NumPy: every tag (b, o, $ or
+    another letter, which counts as alive) gets its run count from the
+    digits in front of it, cumulative sums of the run lengths give each
+    run's row and column, and the live runs are written into the board
+    through an int8 difference array, so nothing loops over cells or
+    runs and the only arrays the size of the board are one byte per
+    cell.  A count with no tag after it is an error.
+    '''
+    header = None
+    body_lines = []
+    for line in data.split(b'\n'):
+        stripped = line.strip()
+        if not stripped or stripped.startswith(b'#'):
+            continue
+        if header is None:
+            header = RLE_HEADER.match(stripped)
+            if header is None:
+                raise ValueError(f"Expected an RLE header line, got {stripped[:40]!r}")
+            continue
+        body_lines.append(stripped)
+    if header is None:
+        raise ValueError("No RLE header line found")
+    n_cols, n_rows = int(header.group(1)), int(header.group(2))
+    rule = header.group(3).decode() if header.group(3) else None
+
+    body = b''.join(body_lines).split(b'!')[0]
+    chars = np.frombuffer(re.sub(rb'\s+', b'', body), dtype = np.uint8)
+    is_digit = (chars >= ord('0')) & (chars <= ord('9'))
+    tag_positions = np.flatnonzero(~is_digit)
+    tags = chars[tag_positions]
+    if is_digit.size and is_digit[-1]:
+        last_tag = tag_positions[-1] if tag_positions.size else -1
+        raise ValueError(f"RLE run count {chars[last_tag + 1:].tobytes().decode()!r} "
+                         "at the end of the pattern has no tag after it")
+
+    # Run counts: the number spelled by the digits just before each tag.
+    digit_positions = np.flatnonzero(is_digit)
+    owner = np.cumsum(~is_digit)[digit_positions]
+    place = tag_positions[owner] - 1 - digit_positions
+    digit_values = (chars[digit_positions] - ord('0')) * 10.0 ** place
+    counts = np.bincount(owner, weights = digit_values, minlength = len(tags)).astype(np.int64)
+    counts[np.bincount(owner, minlength = len(tags)) == 0] = 1
+
+    is_newline = tags == ord('$')
+    is_dead = tags == ord('b')
+    is_alive = ~is_newline & ~is_dead
+    rows = np.cumsum(np.where(is_newline, counts, 0)) - np.where(is_newline, counts, 0)
+    widths = np.where(is_newline, 0, counts)
+    ends = np.cumsum(widths)
+    # Column of a run: run lengths so far, minus those before the last newline.
+    line_starts = np.maximum.accumulate(np.where(is_newline, ends, 0))
+    cols = ends - widths - line_starts
+
+    # Zero-length runs are dropped, so no two runs start (or end) on the
+    # same cell and plain fancy-index assignment can build the diff.
+    is_alive &= counts > 0
+    alive_rows, alive_cols, alive_counts = rows[is_alive], cols[is_alive], counts[is_alive]
+    if alive_rows.size:
+        n_rows = max(n_rows, int(alive_rows.max()) + 1)
+        n_cols = max(n_cols, int((alive_cols + alive_counts).max()))
+    starts = alive_rows * n_cols + alive_cols
+    diff = np.zeros(n_rows * n_cols + 1, dtype = np.int8)
+    diff[starts] = 1
+    # A run can end where the next one starts (`2o3o`); they cancel out.
+    diff[starts + alive_counts] -= 1
+    cells = np.cumsum(diff[:-1], dtype = np.int8).view(np.uint8)
+    return cells.reshape(n_rows, n_cols), rule
+
+
+def read_pattern(source, pattern_format:str = None) -> tuple:
+    '''Reads an .rle or .cells pattern from a path or open file into
+    (cells, rule).  The format comes from the file extension unless given.
+    Plaintext patterns have no rule, so theirs is None.
+    '''
+    if pattern_format is None:
+        name = source if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', '')
+        pattern_format = os.path.splitext(str(name))[1].lstrip('.').lower() or 'rle'
+    data = _open_bytes(source)
+    if pattern_format == 'rle':
+        return parse_rle(data)
+    if pattern_format == 'cells':
+        return parse_cells(data), None
+    raise ValueError(f"Unknown pattern format {pattern_format!r}, expected 'rle' or 'cells'")
+
+
+def load_pattern(source, engine = NumpyGameOfLife, padding:int = 0,
+                 pattern_format:str = None, **engine_kwargs) -> GameOfLife:
+    '''Reads a pattern and starts a game on it with the given engine class,
+    with `padding` dead cells around it (the board has hard edges, so a
+    pattern that grows needs room).  The cells go to the engine as a uint8
+    array, except for the plain `GameOfLife`, which gets nested lists.  The
+    game plays the rule from the pattern's header, unless `rule` is passed.
+    A header rule ending in Golly's :Tw,h makes the board a w x h torus,
+    unless `boundary` is passed.
+    '''
+    cells, rule = read_pattern(source, pattern_format)
+    if padding:
+        cells = np.pad(cells, padding)
+    if rule is not None:
+        torus = TORUS_SUFFIX.search(rule)
+        if torus and 'boundary' not in engine_kwargs:
+            width, height = int(torus.group(1)), int(torus.group(2))
+            cells = np.pad(cells, ((0, max(0, height - cells.shape[0])),
+                                   (0, max(0, width - cells.shape[1]))))
+            engine_kwargs['boundary'] = 'torus'
+        # Any other topology Golly adds after the colon is left out.
+        engine_kwargs.setdefault('rule', rule.split(':')[0])
+    board = cells.tolist() if engine is GameOfLife else cells
+    return engine(board, **engine_kwargs)
+
+
+def format_cells(board, name:str = None) -> bytes:
+    cells = np.asarray(board, dtype = np.uint8)
+    chars = np.where(cells == 1, ord('O'), ord('.')).astype(np.uint8)
+    lines = [f"!Name: {name}".encode()] if name else []
+    lines.extend(row.tobytes() for row in chars)
+    return b'\n'.join(lines) + b'\n'
+
+
+def format_rle(board, rule:str = CONWAY, name:str = None) -> bytes:
+    '''Run length encodes a board.  Runs are found with NumPy: the starts and
+    ends of live runs are where each row (with a dead cell added at both
+    ends) changes value.  Trailing dead cells in a row are left out, and
+    runs of empty rows collapse into one `n$`.
+
+    Every live run becomes up to three tokens (the `$` to get to its row,
+    the `b` gap before it, its `o`s), and all their digits are written
+    straight into one byte array, one digit place at a time.  Only the
+    wrapping into lines of at most 70 characters loops in Python, once per
+    line.
+    '''
+    cells = np.asarray(board, dtype = np.uint8)
+    n_rows, n_cols = cells.shape
+    edges = np.diff(cells.astype(np.int8), axis = 1, prepend = 0, append = 0)
+    run_rows, run_starts = np.nonzero(edges == 1)
+    _, run_ends = np.nonzero(edges == -1)
+
+    new_row = np.diff(run_rows, prepend = 0)
+    previous_end = np.concatenate([[0], run_ends[:-1]])
+    gaps = np.where(new_row > 0, run_starts, run_starts - previous_end)
+    counts = np.stack([new_row, gaps, run_ends - run_starts], axis = 1).ravel()
+    tags = np.tile(np.frombuffer(b'$bo', dtype = np.uint8), len(run_rows))
+    kept = counts > 0
+    counts, tags = counts[kept], tags[kept]
+
+    # A count of 1 is left out, so it takes no digits.
+    n_digits = np.ones(len(counts), dtype = np.int64)
+    for place in range(1, len(str(counts.max(initial = 0)))):
+        n_digits += counts >= 10 ** place
+    n_digits[counts == 1] = 0
+    token_ends = np.cumsum(n_digits + 1)
+    token_starts = token_ends - n_digits - 1
+    out = np.empty(int(token_ends[-1]) if len(counts) else 0, dtype = np.uint8)
+    powers = 10 ** np.arange(19, dtype = np.int64)
+    for k in range(int(n_digits.max(initial = 0))):
+        has_digit = n_digits > k
+        value = counts[has_digit] // powers[n_digits[has_digit] - 1 - k] % 10
+        out[token_starts[has_digit] + k] = value + ord('0')
+    out[token_ends - 1] = tags
+    body = out.tobytes() + b'!'
+    token_ends = np.append(token_ends, len(body))
+
+    lines = [f"#N {name}".encode()] if name else []
+    lines.append(f"x = {n_cols}, y = {n_rows}, rule = {rule}".encode())
+    position = 0
+    while position < len(body):
+        cut = int(token_ends[token_ends.searchsorted(position + RLE_LINE_LENGTH, 'right') - 1])
+        if cut <= position:
+            cut = position + RLE_LINE_LENGTH
+        lines.append(body[position:cut])
+        position = cut
+    return b'\n'.join(lines) + b'\n'
+
+
+def save_pattern(board, path:str, pattern_format:str = None, rule:str = None,
+                 name:str = None) -> None:
+    '''Writes a board (or a game, whose board and rule are used) as .rle or
+    .cells, going by the file extension unless `pattern_format` is given.
+    A game on a torus gets Golly's :Tw,h suffix on its rule.
+    '''
+    if isinstance(board, GameOfLife):
+        game = board
+        board = game.board
+        if rule is None:
+            rule = game.rule
+            if game.boundary == 'torus':
+                rule += f":T{game.n_cols},{game.n_rows}"
+    rule = rule or CONWAY
+    pattern_format = pattern_format or os.path.splitext(path)[1].lstrip('.').lower()
+    if pattern_format == 'rle':
+        data = format_rle(board, rule = rule, name = name)
+    elif pattern_format == 'cells':
+        data = format_cells(board, name = name)
+    else:
+        raise ValueError(f"Unknown pattern format {pattern_format!r}, expected 'rle' or 'cells'")
+    with open(path, 'wb') as f:
+        f.write(data)
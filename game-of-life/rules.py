@@ -0,0 +1,67 @@
+import re
+from collections import namedtuple
+
+import numpy as np
+
+CONWAY = 'B3/S23'
+
+# A few of the better known life-like rules, by name.
+NAMED_RULES = {
+    'life': CONWAY,
+    'highlife': 'B36/S23',
+    'seeds': 'B2/S',
+    'day_and_night': 'B3678/S34678',
+    'life_without_death': 'B3/S012345678',
+    'maze': 'B3/S12345',
+    'replicator': 'B1357/S1357',
+    'morley': 'B368/S245',
+    '2x2': 'B36/S125',
+}
+
+Rule = namedtuple('Rule', ['births', 'survivals'])
+
+BS_NOTATION = re.compile(r'^B([0-8]*)/?S([0-8]*)$', re.IGNORECASE)
+SB_NOTATION = re.compile(r'^S([0-8]*)/?B([0-8]*)$', re.IGNORECASE)
+# The old survival/birth notation without letters, e.g. 23/3 for Conway.
+BARE_NOTATION = re.compile(r'^([0-8]*)/([0-8]*)$')
+
+
+def parse_rule(rule:str) -> Rule:
+    '''Reads a life-like rule into the neighbor counts that make a dead cell
+    come alive and those that keep a live cell alive.  Takes B/S notation
+    ('B36/S23'), S/B ('S23/B36'), the bare survival/birth form ('23/36'),
+    or one of the names in NAMED_RULES.
+    '''
+    if isinstance(rule, Rule):
+        return rule
+    text = NAMED_RULES.get(rule.strip().lower(), rule.strip())
+    match = BS_NOTATION.match(text)
+    if match:
+        births, survivals = match.groups()
+    elif SB_NOTATION.match(text):
+        survivals, births = SB_NOTATION.match(text).groups()
+    elif BARE_NOTATION.match(text):
+        survivals, births = BARE_NOTATION.match(text).groups()
+    else:
+        raise ValueError(f"Can't read {rule!r} as a life-like rule, expected e.g. 'B3/S23'")
+    return Rule(frozenset(map(int, births)), frozenset(map(int, survivals)))
+
+
+def rule_string(rule) -> str:
+    '''The canonical B/S spelling of a rule, e.g. 'B36/S23'.
+    '''
+    births, survivals = parse_rule(rule)
+    return 'B' + ''.join(map(str, sorted(births))) + '/S' + ''.join(map(str, sorted(survivals)))
+
+
+def compile_rule(rule) -> np.ndarray:
+    '''The rule as a (2, 9) uint8 table: table[alive, n_alive] is 1 when a
+    cell that's dead (0) or alive (1) now, with n_alive live neighbors,
+    is alive next generation.  Applying a rule to a whole board is then a
+    single gather, `table[alive, counts]`.
+    '''
+    births, survivals = parse_rule(rule)
+    table = np.zeros((2, 9), dtype = np.uint8)
+    table[0, sorted(births)] = 1
+    table[1, sorted(survivals)] = 1
+    return table
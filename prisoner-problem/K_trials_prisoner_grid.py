@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+from matplotlib import pyplot as plt
+import seaborn as sns
+from statsmodels.stats.proportion import proportion_confint
+
+import prisoner_exact as pe
+import prisoner_sim as sim
+import prisoner_sweep as psw
+
+def plot_prisoner_grid(K, N_vector, choice_props = (0.5,),\
+					   strategies = sim.STRATEGIES, conf_level = 0.95,\
+					   subdir_name = None, processes = None, seed = None,\
+					   path = psw.DEFAULT_RESULTS_PATH, exact_reference = False):
+	'''
+	Runs K trials of the prisoner problem at every number of prisoners
+	in `N_vector`, for every share of drawers each prisoner may open in
+	`choice_props` and every strategy in `strategies`, and plots the
+	survival rate p_hat of each (strategy, choice_prop) pair against N
+	with its Wilson Score Interval shaded in, like
+	`plot_multiple_plane_sizes` does for the crazy plane.
+
+	The trials are run by `prisoner_sweep.sweep_prisoner_grid`, which
+	keeps finished grid points in the npz file at `path`, so replotting
+	(or adding N values, choice proportions or strategies) only simulates
+	the new points.  `processes` and `seed` are passed along to it.
+
+	Setting `exact_reference = True` adds a dashed line with the exact
+	survival probability of each series from `prisoner_exact`.
+
+	`subdir_name` works as in `plot_multiple_plane_sizes`: the plot is
+	saved there, or shown if it's None.  Returns the dict of
+	(wins, trials) lists from `prisoner_sweep.run_grid`.
+	'''
+	counts = psw.run_grid(K, N_vector, choice_props, strategies, seed = seed,\
+						  processes = processes, path = path)
+
+	# See the note in `plot_multiple_plane_sizes` about the markeredgewidth
+	sns.set_style('whitegrid')
+	sns.set_context(rc ={'lines.markeredgewidth':1})
+	colors = sns.color_palette(n_colors = len(counts))
+
+	for color, ((strategy, choice_prop), series) in zip(colors, sorted(counts.items())):
+		p_hats = [wins*1.0/trials for wins, trials in series]
+		bounds = [proportion_confint(count = wins, nobs = trials,\
+									 alpha = 1 - conf_level, method = 'wilson')\
+				  for wins, trials in series]
+		label = '%s strategy, %d%% of drawers' % (strategy, choice_prop * 100)
+		plt.plot(N_vector, p_hats, 'x', color = color, label = label)
+		plt.fill_between(N_vector, [lower for lower, upper in bounds],\
+						 [upper for lower, upper in bounds],\
+						 facecolor = color, alpha = 0.2)
+		if exact_reference:
+			exact = [pe.survival_probability(N, choice_prop, strategy)\
+					 for N in N_vector]
+			plt.plot(N_vector, exact, '--', color = color)
+
+	# Set up ticks, labels, and titles to look pretty
+	plt.xscale('log')
+	plt.xticks(N_vector, [str(N) for N in N_vector], rotation = 45, fontsize = 8)
+	plt.xlabel('Prisoners')
+	plt.ylim(-0.05, 1.05)
+	plt.ylabel(r'$P(Survival)$ with %d%% Confidence Interval' % (conf_level * 100))
+	plt.title('%s Trials of the Prisoner Problem' % K)
+	plt.legend(loc = 'best', framealpha = 0.75, frameon = True, edgecolor = 'b')
+
+	# Save the plot in given subdirectory, or show it if no subdir given
+	if subdir_name:
+		target_dir = '/'.join([os.getcwd(), subdir_name])
+		plotlabel = '%s_trials_%s_to_%s_prisoners' % \
+		(K, min(N_vector), max(N_vector))
+		plt.savefig(target_dir + '/%s.png' % plotlabel, \
+			dpi = plt.gcf().dpi)
+	else:
+		plt.show()
+
+	return counts
+
+if __name__ == '__main__':
+	K = int(input("Choose number of trials at each grid point: "))
+	os.makedirs('prisoner_grid_plots', exist_ok = True)
+	plot_prisoner_grid(K, N_vector = [10, 20, 50, 100, 200, 500, 1000],\
+					   choice_props = (0.5, 0.6, 0.7), subdir_name = 'prisoner_grid_plots',\
+					   seed = 2017, exact_reference = True)
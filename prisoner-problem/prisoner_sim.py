@@ -0,0 +1,161 @@
+import numpy as np
+
+import prisoner_exact as pe
+import repo_path
+import seeding
+
+STRATEGIES = ('random', 'loop')
+
+def drawer_batch(N, K, rng = None):
+	'''Returns a (K, N) array whose rows are independent random drawer
+	arrays, i.e. K calls of `create_drawer_array(N)` at once.  Drawer d
+	of trial k holds card drawers[k, d].
+	'''
+	rng = seeding.get_rng(rng)
+	dtype = np.int32 if N < 2 ** 31 else np.int64
+	drawers = np.tile(np.arange(N, dtype = dtype), (K, 1))
+	return rng.permuted(drawers, axis = 1, out = drawers)
+
+def longest_cycle_lengths(drawers):
+	'''Longest cycle of every row of a (K, N) batch of permutations,
+	found with pointer jumping.
+
+	Every element starts out labelled with the smaller of itself and the
+	element it points to.  Each round, an element takes the minimum of
+	its label and the label of the element `reach` steps ahead, and
+	`reach` doubles, so after log2(N) rounds every element is
+	labelled with the smallest element of its cycle.  Counting labels in
+	each row gives the cycle sizes.
+	'''
+	K, N = drawers.shape
+	offsets = (np.arange(K, dtype = np.int64) * N)[:, None]
+	pointers = (drawers + offsets).ravel()
+	if K * N < 2 ** 31:
+		pointers = pointers.astype(np.int32)
+	label_type = np.int16 if N < 2 ** 15 else np.int64
+	labels = np.minimum(np.arange(N, dtype = label_type)[None, :],
+						drawers.astype(label_type)).ravel()
+	# Labels cover each element and the next one, so start jumping by two.
+	pointers = pointers.take(pointers)
+	reach = 2
+	while reach < N:
+		np.minimum(labels, labels.take(pointers), out = labels)
+		pointers = pointers.take(pointers)
+		reach *= 2
+	cycle_sizes = np.bincount((labels.reshape(K, N) + offsets).ravel(),
+							  minlength = K * N)
+	return cycle_sizes.reshape(K, N).max(axis = 1)
+
+def sample_longest_cycles(N, K, rng = None):
+	'''Longest cycle lengths of K uniformly random permutations of N,
+	without building the permutations.
+
+	The cycle holding any given element of a random permutation has a
+	length that's uniform on 1..N, and what's left over is again a
+	uniformly random permutation of the remaining elements, so cycle
+	lengths can be peeled off one at a time.  A trial is finished as soon
+	as the elements left over can't beat its longest cycle so far, which
+	takes only a handful of draws per trial.
+	'''
+	rng = seeding.get_rng(rng)
+	longest = np.zeros(K, dtype = np.int64)
+	trials = np.arange(K)
+	remaining = np.full(K, N, dtype = np.int64)
+	current = np.zeros(K, dtype = np.int64)
+	while trials.size:
+		cycle = (rng.random(trials.size) * remaining).astype(np.int64) + 1
+		np.maximum(current, cycle, out = current)
+		remaining -= cycle
+		done = remaining <= current
+		longest[trials[done]] = current[done]
+		keep = ~done
+		trials, remaining, current = trials[keep], remaining[keep], current[keep]
+	return longest
+
+def n_choices(N, choice_prop):
+	'''Number of drawers each prisoner gets to open, as in `n_random_choices`.
+	'''
+	return int(choice_prop * N)
+
+def random_strategy_trials(N, K, choice_prop = 0.5, rng = None):
+	'''Runs K trials where every prisoner opens a random `choice_prop`
+	share of the drawers, and returns how many prisoners in a row found
+	their card before the first one failed (N means everybody lives).
+
+	Each prisoner's card sits in a uniformly random drawer as far as
+	their own random picks are concerned, so each one succeeds independently
+	with probability n/N, and the number of successes before the first
+	failure is geometric.
+	'''
+	rng = seeding.get_rng(rng)
+	n = n_choices(N, choice_prop)
+	if n >= N:
+		return np.full(K, N, dtype = np.int64)
+	first_failure = rng.geometric(1 - n / N, size = K)
+	return np.minimum(first_failure - 1, N)
+
+def loop_strategy_trials(N, K, rng = None, method = 'cycles'):
+	'''Runs K trials of the loop-following strategy (prisoner i opens
+	drawer i, then the drawer numbered by the card inside, and so on) and
+	returns the longest cycle of each trial's drawer permutation.  The
+	prisoners all live exactly when that's at most the number of drawers
+	each one can open.
+
+	`method = 'cycles'` samples the cycle structure directly with
+	`sample_longest_cycles`; `method = 'permutations'` builds the (K, N)
+	drawer arrays and runs `longest_cycle_lengths` on them, which is
+	slower but works on real permutations.
+	'''
+	if method == 'cycles':
+		return sample_longest_cycles(N, K, rng)
+	if method == 'permutations':
+		return longest_cycle_lengths(drawer_batch(N, K, rng))
+	raise ValueError('method must be "cycles" or "permutations", got %r' % method)
+
+def run_trials(N, K, strategy = 'loop', choice_prop = 0.5, rng = None,
+			   chunk_size = 10 ** 6, **kwargs):
+	'''Runs K trials of the prisoner problem with the given strategy, in
+	chunks of `chunk_size` to bound memory, and returns how many of them
+	the prisoners survived.  Extra keyword arguments go to
+	`loop_strategy_trials`.
+	'''
+	rng = seeding.get_rng(rng)
+	n = n_choices(N, choice_prop)
+	wins = 0
+	for start in range(0, K, chunk_size):
+		size = min(chunk_size, K - start)
+		if strategy == 'loop':
+			longest = loop_strategy_trials(N, size, rng, **kwargs)
+			wins += int((longest <= n).sum())
+		elif strategy == 'random':
+			found = random_strategy_trials(N, size, choice_prop, rng)
+			wins += int((found == N).sum())
+		else:
+			raise ValueError('strategy must be one of %s, got %r'
+							 % (STRATEGIES, strategy))
+	return wins
+
+def check_against_exact(N, K, strategy = 'loop', choice_prop = 0.5, rng = None,
+						cache_dir = None, **kwargs):
+	'''Runs K trials and compares the survival rate with the exact
+	answer from `prisoner_exact`.  Returns (estimate, exact, z), where z
+	is how many binomial standard errors the estimate is off by; anything
+	much past 3 or so points to a bug in the simulator.
+	'''
+	wins = run_trials(N, K, strategy = strategy, choice_prop = choice_prop,
+					  rng = rng, **kwargs)
+	exact = pe.survival_probability(N, choice_prop, strategy, cache_dir = cache_dir)
+	estimate = wins / K
+	std_error = np.sqrt(exact * (1 - exact) / K)
+	z = 0.0 if std_error == 0 else float((estimate - exact) / std_error)
+	return estimate, exact, z
+
+if __name__ == '__main__':
+	inmates = 100
+	trials = 10 ** 6
+	rng = seeding.get_rng(2017)
+	for strategy in STRATEGIES:
+		estimate, exact, z = check_against_exact(inmates, trials, strategy = strategy,
+												 rng = rng)
+		print('{} strategy: prisoners survived {:.4f} of trials, exact {:.4f} '
+			  '(z = {:.2f})'.format(strategy, estimate, exact, z))
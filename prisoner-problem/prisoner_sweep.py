@@ -0,0 +1,179 @@
+import multiprocessing as mp
+import os
+from collections import namedtuple
+
+import numpy as np
+
+import prisoner_sim as sim
+import repo_path
+import seeding
+
+DEFAULT_RESULTS_PATH = 'prisoner_sweep_results.npz'
+# Finished points to collect before rewriting the results file.
+SAVE_EVERY = 64
+
+SweepPoint = namedtuple('SweepPoint', ['N', 'choice_prop', 'strategy', 'wins',
+									   'trials'])
+
+COLUMNS = ('N', 'choice_prop', 'strategy', 'wins', 'trials')
+# Which root seed each point's trials came from.
+SEED_COLUMNS = ('entropy', 'spawn_key')
+
+def grid_points(N_vector, choice_props, strategies):
+	'''Every (N, choice_prop, strategy) combination of the grid, in order.
+	'''
+	return [(N, choice_prop, strategy) for strategy in strategies
+			for choice_prop in choice_props for N in N_vector]
+
+def point_seed(root_seed, N, choice_prop, strategy):
+	'''The `numpy.random.SeedSequence` for one grid point, addressed by its
+	grid coordinates (N, choice_prop, strategy) the same way
+	`plane_sweep.unit_seed` addresses its work units, so a point's trials
+	don't depend on what else is in the grid or which worker ran it.
+	choice_prop goes into the key as its exact integer ratio, so two
+	proportions that happen to open the same number of drawers still get
+	streams of their own.
+	'''
+	numerator, denominator = float(choice_prop).as_integer_ratio()
+	key = (N, numerator, denominator, sim.STRATEGIES.index(strategy))
+	return seeding.child_seed(root_seed, *key)
+
+def seed_id(root_seed):
+	'''The (entropy, spawn_key) of a root `SeedSequence` as strings, which
+	is how results files remember which seed a point was run with.
+	'''
+	return (str(root_seed.entropy),
+			','.join(str(k) for k in root_seed.spawn_key))
+
+def load_results(path = DEFAULT_RESULTS_PATH, with_seeds = False):
+	'''Reads a results file back as a list of `SweepPoint`s (empty if
+	there's no file yet).  With `with_seeds` it returns the points and
+	a list of their `seed_id`s; points from files written before seeds
+	were stored get ('', ''), which no seed matches.
+	'''
+	if not os.path.exists(path):
+		return ([], []) if with_seeds else []
+	with np.load(path, allow_pickle = False) as stored:
+		columns = [stored[name].tolist() for name in COLUMNS]
+		n_points = len(columns[0])
+		seed_columns = [stored[name].tolist() if name in stored.files
+						else [''] * n_points for name in SEED_COLUMNS]
+	points = [SweepPoint(*row) for row in zip(*columns)]
+	if with_seeds:
+		return points, list(zip(*seed_columns))
+	return points
+
+def save_results(points, path = DEFAULT_RESULTS_PATH, seeds = None):
+	'''Writes `SweepPoint`s to `path` as one npz array per column, along
+	with the `seed_id` of each one (`seeds`, lined up with `points`;
+	None stores them as unknown).  The file is written next to the
+	target and then moved over it, so a run that gets killed halfway
+	leaves the previous version intact.
+	'''
+	if seeds is None:
+		seeds = [('', '')] * len(points)
+	columns = {
+		'N': np.array([p.N for p in points], dtype = np.int64),
+		'choice_prop': np.array([p.choice_prop for p in points], dtype = float),
+		'strategy': np.array([p.strategy for p in points], dtype = 'U16'),
+		'wins': np.array([p.wins for p in points], dtype = np.int64),
+		'trials': np.array([p.trials for p in points], dtype = np.int64),
+		'entropy': np.array([entropy for entropy, _ in seeds], dtype = str),
+		'spawn_key': np.array([spawn_key for _, spawn_key in seeds], dtype = str),
+	}
+	tmp_path = path + '.tmp.npz'
+	np.savez(tmp_path, **columns)
+	os.replace(tmp_path, path)
+
+def _run_point(args):
+	N, choice_prop, strategy, K, seed_seq = args
+	rng = seeding.get_rng(seed_seq)
+	wins = sim.run_trials(N, K, strategy = strategy, choice_prop = choice_prop,
+						  rng = rng)
+	return SweepPoint(N, choice_prop, strategy, wins, K)
+
+def sweep_prisoner_grid(K, N_vector, choice_props = (0.5,),
+						strategies = sim.STRATEGIES, seed = None,
+						processes = None, path = DEFAULT_RESULTS_PATH):
+	'''Runs K trials of the prisoner problem at every point of the grid
+	N_vector x choice_props x strategies, spread over a process pool, and
+	yields a `SweepPoint` for each one.
+
+	Finished points are saved to the npz file at `path` (None to keep
+	nothing) every `SAVE_EVERY` points and when the sweep ends or is
+	stopped, and points already in it with the same K and the same
+	`seed` are yielded straight from the file, so a sweep that was
+	interrupted, or extended with new N values or choice proportions,
+	only simulates what's missing (a run that gets killed outright loses
+	at most the last `SAVE_EVERY` points).  Points stored by a run with
+	another seed are kept in the file but never reused, and neither are
+	those of unseeded runs, whose fresh entropy no later run shares.
+	With a fixed `seed` the results don't depend on `processes`, the
+	order of the grid or what was resumed; `processes = 1` runs
+	everything in this process.
+	'''
+	for strategy in strategies:
+		if strategy not in sim.STRATEGIES:
+			raise ValueError('strategy must be one of %s, got %r'
+							 % (sim.STRATEGIES, strategy))
+	root_seed = seeding.as_seed_sequence(seed)
+	run_seed = seed_id(root_seed)
+
+	stored, stored_seeds = load_results(path, with_seeds = True) if path \
+		else ([], [])
+	finished = {(p.N, p.choice_prop, p.strategy, p.trials, point_seed_id): p
+				for p, point_seed_id in zip(stored, stored_seeds)}
+	missing = []
+	for N, choice_prop, strategy in grid_points(N_vector, choice_props, strategies):
+		done = finished.get((N, choice_prop, strategy, K, run_seed))
+		if done is not None:
+			yield done
+		else:
+			missing.append((N, choice_prop, strategy, K,
+							point_seed(root_seed, N, choice_prop, strategy)))
+
+	def record(results):
+		# Only this process ever writes the results file.  Rewriting it
+		# for every point would make a sweep quadratic in its size.
+		unsaved = 0
+		try:
+			for point in results:
+				if path:
+					stored.append(point)
+					stored_seeds.append(run_seed)
+					unsaved += 1
+					if unsaved == SAVE_EVERY:
+						save_results(stored, path, stored_seeds)
+						unsaved = 0
+				yield point
+		finally:
+			if path and unsaved:
+				save_results(stored, path, stored_seeds)
+
+	if processes == 1:
+		yield from record(map(_run_point, missing))
+		return
+
+	with mp.Pool(processes) as pool:
+		yield from record(pool.imap_unordered(_run_point, missing))
+
+def run_grid(K, N_vector, choice_props = (0.5,), strategies = sim.STRATEGIES,
+			 **kwargs):
+	'''Runs `sweep_prisoner_grid` to completion and returns a dict mapping
+	(strategy, choice_prop) to a list of (wins, trials) pairs lined up with
+	`N_vector`.
+	'''
+	totals = {}
+	for point in sweep_prisoner_grid(K, N_vector, choice_props, strategies,
+									 **kwargs):
+		totals[point.strategy, point.choice_prop, point.N] = (point.wins, point.trials)
+	return {(strategy, choice_prop): [totals[strategy, choice_prop, N]
+									  for N in N_vector]
+			for strategy in strategies for choice_prop in choice_props}
+
+if __name__ == '__main__':
+	K = int(input("Choose number of trials at each grid point: "))
+	N_vector = [10, 20, 50, 100, 200, 500, 1000]
+	for point in sweep_prisoner_grid(K, N_vector, choice_props = (0.3, 0.5, 0.7),
+									 seed = 2017):
+		print('N = {}, choice_prop = {}, {} strategy: {} / {} survived'.format(*point))
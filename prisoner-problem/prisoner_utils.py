@@ -1,31 +1,37 @@
 import numpy as np
 import ipdb
 
-def create_drawer_array(N):
+import repo_path
+import seeding
+
+def create_drawer_array(N, rng = None):
 	'''Returns a randomly sorted array from 0 through N-1 representing  
 	the drawers the prisoners choose from.
+
+	`rng` is anything `seeding.get_rng` accepts (a Generator, a seed or None).
 	'''
-	return np.random.permutation(N)
+	return seeding.get_rng(rng).permutation(N)
 
-def n_random_choices(prisoner_index, drawer_array, choice_prop = 0.5):
+def n_random_choices(prisoner_index, drawer_array, choice_prop = 0.5, rng = None):
 	'''A prisoner with a input index chooses a certain number of
 	drawers from an input array. This function will return 1 if
 	the prisoner chooses a drawer matching his number, 0 otherwise
 
 	By default, number of choices each prisoner makes will be half
-	of the number of drawers
+	of the number of drawers.  `rng` works as in `create_drawer_array`.
 	'''
 	n = int(choice_prop * len(drawer_array))
-	choices = np.random.choice(drawer_array, size = n, replace = False)
+	choices = seeding.get_rng(rng).choice(drawer_array, size = n, replace = False)
 	return len(np.where(choices == prisoner_index)[0])
 
 if __name__ == '__main__':
 	inmates = 100
-	drawers = create_drawer_array(inmates)
+	rng = seeding.get_rng(2017)
+	drawers = create_drawer_array(inmates, rng)
 	
 	for prisoner in np.arange(inmates):
 		print("Prisoner index {}".format(prisoner))
-		choices = n_random_choices(prisoner, drawers)
+		choices = n_random_choices(prisoner, drawers, rng = rng)
 		if choices:
 			print('Card successfully found')
 		else:
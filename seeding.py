@@ -0,0 +1,102 @@
+'''
+One place for every simulation in this repo to get its random numbers.
+
+Everything random takes an `rng` argument, which can be a
+`numpy.random.Generator`, a `numpy.random.SeedSequence`, an int seed or
+None, and turns it into a Generator with `get_rng`.  Nothing touches the
+global `random` or `np.random` state, so a fixed seed reproduces a run
+exactly.
+
+Sweeps that fan work out to other processes build one root
+`SeedSequence` with `as_seed_sequence` and give each work unit the
+child stream `child_seed(root, *key)`, addressed by what the unit is
+(plane size, chunk index, ...) rather than by who runs it or when.
+That's what makes a sweep give the same totals serially, on a pool of
+any size, or split across machines.
+
+The projects are plain script directories, so each one has a
+`repo_path` module that puts the repository root on `sys.path`, the
+way `benchmarks` does for the project directories; modules there
+import it right before importing this.
+'''
+import os
+
+import numpy as np
+
+# Spawn key entry that fork branches live under, so they can't collide
+# with the children sweeps address by plane size, chunk index and so on.
+FORK_KEY = 2 ** 32 - 1
+
+_root = None
+_default_rng = None
+_forks = 0
+
+def as_seed_sequence(seed = None):
+    '''
+    Returns `seed` if it already is a `numpy.random.SeedSequence`, and
+    otherwise a new SeedSequence built from it (None means fresh OS
+    entropy).
+    '''
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+def child_seed(root, *key):
+    '''
+    The child of `root` addressed by `key` (a few ints).  It's the same
+    kind of child `SeedSequence.spawn` builds, but picking it doesn't
+    depend on how many children were handed out before.
+    '''
+    root = as_seed_sequence(root)
+    return np.random.SeedSequence(root.entropy,
+                                  spawn_key = root.spawn_key + tuple(int(k) for k in key))
+
+def set_global_seed(seed):
+    '''
+    Seeds the shared Generator that `get_rng()` hands out when it's
+    called without a seed, so code that doesn't thread an rng through
+    still gets reproducible (if order-dependent) streams.
+    '''
+    global _root, _default_rng, _forks
+    _root = as_seed_sequence(seed)
+    _default_rng = np.random.default_rng(_root)
+    _forks = 0
+
+def _before_fork():
+    global _forks
+    _forks += 1
+
+def _after_fork_in_child():
+    # A forked child inherits the parent's Generator state, and drawing
+    # the same numbers as its siblings would silently correlate them, so
+    # the n-th child forked from a process switches to the root's child
+    # (FORK_KEY, n).  That only depends on the order of the forks, so a
+    # seeded run still reproduces.
+    if _root is not None:
+        set_global_seed(child_seed(_root, FORK_KEY, _forks - 1))
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before = _before_fork,
+                        after_in_child = _after_fork_in_child)
+
+def get_rng(rng = None):
+    '''
+    Turns whatever was passed as an `rng` argument into a
+    `numpy.random.Generator`: a Generator is used as is, a SeedSequence
+    or int seeds a new one, and None means the shared default Generator
+    (see `set_global_seed`), which is only built once.
+    '''
+    if isinstance(rng, np.random.Generator):
+        return rng
+    if rng is None:
+        if _default_rng is None:
+            set_global_seed(None)
+        return _default_rng
+    return np.random.default_rng(rng)
+
+def spawn_rngs(seed, n):
+    '''
+    `n` independent Generators, the children 0..n-1 of `seed`.
+    '''
+    root = as_seed_sequence(seed)
+    return [np.random.default_rng(child_seed(root, i)) for i in range(n)]
@@ -0,0 +1,14 @@
+'''
+The projects live in plain script directories rather than packages, so
+the tests put those directories (and the repo root, for `seeding`) on
+`sys.path`, the same way the benchmarks do.
+'''
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIRS = ['crazy-plane', 'prisoner-problem', 'game-of-life']
+
+for path in [REPO_ROOT] + [os.path.join(REPO_ROOT, project) for project in PROJECT_DIRS]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
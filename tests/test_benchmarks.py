@@ -0,0 +1,67 @@
+import inspect
+
+from benchmarks import __main__ as cli
+from benchmarks.harness import (DEFAULT_THRESHOLD, compare_to_baseline,
+                                time_callable, uncovered_cases)
+
+
+def test_rebuild_runs_before_every_timed_loop():
+    states = []
+
+    def rebuild():
+        state = []
+        states.append(state)
+        return lambda: state.append(None)
+
+    timing = time_callable(rebuild(), min_time = 0.001, repeat = 3,
+                           rebuild = rebuild)
+    # The first state was only used to build the callable; after that,
+    # the calibration loops and each repeat all start from a fresh one.
+    assert all(len(state) <= timing['number'] for state in states[1:])
+    assert [len(state) for state in states[-3:]] == [timing['number']] * 3
+
+
+def test_cli_and_compare_to_baseline_share_a_threshold(monkeypatch):
+    default = inspect.signature(compare_to_baseline).parameters['threshold'].default
+    assert default == DEFAULT_THRESHOLD
+
+    fake = {'metadata': {}, 'results': {}}
+    used = {}
+
+    def fake_compare(current, baseline, threshold):
+        used['threshold'] = threshold
+        return [], []
+    monkeypatch.setattr(cli, 'run_suite', lambda **kwargs: fake)
+    monkeypatch.setattr(cli, 'load_results', lambda path: fake)
+    monkeypatch.setattr(cli, 'compare_to_baseline', fake_compare)
+    assert cli.main([]) == 0
+    assert used['threshold'] == DEFAULT_THRESHOLD
+
+
+def test_compare_to_baseline_flags_only_big_changes():
+    def results(seconds):
+        return {'results': {'case': {'min': seconds}}}
+    regressed, improved = compare_to_baseline(results(1.4), results(1.0))
+    assert regressed == [] and improved == []
+    regressed, improved = compare_to_baseline(results(1.6), results(1.0))
+    assert [row[0] for row in regressed] == ['case']
+
+
+def test_cases_without_a_baseline_fail_the_run(monkeypatch, capsys):
+    baseline = {'metadata': {}, 'results': {'old': {'min': 1.0}}}
+    current = {'metadata': {}, 'results': {'old': {'min': 1.0}, 'new': {'min': 1.0}}}
+    assert uncovered_cases(current, baseline) == ['new']
+    monkeypatch.setattr(cli, 'run_suite', lambda **kwargs: current)
+    monkeypatch.setattr(cli, 'load_results', lambda path: baseline)
+    monkeypatch.setattr(cli.os.path, 'exists', lambda path: True)
+    assert cli.main([]) == 1
+    assert 'NO BASELINE new' in capsys.readouterr().out
+
+
+
+def test_every_registered_case_has_a_baseline():
+    from benchmarks.harness import BENCHMARKS, case_name
+    baseline = cli.load_results(cli.DEFAULT_BASELINE)
+    cases = [case_name(name, param) for name, (_, params, _) in BENCHMARKS.items()
+             for param in params]
+    assert [case for case in cases if case not in baseline['results']] == []
@@ -0,0 +1,63 @@
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+import plane_process as pp
+from exact_plane import exact_plane
+
+
+def brute_force_plane(N):
+    '''Boards the plane one passenger at a time, following every random
+    pick with its exact probability.  Returns the last passenger's seat
+    distribution and the expected number of random pickers.
+    '''
+    last_seat = {}
+    expected_chain_length = Fraction(0)
+
+    def board(passenger, free, chain_length, prob):
+        nonlocal expected_chain_length
+        if passenger > N:
+            expected_chain_length += prob * chain_length
+            return
+        if passenger > 1 and passenger in free:
+            choices = [passenger]
+        else:
+            choices = sorted(free)
+            # Like `plane_process_chain`, a displaced last passenger has
+            # one seat left and doesn't count as choosing.
+            chain_length += passenger == 1 or passenger < N
+        for seat in choices:
+            if passenger == N:
+                last_seat[seat] = last_seat.get(seat, 0) + prob / len(choices)
+            board(passenger + 1, free - {seat}, chain_length, prob / len(choices))
+
+    board(1, frozenset(range(1, N + 1)), 0, Fraction(1))
+    return last_seat, expected_chain_length
+
+
+@pytest.mark.parametrize('N', range(1, 8))
+def test_dp_matches_brute_force(N):
+    exact = exact_plane(N)
+    last_seat, expected_chain_length = brute_force_plane(N)
+    assert {seat: p for seat, p in exact.last_seat.items() if p} == last_seat
+    assert exact.success == last_seat.get(N, 0)
+    assert exact.expected_chain_length == expected_chain_length
+
+
+@pytest.mark.parametrize('N', [2, 3, 10, 57])
+def test_dp_collapses_to_a_half_and_harmonic_numbers(N):
+    exact = exact_plane(N)
+    harmonic = sum(Fraction(1, k) for k in range(1, N + 1))
+    assert exact.success == Fraction(1, 2)
+    assert exact.expected_chain_length == harmonic - Fraction(1, 2)
+
+
+def test_dp_agrees_with_simulated_chains():
+    N, K = 40, 20000
+    rng = np.random.default_rng(2017)
+    results, chains = np.array([pp.plane_process_chain(N, rng) for _ in range(K)]).T
+    exact = exact_plane(N)
+    assert abs(results.mean() - float(exact.success)) < 4 * np.sqrt(0.25 / K)
+    std_error = chains.std() / np.sqrt(K)
+    assert abs(chains.mean() - float(exact.expected_chain_length)) < 4 * std_error
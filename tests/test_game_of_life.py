@@ -0,0 +1,315 @@
+import numpy as np
+import pytest
+
+from bitpacked_life import BitPackedGameOfLife, pack_board, unpack_board
+from game_of_life import GameOfLife
+from hashlife import HashlifeGameOfLife, HashlifeUniverse
+from numpy_life import NumpyGameOfLife
+from parallel_life import TiledGameOfLife
+from rules import compile_rule
+
+RULES = ['B3/S23', 'B36/S23', 'B2/S']
+
+
+def random_cells(shape, seed = 0, density = 0.4):
+    rng = np.random.default_rng(seed)
+    return (rng.random(shape) < density).astype(np.uint8)
+
+
+def roll_step(cells, table):
+    counts = sum(np.roll(np.roll(cells, dr, 0), dc, 1)
+                 for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc)
+    return table[cells, counts]
+
+
+def make_games(cells, rule, boundary):
+    games = [GameOfLife(cells.tolist(), rule = rule, boundary = boundary, tile_size = 4),
+             NumpyGameOfLife(cells, rule = rule, boundary = boundary),
+             BitPackedGameOfLife(cells, rule = rule, boundary = boundary, band_words = 3),
+             TiledGameOfLife(cells, n_strips = 3, halo_width = 2, rule = rule,
+                             boundary = boundary)]
+    if boundary != 'torus':
+        games.append(HashlifeGameOfLife(cells, rule = rule, boundary = boundary))
+    return games
+
+
+@pytest.mark.parametrize('rule', RULES + ['B0/S8'])
+@pytest.mark.parametrize('shape', [(3, 3), (5, 64), (17, 65)])
+def test_torus_matches_an_np_roll_reference(rule, shape):
+    cells = random_cells(shape)
+    table = compile_rule(rule)
+    games = make_games(cells, rule, 'torus')
+    for generation in range(6):
+        cells = roll_step(cells, table)
+        for game in games:
+            game.run_update()
+            np.testing.assert_array_equal(np.asarray(game.board), cells,
+                                          err_msg = type(game).__name__)
+    games[-1].close()
+
+
+@pytest.mark.parametrize('rule', RULES)
+def test_infinite_matches_a_large_hard_edged_board(rule):
+    cells = random_cells((12, 20), seed = 1)
+    padding = 120
+    big = NumpyGameOfLife(np.pad(cells, padding), rule = rule)
+    games = make_games(cells, rule, 'infinite')
+    for generation in range(30):
+        big.run_update()
+        for game in games:
+            game.run_update()
+            board = np.asarray(game.board)
+            top, left = padding + game.origin_row, padding + game.origin_col
+            window = big.board[top:top + game.n_rows, left:left + game.n_cols]
+            np.testing.assert_array_equal(window, board, err_msg = type(game).__name__)
+            assert board.sum() == big.board.sum()
+    games[3].close()
+
+
+def test_a_glider_keeps_going_on_an_infinite_board():
+    glider = [[0, 1, 0], [0, 0, 1], [1, 1, 1]]
+    game = GameOfLife(glider, boundary = 'infinite')
+    for _ in range(200):
+        game.run_update()
+    assert sum(map(sum, game.board)) == 5
+    # 50 cells down and right of where it started.
+    rows, cols = np.nonzero(np.asarray(game.board))
+    assert rows.min() + game.origin_row == 50 and cols.min() + game.origin_col == 50
+
+
+def test_live_box_follows_the_live_cells():
+    game = GameOfLife(random_cells((20, 20), seed = 2).tolist(), boundary = 'infinite')
+    for _ in range(15):
+        game.run_update()
+        rows, cols = np.nonzero(np.asarray(game.board) == 1)
+        top, bottom, left, right = game.live_box
+        # Stretched by births only, so it may be bigger, never smaller.
+        assert top <= rows.min() and bottom >= rows.max()
+        assert left <= cols.min() and right >= cols.max()
+    game.mark_all_dirty()
+    assert game.live_box == [rows.min(), rows.max(), cols.min(), cols.max()]
+
+
+def test_neighbor_tally_leaves_out_the_cell_itself():
+    game = GameOfLife([[1, 1, 0], [0, 1, 0], [0, 0, 1]], boundary = 'torus')
+    tally = game.tally_neighbor_values(1, 1)
+    assert tally[1] == 3 and tally[0] == 5
+    tally = GameOfLife([[1, 1], [1, 0]]).tally_neighbor_values(0, 0)
+    assert tally[1] == 2 and tally[0] == 1
+
+
+@pytest.mark.parametrize('kwargs', [dict(boundary = 'torus', board = [[1, 1], [1, 1]]),
+                                    dict(boundary = 'sphere', board = [[1]]),
+                                    dict(boundary = 'infinite', rule = 'B0/S', board = [[1]])])
+def test_bad_boundaries_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        GameOfLife(**kwargs)
+
+
+def test_tiled_copies_share_threads_until_the_last_one_closes():
+    cells = random_cells((16, 16), seed = 2)
+    game = TiledGameOfLife(cells, workers = 2)
+    twin = game.copy()
+    assert twin.executor is game.executor
+    game.close()
+    twin.run_update()
+    game.close()
+    twin.close()
+    with pytest.raises(RuntimeError):
+        twin.executor.submit(int)
+    # A copy of a closed game starts threads of its own.
+    again = twin.copy()
+    again.run_update()
+    again.close()
+
+
+def test_tiled_game_shuts_its_threads_down_when_collected():
+    game = TiledGameOfLife(random_cells((16, 16), seed = 3), workers = 2)
+    game.run_update()
+    executor = game.executor
+    del game
+    with pytest.raises(RuntimeError):
+        executor.submit(int)
+
+
+def reference_cycle(cells, rule = 'B3/S23', padding = 60, max_generations = 200):
+    # First repeat of the set of live cells, on a board big enough that
+    # nothing reaches its edges.
+    game = NumpyGameOfLife(np.pad(cells, padding), rule = rule)
+    seen = {}
+    for generation in range(max_generations + 1):
+        live = frozenset(zip(*np.nonzero(game.board)))
+        if live in seen:
+            return seen[live], generation - seen[live]
+        seen[live] = generation
+        game.run_update()
+
+
+BLOCK = np.array([[1, 1], [1, 1]], dtype = np.uint8)
+BLINKER = np.array([[0, 0, 0], [1, 1, 1], [0, 0, 0]], dtype = np.uint8)
+# Settles into a still life a few generations in.
+PREBLOCK = np.array([[1, 1], [1, 0]], dtype = np.uint8)
+R_PENTOMINO_ISH = np.array([[0, 1, 1], [1, 1, 0], [0, 1, 0]], dtype = np.uint8)
+
+
+def stability_games(cells, boundary):
+    games = [GameOfLife(cells.tolist(), boundary = boundary, tile_size = 4),
+             NumpyGameOfLife(cells, boundary = boundary),
+             BitPackedGameOfLife(cells, boundary = boundary),
+             TiledGameOfLife(cells, n_strips = 2, boundary = boundary)]
+    if boundary != 'torus':
+        games.append(HashlifeGameOfLife(cells, boundary = boundary))
+    return games
+
+
+@pytest.mark.parametrize('cells, cycle_start, period', [
+    (np.pad(BLOCK, 3), 0, 1),
+    (np.pad(BLINKER, 2), 0, 2),
+    (np.pad(PREBLOCK, 3), 1, 1),
+])
+@pytest.mark.parametrize('boundary', ['edge', 'infinite'])
+def test_run_until_stable_finds_still_lifes_and_oscillators(cells, cycle_start, period,
+                                                           boundary):
+    for game in stability_games(cells, boundary):
+        report = game.run_until_stable(50)
+        assert report.stable, type(game).__name__
+        assert (report.cycle_start, report.period) == (cycle_start, period), \
+            type(game).__name__
+        if isinstance(game, TiledGameOfLife):
+            game.close()
+
+
+@pytest.mark.parametrize('cells', [BLOCK, BLINKER, PREBLOCK, R_PENTOMINO_ISH[:2]])
+def test_cycles_that_start_before_the_board_grows_are_found_from_their_start(cells):
+    # Touching the edges, so the infinite board grows on the first update.
+    expected = reference_cycle(cells)
+    for game in stability_games(cells, 'infinite'):
+        report = game.run_until_stable(100)
+        assert report.stable, type(game).__name__
+        assert (report.cycle_start, report.period) == expected, type(game).__name__
+        if isinstance(game, TiledGameOfLife):
+            game.close()
+
+
+def test_growing_keeps_the_board_hash():
+    cells = random_cells((9, 70), seed = 4)
+    # Hashlife has no `_grow`; its boards grow by `_fit_board`.
+    for game in stability_games(cells, 'infinite')[:-1]:
+        game.start_hashing()
+        before = game.board_hash
+        game._grow(8, 8, 64, 8)
+        assert game.compute_board_hash() == before, type(game).__name__
+        if isinstance(game, TiledGameOfLife):
+            game.close()
+
+
+@pytest.mark.parametrize('boundary', ['edge', 'infinite'])
+@pytest.mark.parametrize('n_generations', [2, 5, 13, 64])
+@pytest.mark.parametrize('max_nodes', [2 ** 21, 50])
+def test_advance_matches_repeated_run_update(boundary, n_generations, max_nodes):
+    cells = random_cells((11, 19), seed = n_generations)
+    stepped = HashlifeGameOfLife(cells, boundary = boundary)
+    reference = GameOfLife(cells.tolist(), boundary = boundary)
+    # A tiny `max_nodes` collects garbage between the power-of-two steps.
+    jumped = HashlifeGameOfLife(cells, boundary = boundary,
+                                universe = HashlifeUniverse(max_nodes = max_nodes))
+    for _ in range(n_generations):
+        stepped.run_update()
+        reference.run_update()
+    jumped.advance(n_generations)
+    assert jumped.generation_index == n_generations
+    for game in (stepped, jumped):
+        # Infinite boards grow by different amounts in every engine.
+        assert game.live_cells() == reference.live_cells()
+    if boundary == 'edge':
+        assert jumped.board == reference.board
+
+
+def test_garbage_collection_keeps_every_game_in_the_universe():
+    universe = HashlifeUniverse(max_nodes = 50)
+    other = HashlifeGameOfLife(random_cells((16, 16), seed = 1), universe = universe)
+    other_twin = other.copy()
+    game = HashlifeGameOfLife(random_cells((16, 16), seed = 2), universe = universe)
+    reference = GameOfLife(random_cells((16, 16), seed = 1).tolist())
+    game.advance(37)
+    for node in (other.root, other_twin.root):
+        # Still the canonical node, so its results can still be shared.
+        assert universe.join(node.nw, node.ne, node.sw, node.se) is node
+    other.advance(3)
+    for _ in range(3):
+        reference.run_update()
+    assert other.board == reference.board
+
+    # Games that are gone no longer keep their nodes.
+    del other, other_twin
+    universe.collect_garbage()
+    assert set(universe.games) == {game}
+
+
+@pytest.mark.parametrize('shape', [(1, 1), (1, 9), (9, 1), (2, 7), (13, 8), (20, 33)])
+@pytest.mark.parametrize('rule', RULES)
+def test_numpy_edge_boards_match_the_list_engine(shape, rule):
+    cells = random_cells(shape, seed = shape[0] * shape[1], density = 0.6)
+    reference = GameOfLife(cells.tolist(), rule = rule)
+    game = NumpyGameOfLife(cells, rule = rule)
+    for generation in range(8):
+        reference.run_update()
+        game.run_update()
+        assert game.board_as_list() == reference.board_as_list()
+    assert dict(game.generation_stats) == dict(reference.generation_stats)
+
+
+@pytest.mark.parametrize('n_cols', [1, 7, 63, 64, 65, 100, 128, 130])
+def test_pack_board_round_trips_and_leaves_the_padding_clear(n_cols):
+    cells = random_cells((5, n_cols), seed = n_cols, density = 0.5)
+    words = pack_board(cells)
+    assert words.shape == (5, -(-n_cols // 64))
+    np.testing.assert_array_equal(unpack_board(words, n_cols), cells)
+    padded = unpack_board(words, words.shape[1] * 64)
+    assert not padded[:, n_cols:].any()
+    row, col = np.nonzero(cells)
+    bits = (words[row, col // 64] >> (col % 64).astype(np.uint64)) & np.uint64(1)
+    assert bits.all()
+    assert pack_board(cells.tolist()).tolist() == words.tolist()
+
+
+def comparable_stats(game):
+    # Infinite boards grow by different amounts in every engine, so only
+    # their DEAD tallies, which count the whole board, can differ.
+    stats = {generation: dict(counter) for generation, counter
+             in game.generation_stats.items()}
+    if game.boundary == 'infinite':
+        for counter in stats.values():
+            counter.pop('DEAD', None)
+    return stats
+
+
+@pytest.mark.parametrize('boundary', ['edge', 'torus', 'infinite'])
+@pytest.mark.parametrize('band_words', [1, 2, 5])
+@pytest.mark.parametrize('shape', [(9, 70), (6, 130)])
+def test_bitpacked_bands_smaller_than_the_board(boundary, band_words, shape):
+    cells = random_cells(shape, seed = band_words)
+    reference = NumpyGameOfLife(cells, boundary = boundary)
+    game = BitPackedGameOfLife(cells, band_words = band_words, boundary = boundary)
+    assert game.band_rows < shape[0]
+    for generation in range(6):
+        reference.run_update()
+        game.run_update()
+        assert game.live_cells() == reference.live_cells()
+    assert comparable_stats(game) == comparable_stats(reference)
+
+
+@pytest.mark.parametrize('boundary', ['edge', 'torus', 'infinite'])
+@pytest.mark.parametrize('rule', RULES)
+def test_generation_stats_match_the_list_engine(boundary, rule):
+    cells = random_cells((14, 70), seed = 6)
+    reference, *games = make_games(cells, rule, boundary)
+    for generation in range(10):
+        reference.run_update()
+        for game in games:
+            game.run_update()
+    assert len(reference.generation_stats) == 10
+    for game in games:
+        assert comparable_stats(game) == comparable_stats(reference), type(game).__name__
+        if isinstance(game, TiledGameOfLife):
+            game.close()
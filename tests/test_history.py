@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+
+from history import HistoryReader, HistoryRecorder
+from numpy_life import NumpyGameOfLife
+
+
+def random_game(size = 32, seed = 0):
+    rng = np.random.default_rng(seed)
+    return NumpyGameOfLife(board = rng.integers(0, 2, size = (size, size), dtype = np.uint8))
+
+
+def test_replay_matches_the_game(tmp_path):
+    path = str(tmp_path / 'run.hist')
+    game = random_game()
+    boards = []
+    with HistoryRecorder(path, 32, 32, keyframe_every = 8) as recorder:
+        for _ in range(20):
+            boards.append(np.array(game.board, dtype = np.uint8))
+            recorder.record(game.board)
+            game.run_update()
+    reader = HistoryReader(path)
+    assert len(reader) == 20
+    for generation in [0, 1, 7, 8, 13, 19, -1]:
+        np.testing.assert_array_equal(reader[generation], boards[generation])
+    reader.close()
+
+
+def test_index_never_runs_ahead_of_the_data(tmp_path):
+    path = str(tmp_path / 'run.hist')
+    game = random_game()
+    recorder = HistoryRecorder(path, 32, 32)
+    recorder.index_batch = 4
+    for _ in range(10):
+        recorder.record(game.board)
+        game.run_update()
+        n_indexed = os.path.getsize(path + '.idx') // 16
+        # Everything the index points to is on disk already.
+        assert n_indexed in (0, 4, 8)
+        reader = HistoryReader(path)
+        assert len(reader) == n_indexed
+        reader.close()
+    recorder.close()
+    assert len(HistoryReader(path)) == 10
+
+
+def test_reader_drops_entries_past_the_end_of_the_data(tmp_path):
+    path = str(tmp_path / 'run.hist')
+    game = random_game()
+    with HistoryRecorder(path, 32, 32) as recorder:
+        recorder.record_run(game, 5)
+    # A writer that died after its index entries but before their data.
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 1)
+    reader = HistoryReader(path)
+    assert len(reader) == 5
+    reader.close()
+
+
+def test_reader_handles_an_empty_data_file(tmp_path):
+    path = str(tmp_path / 'run.hist')
+    open(path, 'wb').close()
+    open(path + '.idx', 'wb').close()
+    with pytest.raises(ValueError):
+        HistoryReader(path)
+
+    recorder = HistoryRecorder(path, 4, 4)
+    reader = HistoryReader(path)
+    assert len(reader) == 0
+    recorder.record(np.zeros((4, 4), dtype = np.uint8))
+    recorder.flush()
+    reader.refresh()
+    assert len(reader) == 1
+    reader.close()
+    recorder.close()
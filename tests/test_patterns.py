@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from numpy_life import NumpyGameOfLife
+from patterns import (format_cells, format_rle, load_pattern, parse_cells,
+                      parse_rle, save_pattern)
+
+
+def random_cells(n_rows, n_cols, seed = 0, density = 0.5):
+    rng = np.random.default_rng(seed)
+    return (rng.random((n_rows, n_cols)) < density).astype(np.uint8)
+
+
+@pytest.mark.parametrize('shape, density', [((1, 1), 0.5), ((7, 3), 0.5),
+                                            ((64, 80), 0.3), ((40, 40), 0.02),
+                                            ((3, 300), 0.97)])
+def test_rle_round_trips(shape, density):
+    cells = random_cells(*shape, density = density)
+    parsed, rule = parse_rle(format_rle(cells, rule = 'B36/S23'))
+    np.testing.assert_array_equal(parsed, cells)
+    assert rule == 'B36/S23'
+
+
+def test_rle_lines_stay_short():
+    data = format_rle(random_cells(50, 200), name = 'noise')
+    assert max(len(line) for line in data.split(b'\n')[2:]) <= 70
+
+
+def test_cells_round_trip():
+    cells = random_cells(9, 13)
+    np.testing.assert_array_equal(parse_cells(format_cells(cells, name = 'x')), cells)
+
+
+def test_parse_rle_reads_the_glider():
+    cells, rule = parse_rle(b'#N Glider\nx = 3, y = 3, rule = B3/S23\nbob$2bo$3o!\n')
+    np.testing.assert_array_equal(cells, [[0, 1, 0], [0, 0, 1], [1, 1, 1]])
+    assert rule == 'B3/S23'
+
+
+def test_parse_rle_handles_touching_and_empty_runs():
+    cells, _ = parse_rle(b'x = 6, y = 3\n2o3o$0o$bo!')
+    np.testing.assert_array_equal(cells, [[1, 1, 1, 1, 1, 0],
+                                          [0, 0, 0, 0, 0, 0],
+                                          [0, 1, 0, 0, 0, 0]])
+
+
+@pytest.mark.parametrize('body', [b'bo2\n', b'bo$12!', b'3'])
+def test_parse_rle_rejects_a_count_without_a_tag(body):
+    with pytest.raises(ValueError, match = 'run count'):
+        parse_rle(b'x = 3, y = 1\n' + body)
+
+
+def test_torus_rule_survives_save_and_load(tmp_path):
+    game = NumpyGameOfLife(board = random_cells(12, 10), boundary = 'torus')
+    path = str(tmp_path / 'board.rle')
+    save_pattern(game, path)
+    loaded = load_pattern(path)
+    assert loaded.boundary == 'torus'
+    np.testing.assert_array_equal(np.asarray(loaded.board), np.asarray(game.board))
@@ -0,0 +1,69 @@
+import pytest
+
+import plane_sweep as ps
+from plane_cache import PlaneResultCache
+
+
+def count_simulated(monkeypatch):
+    simulated = []
+    run_unit = ps._run_unit
+
+    def counting_run_unit(args):
+        simulated.append(args[2])
+        return run_unit(args)
+
+    monkeypatch.setattr(ps, '_run_unit', counting_run_unit)
+    return simulated
+
+
+def test_raising_K_only_simulates_the_new_and_partial_chunks(tmp_path, monkeypatch):
+    simulated = count_simulated(monkeypatch)
+    with PlaneResultCache(str(tmp_path / 'cache.sqlite')) as cache:
+        first = ps.run_sweep(2500, [10, 20], seed = 1, chunk_size = 1000,
+                             processes = 1, cache = cache)
+        assert sorted(simulated) == [500, 500, 1000, 1000, 1000, 1000]
+        del simulated[:]
+
+        again = ps.run_sweep(2500, [10, 20], seed = 1, chunk_size = 1000,
+                             processes = 1, cache = cache)
+        assert again == first
+        assert simulated == []
+
+        ps.run_sweep(4000, [10, 20], seed = 1, chunk_size = 1000,
+                     processes = 1, cache = cache)
+        # Chunk 2 was partial, chunk 3 is new; chunks 0 and 1 are reused.
+        assert sorted(simulated) == [1000] * 4
+
+
+def test_cached_sweep_matches_an_uncached_one(tmp_path):
+    uncached = ps.run_sweep(3000, [10, 20], seed = 7, chunk_size = 1000,
+                            processes = 1)
+    with PlaneResultCache(str(tmp_path / 'cache.sqlite')) as cache:
+        ps.run_sweep(1500, [10, 20], seed = 7, chunk_size = 1000,
+                     processes = 1, cache = cache)
+        cached = ps.run_sweep(3000, [10, 20], seed = 7, chunk_size = 1000,
+                              processes = 1, cache = cache)
+    assert cached == uncached
+
+
+def test_adaptive_sweep_rejects_an_empty_budget():
+    with pytest.raises(ValueError):
+        ps.adaptive_sweep(0, [10], processes = 1)
+
+
+def test_adaptive_sweep_draws_from_its_own_stream(monkeypatch):
+    streams = []
+    unit_seed = ps.unit_seed
+
+    def recording_unit_seed(root_seed, N, chunk_idx, stream = 0):
+        streams.append(stream)
+        return unit_seed(root_seed, N, chunk_idx, stream)
+
+    monkeypatch.setattr(ps, 'unit_seed', recording_unit_seed)
+    results = ps.adaptive_sweep(3000, [10, 50], first_batch = 1000, seed = 4,
+                                processes = 1, target_halfwidth = 0.0)
+    assert set(streams) == {ps.ADAPTIVE_STREAM}
+    assert [r.trials for r in results] == [3000, 3000]
+    del streams[:]
+    ps.run_sweep(3000, [10, 50], seed = 4, processes = 1)
+    assert set(streams) == {0}
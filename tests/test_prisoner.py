@@ -0,0 +1,265 @@
+import itertools
+import json
+import math
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+import prisoner_exact as pe
+import prisoner_sim as ps
+from prisoner_early_exit import EarlyExitRunner
+
+
+def cycle_count(drawers):
+    seen = np.zeros(len(drawers), dtype = bool)
+    n_cycles = 0
+    for start in range(len(drawers)):
+        if not seen[start]:
+            n_cycles += 1
+            drawer = start
+            while not seen[drawer]:
+                seen[drawer] = True
+                drawer = drawers[drawer]
+    return n_cycles
+
+
+def test_winning_loop_trial_opens_every_drawer_once():
+    runner = EarlyExitRunner(100, rng = np.random.default_rng(1))
+    for _ in range(50):
+        runner.skipped = 0
+        survived, opens = runner.run_trial()
+        if survived:
+            # Every cycle gets walked once, by its lowest prisoner.
+            assert opens == 100
+            assert runner.skipped == 100 - cycle_count(runner.drawers)
+
+
+def test_loop_strategy_survives_about_as_often_as_it_should():
+    stats = EarlyExitRunner(100, rng = np.random.default_rng(2)).run(2000)
+    # 1 - (H_100 - H_50), about 0.3118.
+    assert abs(stats.wins / stats.trials - 0.3118) < 0.04
+    assert stats.opens + stats.opens_saved == stats.naive_opens
+
+
+def test_random_strategy_almost_always_dies():
+    stats = EarlyExitRunner(20, strategy = 'random',
+                            rng = np.random.default_rng(3)).run(200)
+    assert stats.wins == 0
+    assert stats.skipped == 0
+
+
+def walk_longest_cycle(perm):
+    seen = [False] * len(perm)
+    longest = 0
+    for start in range(len(perm)):
+        length = 0
+        drawer = start
+        while not seen[drawer]:
+            seen[drawer] = True
+            drawer = perm[drawer]
+            length += 1
+        longest = max(longest, length)
+    return longest
+
+
+def brute_force_longest_cycles(N):
+    counts = {}
+    for perm in itertools.permutations(range(N)):
+        longest = walk_longest_cycle(perm)
+        counts[longest] = counts.get(longest, 0) + 1
+    return {length: Fraction(count, math.factorial(N))
+            for length, count in counts.items()}
+
+
+@pytest.mark.parametrize('N', range(1, 8))
+def test_longest_cycle_distribution_matches_brute_force(N, tmp_path):
+    expected = brute_force_longest_cycles(N)
+    distribution = pe.longest_cycle_distribution(N, cache_dir = str(tmp_path))
+    assert {k: v for k, v in distribution.items() if v} == expected
+    for m in range(N + 1):
+        at_most = sum(p for length, p in expected.items() if length <= m)
+        assert pe.longest_at_most(N, m, cache_dir = False) == at_most
+
+
+def prefix_sum_dp(N, m):
+    # The textbook DP, in Fractions.
+    p = [Fraction(1)]
+    for n in range(1, N + 1):
+        p.append(sum(p[max(0, n - m):n], Fraction(0)) / n)
+    return p[N]
+
+
+@pytest.mark.parametrize('N', [30, 31, 32, 61])
+def test_closed_form_above_a_third_matches_the_dp(N):
+    for m in range(N // 3, N + 1):
+        assert pe.longest_at_most(N, m, cache_dir = False) == prefix_sum_dp(N, m)
+    distribution = pe.longest_cycle_distribution(N, cache_dir = False)
+    assert sum(distribution.values()) == 1
+    for length in range(1, N + 1):
+        assert distribution[length] == prefix_sum_dp(N, length) - prefix_sum_dp(N, length - 1)
+
+
+@pytest.mark.parametrize('N', [1, 2, 9, 150, 301])
+def test_float_tables_match_the_exact_values(N):
+    for m in range(N + 1):
+        exact = float(pe.longest_at_most(N, m, cache_dir = False))
+        value = pe.longest_at_most_float(N, m)
+        if exact > 1e-280:
+            assert value == pytest.approx(exact, rel = 1e-12)
+        else:
+            assert value < 1e-270
+    floats = pe.longest_cycle_distribution(N, exact = False)
+    assert sum(floats.values()) == pytest.approx(1, rel = 1e-12)
+
+
+def test_survival_at_half_the_drawers_is_one_minus_a_harmonic_tail():
+    tail = sum(Fraction(1, k) for k in range(51, 101))
+    assert pe.exact_survival(100, cache_dir = False) == 1 - tail
+    assert pe.survival_probability(100) == pytest.approx(0.3118278206898048, rel = 1e-14)
+
+
+@pytest.mark.parametrize('N, choice_prop', [(10, 0.3), (40, 0.5), (41, 0.7), (9, 0.2)])
+@pytest.mark.parametrize('strategy', ['loop', 'random'])
+def test_float_survival_matches_the_exact_fraction(N, choice_prop, strategy):
+    exact = float(pe.exact_survival(N, choice_prop, strategy, cache_dir = False))
+    assert pe.survival_probability(N, choice_prop, strategy, cache_dir = False) \
+        == pytest.approx(exact, rel = 1e-12)
+
+
+def test_random_strategy_underflows_instead_of_building_a_huge_fraction():
+    assert pe.survival_probability(10 ** 6, strategy = 'random') == 0.0
+
+
+def test_longest_at_most_appends_to_its_cache(tmp_path):
+    cache_dir = str(tmp_path)
+    for m in [1, 2, 3]:
+        pe.longest_at_most(12, m, cache_dir = cache_dir)
+    pe.longest_at_most(12, 2, cache_dir = cache_dir)
+    with open(tmp_path / 'longest_at_most_N12.jsonl') as f:
+        lines = [json.loads(line) for line in f]
+    assert [key for key, _ in lines] == [1, 2, 3]
+    with open(tmp_path / 'longest_at_most_N12.jsonl', 'a') as f:
+        f.write('[4, ["ab')
+    assert pe.longest_at_most(12, 3, cache_dir = cache_dir) \
+        == pe.longest_at_most(12, 3, cache_dir = False)
+
+
+def test_choice_props_with_the_same_drawer_count_get_their_own_streams():
+    import prisoner_sweep as psw
+    root = np.random.SeedSequence(5)
+    # Both open 5 of 10 drawers.
+    a = psw.point_seed(root, 10, 0.5, 'loop')
+    b = psw.point_seed(root, 10, 0.55, 'loop')
+    assert a.spawn_key != b.spawn_key
+    assert psw.point_seed(root, 10, 0.5, 'loop').spawn_key == a.spawn_key
+
+
+def test_prisoner_sweep_saves_in_batches_and_resumes(tmp_path, monkeypatch):
+    import prisoner_sweep as psw
+    path = str(tmp_path / 'sweep.npz')
+    saves = []
+    save_results = psw.save_results
+
+    def counting_save(points, path, seeds):
+        saves.append(len(points))
+        save_results(points, path, seeds)
+
+    monkeypatch.setattr(psw, 'save_results', counting_save)
+    monkeypatch.setattr(psw, 'SAVE_EVERY', 4)
+    kwargs = dict(choice_props = (0.3, 0.5), seed = 9, processes = 1, path = path)
+    first = psw.run_grid(200, [5, 10, 20], **kwargs)
+    # 12 points: two full batches and a final partial one.
+    assert saves == [4, 8, 12]
+    del saves[:]
+
+    # Stopping a sweep partway still saves what it simulated.
+    sweep = psw.sweep_prisoner_grid(200, [5, 10, 20, 40], **kwargs)
+    for _ in range(13):
+        next(sweep)
+    sweep.close()
+    assert saves == [13]
+    del saves[:]
+    assert psw.run_grid(200, [5, 10, 20], **kwargs) == first
+    assert saves == []
+
+
+def test_prisoner_sweep_only_resumes_points_with_the_same_seed(tmp_path):
+    import prisoner_sweep as psw
+    path = str(tmp_path / 'sweep.npz')
+    grid = dict(choice_props = (0.5,), processes = 1)
+    psw.run_grid(200, [5, 10], seed = 1, path = path, **grid)
+    other_seed = psw.run_grid(200, [5, 10], seed = 999, path = path, **grid)
+    assert other_seed == psw.run_grid(200, [5, 10], seed = 999, path = None, **grid)
+    assert len(psw.load_results(path)) == 8
+
+    # Unseeded runs draw fresh entropy, so nothing they stored is reused.
+    psw.run_grid(200, [5, 10], path = path, **grid)
+    psw.run_grid(200, [5, 10], path = path, **grid)
+    assert len(psw.load_results(path)) == 16
+
+    # Files from before seeds were stored don't match any seed.
+    points = psw.load_results(path)
+    psw.save_results(points, path)
+    assert psw.run_grid(200, [5, 10], seed = 1, path = path, **grid) \
+        == psw.run_grid(200, [5, 10], seed = 1, path = None, **grid)
+    assert len(psw.load_results(path)) == 20
+
+
+@pytest.mark.parametrize('N', range(1, 7))
+def test_pointer_jumping_matches_a_cycle_walk_on_every_permutation(N):
+    perms = np.array(list(itertools.permutations(range(N))))
+    expected = [walk_longest_cycle(perm) for perm in perms]
+    assert ps.longest_cycle_lengths(perms).tolist() == expected
+
+
+@pytest.mark.parametrize('N', [7, 8, 9, 16, 17, 100])
+def test_pointer_jumping_matches_a_cycle_walk_on_random_permutations(N):
+    drawers = ps.drawer_batch(N, 500, rng = np.random.default_rng(N))
+    expected = [walk_longest_cycle(perm) for perm in drawers]
+    assert ps.longest_cycle_lengths(drawers).tolist() == expected
+
+
+def assert_frequencies_match(samples, distribution):
+    # Every outcome's count within 4.5 binomial standard errors.
+    K = len(samples)
+    counts = np.bincount(samples, minlength = max(distribution) + 1)
+    assert counts.sum() == sum(counts[k] for k in distribution)
+    for k, p in distribution.items():
+        p = float(p)
+        assert abs(counts[k] - K * p) <= 4.5 * math.sqrt(K * p * (1 - p)) + 1e-9
+
+
+@pytest.mark.parametrize('N', [1, 2, 5, 12])
+@pytest.mark.parametrize('method', ['cycles', 'permutations'])
+def test_sampled_longest_cycles_follow_the_exact_distribution(N, method):
+    longest = ps.loop_strategy_trials(N, 40000, rng = np.random.default_rng(N),
+                                      method = method)
+    assert_frequencies_match(longest,
+                             pe.longest_cycle_distribution(N, cache_dir = False))
+
+
+@pytest.mark.parametrize('N, choice_prop', [(4, 0.5), (6, 0.5), (5, 0.6), (3, 1.0)])
+def test_geometric_shortcut_matches_independent_prisoners(N, choice_prop):
+    # Prisoner j finds their card with probability n/N, independently.
+    n = ps.n_choices(N, choice_prop)
+    found = ps.random_strategy_trials(N, 40000, choice_prop,
+                                      rng = np.random.default_rng(N))
+    success = Fraction(n, N)
+    distribution = {j: success ** j * (1 - success) for j in range(N)}
+    distribution[N] = success ** N
+    assert_frequencies_match(found, {j: p for j, p in distribution.items() if p})
+
+
+@pytest.mark.parametrize('N, choice_prop', [(6, 0.5), (10, 0.3), (12, 0.5), (5, 0.6)])
+@pytest.mark.parametrize('strategy, kwargs', [('loop', {}),
+                                              ('loop', {'method': 'permutations'}),
+                                              ('random', {})])
+def test_run_trials_survival_matches_the_exact_answer(N, choice_prop, strategy, kwargs):
+    estimate, exact, z = ps.check_against_exact(N, 40000, strategy, choice_prop,
+                                                rng = np.random.default_rng(7),
+                                                cache_dir = False,
+                                                chunk_size = 15000, **kwargs)
+    assert exact == pytest.approx(float(pe.exact_survival(N, choice_prop, strategy,
+                                                          cache_dir = False)))
+    assert abs(z) < 4.5
@@ -0,0 +1,94 @@
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+import render_figures as rf
+from plane_cache import PlaneResultCache
+
+JOBS = [(10, 500, 1, 1), (10, 500, 2, 1), (20, 300, 1, 1)]
+
+
+def test_pooled_simulation_matches_serial(tmp_path):
+    serial = rf.simulate_jobs(JOBS, seed = 3, max_points = 50)
+    assert sorted(serial) == [(10, 500, 0), (10, 500, 1), (20, 300, 0)]
+    with PlaneResultCache(str(tmp_path / 'cache.sqlite')) as cache, \
+            mp.Pool(2) as pool:
+        pooled = rf.simulate_jobs(JOBS, seed = 3, cache = cache,
+                                  max_points = 50, pool = pool)
+    for key, curve in serial.items():
+        assert np.array_equal(pooled[key].X, curve.X)
+        assert np.array_equal(pooled[key].Y, curve.Y)
+        assert pooled[key].successes == curve.successes
+
+
+def test_tasks_leave_the_cache_writes_to_the_parent(tmp_path, monkeypatch):
+    import plane_sweep as ps
+    path = str(tmp_path / 'cache.sqlite')
+    with PlaneResultCache(path) as cache, mp.Pool(2) as pool:
+        first = rf.simulate_jobs(JOBS, seed = 4, cache = cache, max_points = 50,
+                                 pool = pool)
+        n_units = cache.conn.execute('SELECT COUNT(*) FROM units').fetchone()[0]
+    assert n_units == 3
+
+    def no_simulating(args):
+        raise AssertionError('everything should come from the cache')
+
+    monkeypatch.setattr(ps, '_run_unit', no_simulating)
+    with PlaneResultCache(path) as cache:
+        again = rf.simulate_jobs(JOBS, seed = 4, cache = cache, max_points = 50)
+    for key, curve in first.items():
+        assert np.array_equal(again[key].Y, curve.Y)
+
+
+def test_read_only_cache_collects_its_writes(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    seed_seq = np.random.SeedSequence(1)
+    with PlaneResultCache(path) as owner:
+        key = owner.unit_key(10, seed_seq)
+        owner.put(key, 10, 3, 4, outcomes = [1, 0, 1, 1])
+    reader = PlaneResultCache(path, read_only = True)
+    assert list(reader.get_outcomes(key, 4)) == [1, 0, 1, 1]
+    other = reader.unit_key(20, seed_seq)
+    reader.put(other, 20, 1, 2)
+    reader.close()
+    assert reader.touched == [key]
+    with PlaneResultCache(path) as owner:
+        assert owner.get_counts(other, 2) is None
+        owner.apply(reader.touched, reader.pending)
+        assert owner.get_counts(other, 2) == (1, 2)
+
+
+def test_curves_survive_the_round_trip_through_shared_memory():
+    curves = rf.simulate_jobs(JOBS, seed = 3, max_points = 50)
+    shm, index = rf.pack_curves(curves)
+    try:
+        keys = list(index)
+        copies = rf.read_curves(shm.name, [index[key] for key in keys])
+    finally:
+        shm.close()
+        shm.unlink()
+    for key, copy in zip(keys, copies):
+        assert np.array_equal(copy.X, curves[key].X)
+        assert np.array_equal(copy.Y, curves[key].Y)
+
+
+def test_render_jobs_writes_every_figure_and_frees_the_block(tmp_path, monkeypatch):
+    pytest.importorskip('matplotlib')
+    blocks = []
+    pack_curves = rf.pack_curves
+
+    def remembering_pack_curves(curves):
+        shm, index = pack_curves(curves)
+        blocks.append(shm.name)
+        return shm, index
+
+    monkeypatch.setattr(rf, 'pack_curves', remembering_pack_curves)
+    paths = rf.render_jobs(JOBS, str(tmp_path), seed = 3, processes = 2,
+                           max_points = 50)
+    assert len(paths) == len(JOBS)
+    assert all(os.path.exists(path) for path in paths)
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name = blocks[0])
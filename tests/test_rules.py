@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from rules import CONWAY, NAMED_RULES, Rule, compile_rule, parse_rule, rule_string
+
+HIGHLIFE = Rule(frozenset({3, 6}), frozenset({2, 3}))
+
+
+@pytest.mark.parametrize('text', ['B36/S23', 'b36/s23', 'B36S23', 'B63/S32', ' B36/S23 ',
+                                  'S23/B36', 's23b36', '23/36', 'highlife', 'HighLife'])
+def test_every_spelling_reads_the_same_rule(text):
+    assert parse_rule(text) == HIGHLIFE
+    assert rule_string(text) == 'B36/S23'
+
+
+@pytest.mark.parametrize('text, births, survivals', [
+    ('B2/S', {2}, set()),
+    ('B/S012345678', set(), set(range(9))),
+    ('S/B', set(), set()),
+    ('/3', {3}, set()),
+    ('B33/S2', {3}, {2}),
+])
+def test_empty_and_repeated_digits(text, births, survivals):
+    assert parse_rule(text) == Rule(frozenset(births), frozenset(survivals))
+
+
+@pytest.mark.parametrize('text', ['', 'B9/S23', 'B3/S23/', 'conway', 'B3-S23', '3/23/1',
+                                  'S23', 'B3/B23', '23 3'])
+def test_invalid_rules_are_rejected(text):
+    with pytest.raises(ValueError):
+        parse_rule(text)
+
+
+@pytest.mark.parametrize('rule', sorted(NAMED_RULES.values()) + ['B/S', 'B012345678/S8'])
+def test_rule_string_round_trips(rule):
+    assert rule_string(rule) == rule
+    assert parse_rule(rule_string(rule)) == parse_rule(rule)
+    assert rule_string(parse_rule(rule)) == rule
+
+
+def test_named_rules_are_canonical():
+    for name, rule in NAMED_RULES.items():
+        assert rule_string(name) == rule
+
+
+def test_compile_rule_tables():
+    table = compile_rule(CONWAY)
+    assert table.shape == (2, 9) and table.dtype == np.uint8
+    assert np.nonzero(table[0])[0].tolist() == [3]
+    assert np.nonzero(table[1])[0].tolist() == [2, 3]
+    np.testing.assert_array_equal(compile_rule('S23/B3'), table)
+    np.testing.assert_array_equal(compile_rule(parse_rule('23/3')), table)
+    assert not compile_rule('B/S').any()
+    assert compile_rule('B012345678/S012345678').all()
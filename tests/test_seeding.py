@@ -0,0 +1,63 @@
+import multiprocessing as mp
+
+import numpy as np
+import pytest
+
+import plane_process as pp
+import plane_sweep as ps
+import prisoner_sweep as psw
+import seeding
+
+
+def test_get_rng_without_a_seed_reuses_one_generator():
+    seeding.set_global_seed(3)
+    assert seeding.get_rng() is seeding.get_rng()
+    first = seeding.get_rng().random(4)
+    seeding.set_global_seed(3)
+    np.testing.assert_array_equal(seeding.get_rng().random(4), first)
+
+
+def draw_in_child(queue):
+    queue.put(seeding.get_rng().random(4).tolist())
+
+
+def test_forked_children_get_their_own_reproducible_streams():
+    ctx = mp.get_context('fork')
+
+    def children_draws():
+        seeding.set_global_seed(11)
+        draws = []
+        for _ in range(2):
+            queue = ctx.Queue()
+            child = ctx.Process(target = draw_in_child, args = (queue,))
+            child.start()
+            draws.append(queue.get())
+            child.join()
+        return draws + [seeding.get_rng().random(4).tolist()]
+
+    draws = children_draws()
+    # Parent and both children all draw different numbers...
+    assert len({tuple(d) for d in draws}) == 3
+    # ...and the same ones again from the same seed.
+    assert children_draws() == draws
+
+
+def test_plane_process_reproduces_from_a_seed():
+    assert ([pp.plane_process(50, np.random.default_rng(5)) for _ in range(20)]
+            == [pp.plane_process(50, np.random.default_rng(5)) for _ in range(20)])
+    assert np.mean([pp.plane_process(20, np.random.default_rng(i))
+                    for i in range(2000)]) == pytest.approx(0.5, abs = 0.05)
+
+
+def test_plane_sweep_serial_equals_pooled():
+    kwargs = dict(seed = 2017, chunk_size = 1000)
+    serial = ps.run_sweep(3500, [10, 30, 60], processes = 1, **kwargs)
+    pooled = ps.run_sweep(3500, [10, 30, 60], processes = 2, **kwargs)
+    assert serial == pooled
+
+
+def test_prisoner_sweep_serial_equals_pooled():
+    kwargs = dict(choice_props = (0.3, 0.5), seed = 2017, path = None)
+    serial = psw.run_grid(500, [10, 40], processes = 1, **kwargs)
+    pooled = psw.run_grid(500, [10, 40], processes = 2, **kwargs)
+    assert serial == pooled